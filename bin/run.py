@@ -30,6 +30,8 @@ options = {
     "with_house": True,
     "with_constructions": False,
     "with_sawmill": False,
+    "with_columnar_movement": False,
+    "with_logistics": False,
 }
 
 m = Manager()
@@ -0,0 +1,84 @@
+from typing import List, Optional
+
+
+'''
+Column assigned to every row of `costs`, a rows x columns matrix, so the
+total cost is the lowest possible with every column used at most once
+(Hungarian method, O(rows^2 * columns)). Rows left over when there are
+more rows than columns are assigned `None`.
+'''
+def min_cost_assignment(costs: List[List[float]]) -> List[Optional[int]]:
+    rows: int = len(costs)
+    if not rows:
+        return []
+
+    columns: int = len(costs[0])
+    if rows > columns:
+        assignment: List[Optional[int]] = [None] * rows
+        transposed = min_cost_assignment(
+            [list(column) for column in zip(*costs)]
+        )
+        for column, row in enumerate(transposed):
+            if row is not None:
+                assignment[row] = column
+        return assignment
+
+    infinity: float = float('inf')
+
+    # Potentials of rows and columns, the row each column is assigned to
+    # (0 for none) and the column before it on the augmenting path, with
+    # a virtual column 0 to start paths from.
+    row_potentials: List[float] = [0.0] * (rows + 1)
+    column_potentials: List[float] = [0.0] * (columns + 1)
+    assigned: List[int] = [0] * (columns + 1)
+    previous: List[int] = [0] * (columns + 1)
+
+    for row in range(1, rows + 1):
+        assigned[0] = row
+        column: int = 0
+        slack: List[float] = [infinity] * (columns + 1)
+        visited: List[bool] = [False] * (columns + 1)
+
+        while assigned[column]:
+            visited[column] = True
+            current_row: int = assigned[column]
+            delta: float = infinity
+            next_column: int = 0
+
+            for candidate in range(1, columns + 1):
+                if visited[candidate]:
+                    continue
+
+                reduced: float = (
+                    costs[current_row - 1][candidate - 1]
+                    - row_potentials[current_row]
+                    - column_potentials[candidate]
+                )
+                if reduced < slack[candidate]:
+                    slack[candidate] = reduced
+                    previous[candidate] = column
+
+                if slack[candidate] < delta:
+                    delta = slack[candidate]
+                    next_column = candidate
+
+            for candidate in range(columns + 1):
+                if visited[candidate]:
+                    row_potentials[assigned[candidate]] += delta
+                    column_potentials[candidate] -= delta
+                else:
+                    slack[candidate] -= delta
+
+            column = next_column
+
+        while column:
+            previous_column: int = previous[column]
+            assigned[column] = assigned[previous_column]
+            column = previous_column
+
+    assignment = [None] * rows
+    for column in range(1, columns + 1):
+        if assigned[column]:
+            assignment[assigned[column] - 1] = column - 1
+
+    return assignment
@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+import structlog
+import threading
+from typing import Any, List, Tuple
+
+from settlers.engine.components import Component
+from settlers.engine.entities.entity import Entity
+
+logger = structlog.get_logger('engine.commands')
+
+COMMAND_SPAWN = 'spawn'
+COMMAND_DESPAWN = 'despawn'
+COMMAND_ADD_COMPONENT = 'add_component'
+COMMAND_REMOVE_COMPONENT = 'remove_component'
+
+CommandType = Tuple[int, str, Entity, Any]
+
+
+'''
+Structural changes recorded by systems while they iterate their components.
+
+The `World` applies them in recording order at its sync point, the end of
+`World.process`, with the archetype and query updates batched per entity.
+
+Systems running concurrently record inside `recording(position)`, commands
+are then applied by position first so the outcome does not depend on which
+thread recorded first.
+'''
+class CommandBuffer:
+    __slots__ = ('_commands', '_local', '_ordered')
+
+    def __init__(self) -> None:
+        self._commands: List[CommandType] = []
+        self._local = threading.local()
+        self._ordered: bool = False
+
+    def spawn(self, entity: Entity) -> None:
+        self._record(COMMAND_SPAWN, entity, None)
+
+    def despawn(self, entity: Entity) -> None:
+        self._record(COMMAND_DESPAWN, entity, None)
+
+    def add_component(self, entity: Entity, component_definition: Any) -> None:
+        self._record(COMMAND_ADD_COMPONENT, entity, component_definition)
+
+    def remove_component(self, entity: Entity, component: Component) -> None:
+        self._record(COMMAND_REMOVE_COMPONENT, entity, component)
+
+    def _record(self, command: str, entity: Entity, argument: Any) -> None:
+        position: int = getattr(self._local, 'position', -1)
+        self._commands.append((position, command, entity, argument))
+
+    @contextmanager
+    def recording(self, position: int):
+        self._ordered = True
+        previous: int = getattr(self._local, 'position', -1)
+        self._local.position = position
+        try:
+            yield
+        finally:
+            self._local.position = previous
+
+    def flush(self, world) -> int:
+        if not self._commands:
+            return 0
+
+        commands, self._commands = self._commands, []
+
+        if self._ordered:
+            # Stable, commands of one system keep their recording order.
+            commands.sort(key=lambda command: command[0])
+            self._ordered = False
+
+        with world.component_manager.batch():
+            for _position, command, entity, argument in commands:
+                if command == COMMAND_SPAWN:
+                    world.add_entity(entity)
+                elif command == COMMAND_DESPAWN:
+                    world.despawn(entity)
+                elif command == COMMAND_ADD_COMPONENT:
+                    entity.components.add(argument)
+                elif command == COMMAND_REMOVE_COMPONENT:
+                    entity.components.remove(argument)
+
+        logger.debug(
+            'flush',
+            commands=len(commands),
+            klass=self.__class__.__name__,
+        )
+
+        return len(commands)
+
+    def __len__(self) -> int:
+        return len(self._commands)
@@ -1,39 +1,81 @@
-from collections import defaultdict
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import itertools
 import structlog
-from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Type, Union
+import threading
+from typing import (
+    Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple, Type, Union
+)
+
+from settlers.engine.events import Event, EventBus, StateChanged
+from settlers.engine.handles import Handle
+from settlers.engine.timers import TimerWheel
 
 logger = structlog.get_logger('components')
 
 
 class Components:
-    __slots__ = ['components', 'component_classes', 'owner']
+    __slots__ = [
+        'archetype', 'components', 'component_classes', 'identifier',
+        'initialized', 'manager', 'owner', 'recycled'
+    ]
+
+    '''
+    Exposed components are wrapped in proxies refusing access to anything
+    not listed in `exposed_methods`. Optimized runs (`python -O`) skip the
+    check and expose the components themselves.
+    '''
+    expose_proxies: bool = __debug__
 
     def __init__(self, owner: object):
         self.owner = owner
-        self.components: List[Component] = []
+        self.archetype: Optional[Archetype] = None
+        self.components: Dict[Type[Component], Component] = {}
         self.component_classes: Set[Type[Component]] = set()
+        self.identifier: Optional[int] = None
+        self.initialized: bool = False
+        self.manager: Optional[ComponentManager] = None
+        self.recycled: Dict[Type[Component], Tuple[Component, object]] = {}
 
-    def initialize(self):
-        parents: List[Type[object]] = [self.owner.__class__]
-        parents.extend(self._find_parents(self.owner.__class__))
+    '''
+    Registers the owner and its components with the registry of the world
+    it was added to. Components added afterwards are registered as they come.
+    '''
+    def attach(self, manager: 'ComponentManager', identifier: int) -> None:
+        if self.manager is not None:
+            raise RuntimeError(
+                "{owner} already belongs to a world".format(
+                    owner=self.owner
+                )
+            )
 
-        for klass in parents:
-            if 'components' not in klass.__dict__:
-                continue
+        if manager.substitutions:
+            self._substitute(manager)
+
+        self.identifier = identifier
+        self.manager = manager
+
+        for component in self.components.values():
+            manager.register_component(identifier, component)
 
-            for component_definition in klass.components:
-                self.add(component_definition)
+        manager.update_archetype(self)
 
-    def _find_parents(self, klass: type) -> List[type]:
-        parents: List[type] = []
+    '''
+    Unregisters the owner from its world registry, the components stay
+    attached to the owner.
+    '''
+    def detach(self) -> None:
+        self.archetype = None
+        self.identifier = None
+        self.manager = None
 
-        for parent in klass.__bases__:
-            if parent == object:
-                break
-            parents.append(parent)
-            parents.extend(self._find_parents(parent))
+    def initialize(self):
+        for component_class, arguments in declared_components(
+            self.owner.__class__
+        ):
+            self.create(component_class, arguments)
 
-        return parents
+        self.initialized = True
 
     def add(self, component_definition: Any) -> None:
         logger.debug(
@@ -42,71 +84,151 @@ class Components:
             component=component_definition,
         )
 
-        component_instance: Optional[Component] = None
-
         if isinstance(component_definition, Component):
-            component_instance = component_definition
-        else:
-            component_class: Optional[Type[Component]] = None
-            arguments: Tuple = ()
-
-            if type(component_definition) is tuple:
-                component_class = component_definition[0]
-                arguments = component_definition[1:]
-            elif issubclass(component_definition, Component):
-                component_class = component_definition
-            else:
-                raise RuntimeError(
-                    "Invalid component declaration: {declaration}"
-                    .format(
-                        declaration=component_definition
-                    )
-                )
+            self._attach(component_definition)
+            return
+
+        component_class, arguments = parse_declaration(component_definition)
+        self.create(component_class, arguments)
+
+    '''
+    Adds a component from an already parsed declaration, see
+    `parse_declaration`.
+    '''
+    def create(self, component_class: type, arguments: Tuple) -> None:
+        if self.manager is not None:
+            component_class = self.manager.substitutions.get(
+                component_class, component_class
+            )
+
+        if self.recycled:
+            recycled = self.recycled.pop(component_class.component_type, None)
+            if (
+                recycled is not None
+                and recycled[0].__class__ is component_class
+            ):
+                component_instance, exposed = recycled
+                component_instance.__init__(self.owner, *arguments)
+                self._attach(component_instance, exposed)
+                return
+
+        self._attach(component_class(self.owner, *arguments))
+
+    '''
+    Puts the components of a despawned owner aside, `create` reinitializes
+    them in place (keeping their proxies) instead of building new ones when
+    the owner is reused. See `settlers.engine.prefabs.Prefab`.
+    '''
+    def recycle(self) -> None:
+        recycled: Dict[Type[Component], Tuple[Component, object]] = {}
 
-            if not component_class:
-                raise RuntimeError(
-                    "No component class found for {definition}".format(
-                        definition=component_definition
-                    )
+        for component_type, component in self.components.items():
+            exposure: Optional[Tuple[str, bool]] = _exposure(
+                component.__class__
+            )
+
+            if exposure is None:
+                recycled[component_type] = (component, None)
+                continue
+
+            exposed_as, multiple = exposure
+            if not multiple:
+                recycled[component_type] = (
+                    component, getattr(self.owner, exposed_as)
                 )
 
-            component_instance = component_class(
-                self.owner,
-                *arguments
+            if hasattr(self.owner, exposed_as):
+                delattr(self.owner, exposed_as)
+
+        self.components = {}
+        self.component_classes = set()
+        self.initialized = False
+        self.recycled = recycled
+
+    '''
+    Replaces the components created before the owner joined its world by the
+    alternative implementations its registry substitutes for them, see
+    `ComponentManager.substitutions`.
+    '''
+    def _substitute(self, manager: 'ComponentManager') -> None:
+        for component_type, component in list(self.components.items()):
+            substitute: Optional[type] = manager.substitutions.get(
+                component.__class__, None
+            )
+            if substitute is None:
+                continue
+
+            del self.components[component_type]
+
+            exposure: Optional[Tuple[str, bool]] = _exposure(
+                component.__class__
             )
+            if exposure is not None:
+                delattr(self.owner, exposure[0])
 
-        self.component_classes.add(component_instance.__class__)
+            self._attach(substitute.substituting(component, manager))
 
-        self.components.append(component_instance)
+    def _attach(
+        self, component_instance: 'Component', exposed: object = None
+    ) -> None:
+        component_type: Type[Component] = component_instance.component_type
+
+        if component_type in self.components:
+            raise RuntimeError(
+                "{owner} already has a {component}".format(
+                    owner=self.owner,
+                    component=component_type.__name__,
+                )
+            )
 
-        ComponentManager[component_instance.__class__].append(
-            component_instance
+        self.component_classes.add(component_type)
+        self.components[component_type] = component_instance
+
+        if self.manager is not None:
+            self.manager.add_component(self, component_instance)
+
+        exposure: Optional[Tuple[str, bool]] = _exposure(
+            component_instance.__class__
         )
+        if exposure is None:
+            return
 
-        if hasattr(component_instance, 'exposed_as'):
-            multiple = False
-            if hasattr(component_instance, 'expose_multiple'):
-                multiple = bool(getattr(component_instance, 'expose_multiple'))
-
-            exposed_as: str = component_instance.exposed_as
-            exposed_as_defined: bool = hasattr(self.owner, exposed_as)
-
-            if not multiple and exposed_as_defined:
-                raise RuntimeError(
-                    "{owner} already defined {exposed_as}".format(
-                        owner=self.owner,
-                        exposed_as=exposed_as
-                    )
+        exposed_as, multiple = exposure
+
+        if not multiple and hasattr(self.owner, exposed_as):
+            raise RuntimeError(
+                "{owner} already defined {exposed_as}".format(
+                    owner=self.owner,
+                    exposed_as=exposed_as
                 )
+            )
+
+        if exposed is None:
+            exposed = component_instance
+            if self.expose_proxies:
+                exposed = ComponentProxy.compiled(
+                    component_instance.__class__
+                )(self.owner, component_instance)
 
-            component_proxy = ComponentProxy(self.owner, component_instance)
-            setattr(self.owner, exposed_as, component_proxy)
+        setattr(self.owner, exposed_as, exposed)
 
     def remove(self, component):
-        self.components.remove(component)
-        self.component_classes = set([c.__class__ for c in self.components])
+        component_type: Type[Component] = component.component_type
+
+        if self.components.get(component_type, None) is not component:
+            raise ValueError(
+                "{component} is not a component of {owner}".format(
+                    component=component,
+                    owner=self.owner,
+                )
+            )
 
-        ComponentManager[component.__class__].remove(component)
+        del self.components[component_type]
+        self.component_classes.discard(component_type)
+
+        if self.manager is not None:
+            self.manager.remove_component(self, component)
+        component.detach()
 
         if hasattr(component, 'exposed_as'):
             exposed_as = component.exposed_as
@@ -126,8 +248,100 @@ class Components:
     def classes(self):
         return self.component_classes
 
+    def get(self, component_class: type) -> Optional['Component']:
+        return self.components.get(component_class, None)
+
     def __iter__(self):
-        return iter(self.components)
+        return iter(self.components.values())
+
+
+ComponentDeclaration = Tuple[type, Tuple]
+
+_declarations: Dict[type, Tuple[ComponentDeclaration, ...]] = {}
+_exposures: Dict[type, Optional[Tuple[str, bool]]] = {}
+
+
+'''
+Splits a component declaration, a component class or a
+`(component_class, *arguments)` tuple, into the class and its arguments.
+'''
+def parse_declaration(component_definition: Any) -> ComponentDeclaration:
+    component_class: Optional[Type[Component]] = None
+    arguments: Tuple = ()
+
+    if type(component_definition) is tuple:
+        component_class = component_definition[0]
+        arguments = component_definition[1:]
+    elif issubclass(component_definition, Component):
+        component_class = component_definition
+    else:
+        raise RuntimeError(
+            "Invalid component declaration: {declaration}"
+            .format(
+                declaration=component_definition
+            )
+        )
+
+    if not component_class:
+        raise RuntimeError(
+            "No component class found for {definition}".format(
+                definition=component_definition
+            )
+        )
+
+    return component_class, arguments
+
+
+'''
+Parsed `components` declarations of an entity class and of its parents, in
+the order `Components.initialize` adds them. They are resolved the first
+time a class is initialized, declarations are not expected to change at
+runtime.
+'''
+def declared_components(klass: type) -> Tuple[ComponentDeclaration, ...]:
+    declarations = _declarations.get(klass, None)
+    if declarations is not None:
+        return declarations
+
+    parents: List[type] = [klass]
+    parents.extend(_find_parents(klass))
+
+    declarations = tuple(
+        parse_declaration(component_definition)
+        for parent in parents
+        if 'components' in parent.__dict__
+        for component_definition in parent.components
+    )
+
+    _declarations[klass] = declarations
+    return declarations
+
+
+def _find_parents(klass: type) -> List[type]:
+    parents: List[type] = []
+
+    for parent in klass.__bases__:
+        if parent == object:
+            break
+        parents.append(parent)
+        parents.extend(_find_parents(parent))
+
+    return parents
+
+
+def _exposure(component_class: type) -> Optional[Tuple[str, bool]]:
+    if component_class in _exposures:
+        return _exposures[component_class]
+
+    exposure: Optional[Tuple[str, bool]] = None
+    if hasattr(component_class, 'exposed_as'):
+        exposure = (
+            component_class.exposed_as,
+            bool(getattr(component_class, 'expose_multiple', False))
+        )
+
+    _exposures[component_class] = exposure
+    return exposure
 
 
 class ComponentProxy:
@@ -136,11 +350,52 @@ class ComponentProxy:
         '__weakref__'
     ]
 
+    _bound_methods: Tuple[str, ...] = ()
+    _compiled: Dict[type, type] = {}
+
     def __init__(self, owner, component):
         self._component = component
         self._exposed_methods = component.exposed_methods
         self._owner = owner
 
+        for method in self._bound_methods:
+            setattr(self, method, getattr(component, method))
+
+    '''
+    Builds, once per component class, a proxy class where every exposed
+    method is bound into a slot at creation and every exposed attribute is
+    a descriptor, so exposed accesses never go through `__getattr__`.
+    '''
+    @classmethod
+    def compiled(cls, component_class: type) -> type:
+        proxy_class = cls._compiled.get(component_class, None)
+        if proxy_class is not None:
+            return proxy_class
+
+        exposed: Tuple[str, ...] = component_class.exposed_methods
+        if isinstance(exposed, str):
+            exposed = (exposed,)
+
+        methods: List[str] = []
+        namespace: Dict[str, Any] = {}
+
+        for name in exposed:
+            if callable(getattr(component_class, name, None)):
+                methods.append(name)
+            else:
+                namespace[name] = ExposedAttribute(name)
+
+        namespace['__slots__'] = tuple(methods)
+        namespace['_bound_methods'] = tuple(methods)
+
+        proxy_class = type(
+            "{component}Proxy".format(component=component_class.__name__),
+            (cls,),
+            namespace
+        )
+        cls._compiled[component_class] = proxy_class
+        return proxy_class
+
     '''
     Reveal the actual object being proxied.
 
@@ -177,10 +432,13 @@ class ComponentProxy:
             raise AttributeError(message)
 
     def __eq__(self, other) -> bool:
+        if other.__class__ is self.__class__:
+            return self._component == other._component
+
         if not other:
             return False
 
-        return self._component == other._component
+        return self._component == getattr(other, '_component', other)
 
     def __hasattr__(self, attr: str) -> bool:
         return attr in self._exposed_methods
@@ -193,20 +451,157 @@ class ComponentProxy:
         )
 
 
+'''
+Exposes a (non method) component attribute on a compiled proxy.
+'''
+class ExposedAttribute:
+    __slots__ = ('name',)
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __get__(self, proxy, proxy_class=None):
+        if proxy is None:
+            return self
+        return getattr(proxy._component, self.name)
+
+
 STATE_IDLE = 'idle'
 
 
 class Component:
-    __slots__ = ('_on_end_callbacks', 'owner', 'state', '__weakref__')
+    __slots__ = ('_on_end_callbacks', 'owner', 'state')
+
+    '''
+    The states a component class can be in. Declaring them makes the
+    registry keep the components of the class bucketed by state (see
+    `ComponentManager.in_state`) and rejects transitions to any other state.
+    '''
+    states: Tuple[str, ...] = ()
 
     def __init__(self, owner) -> None:
         self._on_end_callbacks: List[Callable] = []
         self.owner = owner
         self.state = STATE_IDLE
 
+    '''
+    Registers the class a component is stored and queried as. Subclasses
+    standing in for another component (see `ComponentManager.substitutions`)
+    declare `component_type` explicitly.
+    '''
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+
+        if 'component_type' not in cls.__dict__:
+            cls.component_type = cls
+
+    '''
+    Called once the component was removed from its owner, or its owner was
+    despawned.
+    '''
+    def detach(self) -> None:
+        pass
+
+    '''
+    Called when the owner is despawned, while it is still in the world.
+    Components release what they hold in other entities (worker slots,
+    assignments) so nothing keeps waiting on the owner.
+    '''
+    def despawn(self) -> None:
+        pass
+
+    '''
+    Mirrors `ComponentProxy.reveal` for components exposed without a proxy.
+    '''
+    def reveal(self, expected_type: Optional[type] = None) -> 'Component':
+        if expected_type:
+            assert isinstance(self, expected_type), \
+                "{component} should be {expected_type}, got {type}".format(
+                    component=self,
+                    expected_type=expected_type,
+                    type=self.__class__
+                )
+        return self
+
     def on_end(self, callback: Callable) -> None:
         self._on_end_callbacks.append(callback)
 
+    '''
+    Event bus of the world the owner belongs to, if any.
+    '''
+    def events(self) -> Optional[EventBus]:
+        components: Optional[Components] = getattr(
+            self.owner, 'components', None
+        )
+        if components is None or components.manager is None:
+            return None
+        return components.manager.events
+
+    def publish(self, event_type: type, *arguments) -> None:
+        events = self.events()
+        if events is not None:
+            events.publish(event_type, *arguments)
+
+    '''
+    Handle to `target`, an entity or a component of the world `target`
+    belongs to, see `settlers.engine.handles.Handle`.
+    '''
+    def handle(self, target: object) -> Handle:
+        owner = target.owner if isinstance(target, Component) else target
+        manager: Optional[ComponentManager] = owner.components.manager
+        if manager is None:
+            raise RuntimeError(
+                "{target} does not belong to a world".format(target=target)
+            )
+        return manager.handle(target)
+
+    '''
+    Target of `handle` in the world of this component, `None` when there is
+    no handle or it went stale.
+    '''
+    def resolve(self, handle: Optional[Handle]) -> Optional[object]:
+        if handle is None:
+            return None
+
+        manager: Optional[ComponentManager] = self.owner.components.manager
+        if manager is None:
+            return None
+        return manager.resolve(handle)
+
+    '''
+    Marks the component dormant: queries led by its class skip the owner
+    until it is woken up, by `wake`, at tick `until` or on the next
+    `wake_on` event concerning the owner. Systems put components to sleep
+    when processing them would be a no-op until something changes, or
+    until the timed work they started completes.
+    '''
+    def sleep(
+        self, until: Optional[int] = None,
+        wake_on: Optional[Type[Event]] = None
+    ) -> None:
+        components: Optional[Components] = getattr(
+            self.owner, 'components', None
+        )
+        if components is None or components.manager is None:
+            return
+        components.manager.sleep(components, self, until, wake_on)
+
+    def wake(self) -> None:
+        components: Optional[Components] = getattr(
+            self.owner, 'components', None
+        )
+        if components is None or components.manager is None:
+            return
+        components.manager.wake(components, self)
+
+    def is_dormant(self) -> bool:
+        components: Optional[Components] = getattr(
+            self.owner, 'components', None
+        )
+        if components is None or components.manager is None:
+            return False
+        return components.manager.is_dormant(components, self)
+
     def state_change(self, new_state: str) -> None:
         if self.state == new_state:
             return
@@ -219,8 +614,35 @@ class Component:
             component=self.__class__.__name__,
         )
 
+        self.set_state(new_state)
+
+    '''
+    Applies a state transition `state_change` decided on and publishes it.
+    '''
+    def set_state(self, new_state: str) -> None:
+        if self.states and new_state not in self.states:
+            raise RuntimeError(
+                "{state} is not a state of {component}".format(
+                    state=new_state,
+                    component=self.__class__.__name__,
+                )
+            )
+
+        old_state = self.state
         self.state = new_state
 
+        components: Optional[Components] = getattr(
+            self.owner, 'components', None
+        )
+        if components is None or components.manager is None:
+            return
+
+        if self.states:
+            components.manager.move_state(components, self, old_state)
+        components.manager.events.publish(
+            StateChanged, self, old_state, new_state
+        )
+
     def stop(self, skip_idle_state = False) -> None:
         if not skip_idle_state:
             self.state_change(STATE_IDLE) 
@@ -231,43 +653,759 @@ class Component:
         self._on_end_callbacks = []
 
 
-ComponentsType = Dict[Type[Component], List[Component]]
+Component.component_type = Component
 
 
 '''
+Sparse set of the components of one class, keyed by entity identifier.
+
+Components are kept packed in `dense`, `entities` holds the identifier owning
+the component at the same index and `sparse` maps identifiers back to their
+index, making membership, lookup, insertion and (swap) removal O(1).
+'''
+class SparseSet:
+    __slots__ = ('dense', 'entities', 'sparse')
+
+    def __init__(self) -> None:
+        self.dense: List[Component] = []
+        self.entities: List[int] = []
+        self.sparse: Dict[int, int] = {}
+
+    def add(self, identifier: int, component: 'Component') -> None:
+        if identifier in self.sparse:
+            raise RuntimeError(
+                "entity {identifier} already has a {component}".format(
+                    identifier=identifier,
+                    component=component.component_type.__name__,
+                )
+            )
+
+        self.sparse[identifier] = len(self.dense)
+        self.dense.append(component)
+        self.entities.append(identifier)
+
+    def get(self, identifier: int) -> Optional['Component']:
+        index = self.sparse.get(identifier, None)
+        if index is None:
+            return None
+        return self.dense[index]
+
+    def remove(self, identifier: int) -> Optional['Component']:
+        index = self.sparse.pop(identifier, None)
+        if index is None:
+            return None
+
+        component = self.dense[index]
+        last_component = self.dense.pop()
+        last_identifier = self.entities.pop()
+
+        if index < len(self.dense):
+            self.dense[index] = last_component
+            self.entities[index] = last_identifier
+            self.sparse[last_identifier] = index
+
+        return component
+
+    def __contains__(self, identifier: int) -> bool:
+        return identifier in self.sparse
+
+    def __iter__(self):
+        return iter(self.dense)
+
+    def __len__(self) -> int:
+        return len(self.dense)
+
+
+'''
+Groups every entity sharing the exact same set of component classes.
+
+Queries are matched against archetypes rather than entities, so an entity
+changing its component set only has to be diffed against the queries of its
+old and new archetypes.
+'''
+class Archetype:
+    __slots__ = ('component_classes', 'edges', 'entities', 'queries')
+
+    def __init__(self, component_classes: FrozenSet[type]) -> None:
+        self.component_classes: FrozenSet[type] = component_classes
+        self.edges: Dict[Tuple[type, bool], ArchetypeEdge] = {}
+        self.entities: Dict[int, None] = {}
+        self.queries: List[Query] = []
+
+    def __repr__(self) -> str:
+        return "<{klass} {classes} entities={entities}>".format(
+            klass=self.__class__.__name__,
+            classes=sorted(c.__name__ for c in self.component_classes),
+            entities=len(self.entities),
+        )
+
+
+'''
+Cached transition from an archetype when a component class is added or
+removed: the target archetype, the queries the entity stops matching and
+the queries it starts matching.
+'''
+ArchetypeEdge = Tuple[Archetype, List['Query'], List['Query']]
+
+
+'''
+`added` and `removed` callbacks of a `Query.observe` call.
+'''
+QueryObserver = Tuple[
+    Optional[Callable[[int, tuple], None]],
+    Optional[Callable[[int, tuple], None]]
+]
+
+
+'''
+Cached, incrementally maintained result of `entities_matching`.
+
+The matching entities are kept in the order they started matching. The list
+snapshots handed out to systems (`components`) only hold the active
+entities, the ones whose leading component (the one the system is driven
+by) is not dormant, lookups (`entities`, `select`) hold all of them. They
+are only rebuilt after a structural or dormancy change and are never
+mutated in place so systems can safely add or remove components while
+iterating.
+'''
+class Query:
+    __slots__ = (
+        'component_set', 'component_types', '_components', '_dormant',
+        '_entities', '_matches', '_observers', '_order', '_sequence'
+    )
+
+    def __init__(
+        self, component_types: Tuple[type, ...],
+        dormant: Optional[Dict[int, Set[type]]] = None
+    ) -> None:
+        self.component_types: Tuple[type, ...] = component_types
+        self.component_set: FrozenSet[type] = frozenset(component_types)
+        self._components: Optional[list] = None
+        self._dormant: Dict[int, Set[type]] = (
+            dormant if dormant is not None else {}
+        )
+        self._entities: Dict[int, Tuple[object, List[Component]]] = {}
+        self._matches: Optional[List[Tuple[object, List[Component]]]] = None
+        self._observers: List[QueryObserver] = []
+        self._order: Dict[int, int] = {}
+        self._sequence = itertools.count()
+
+    def matches(self, archetype: Archetype) -> bool:
+        return self.component_set <= archetype.component_classes
+
+    def insert(self, components: Components) -> None:
+        identifier = components.identifier
+        entry = (
+            components.owner,
+            [
+                components.get(component_class)
+                for component_class in self.component_types
+            ]
+        )
+
+        previous = self._entities.get(identifier, None)
+        self._entities[identifier] = entry
+        self._invalidate()
+
+        if previous is None:
+            self._order[identifier] = next(self._sequence)
+        elif all(
+            old is new for old, new in zip(previous[1], entry[1])
+        ):
+            return
+        else:
+            # One of the components was replaced.
+            for _added, removed in self._observers:
+                if removed is not None:
+                    removed(identifier, previous)
+
+        for added, _removed in self._observers:
+            if added is not None:
+                added(identifier, entry)
+
+    def discard(self, identifier: int) -> None:
+        entry = self._entities.pop(identifier, None)
+        if entry is None:
+            return
+
+        del self._order[identifier]
+        self._invalidate()
+
+        for _added, removed in self._observers:
+            if removed is not None:
+                removed(identifier, entry)
+
+    '''
+    Calls `added(identifier, entry)` for every entity matching from now on
+    (and those already matching) and `removed(identifier, entry)` for every
+    entity that stops matching, `entry` being `(owner, components)`.
+
+    Replacing one of the matched components counts as the entity stopping
+    and starting to match again. Callbacks run synchronously while the
+    structural change is applied, they must not add or remove components.
+    '''
+    def observe(
+        self, added: Optional[Callable[[int, tuple], None]] = None,
+        removed: Optional[Callable[[int, tuple], None]] = None
+    ) -> None:
+        self._observers.append((added, removed))
+
+        if added is None:
+            return
+
+        for identifier, entry in list(self._entities.items()):
+            added(identifier, entry)
+
+    '''
+    Entries of `identifiers` which match, in query order.
+    '''
+    def select(self, identifiers) -> List[Tuple[object, List[Component]]]:
+        order = self._order
+        matching = sorted(
+            (identifier for identifier in identifiers if identifier in order),
+            key=order.__getitem__
+        )
+
+        return [self._entities[identifier] for identifier in matching]
+
+    def components(self) -> list:
+        if self._components is None:
+            if len(self.component_types) > 1:
+                self._components = [
+                    entity_components
+                    for _owner, entity_components in self.active()
+                ]
+            else:
+                self._components = [
+                    entity_components[0]
+                    for _owner, entity_components in self.active()
+                ]
+        return self._components
+
+    def entities(self) -> List[Tuple[object, List[Component]]]:
+        if self._matches is None:
+            self._matches = list(self._entities.values())
+        return self._matches
+
+    def active(self):
+        dormant = self._dormant
+        if not dormant or not self.component_types:
+            return self._entities.values()
+
+        leading = self.component_types[0]
+        return [
+            entry for identifier, entry in self._entities.items()
+            if identifier not in dormant
+            or leading not in dormant[identifier]
+        ]
+
+    def _invalidate(self) -> None:
+        self._components = None
+        self._matches = None
+
+    def __len__(self) -> int:
+        return len(self._entities)
+
+    def __repr__(self) -> str:
+        return "<{klass} {types} entities={entities}>".format(
+            klass=self.__class__.__name__,
+            types=[c.__name__ for c in self.component_types],
+            entities=len(self._entities),
+        )
+
+
+'''
+Component registry of a single `World`.
+
 Allows the ComponentManager to be interfaced with `[ComponentClass]` syntax.
+
+`substitutions` maps component classes to alternative implementations
+instantiated in their place for the entities of this world, components
+created before an entity joined it are converted through
+`substitute.substituting(component, manager)`. `columns` is the columnar
+store those implementations keep their values in, see
+`settlers.engine.components.columnar`.
 '''
-class ComponentManagerMeta(type):
-    _components: ComponentsType = defaultdict(list)
+class ComponentManager:
+    __slots__ = (
+        'columns', 'events', 'substitutions', '_archetypes', '_deferred',
+        '_dormancy_lock', '_dormant', '_entities', '_free', '_generations',
+        '_queries', '_sleep_until', '_states', '_storages', '_timers',
+        '_wake_on'
+    )
+
+    def __init__(self) -> None:
+        self.columns: Optional[object] = None
+        self.events: EventBus = EventBus()
+        self.substitutions: Dict[type, type] = {}
+        self._archetypes: Dict[FrozenSet[type], Archetype] = {}
+        self._deferred: Optional[Dict[int, Components]] = None
+        self._dormancy_lock = threading.Lock()
+        self._dormant: Dict[int, Set[type]] = {}
+        self._entities: List[Optional[Components]] = []
+        self._free: deque = deque()
+        self._generations: List[int] = []
+        self._queries: Dict[Tuple[type, ...], Query] = {}
+        self._sleep_until: Dict[Tuple[int, type], int] = {}
+        self._states: Dict[type, Dict[str, Dict[int, Component]]] = {}
+        self._storages: Dict[type, SparseSet] = defaultdict(SparseSet)
+        self._timers: TimerWheel = TimerWheel()
+        self._wake_on: Dict[type, Dict[object, List[Component]]] = {}
+
+    def __getitem__(self, component_class: type) -> List[Component]:
+        return self._storages[component_class].dense
 
-    def __getitem__(self, component_class: type) -> list:
-        return self._components[component_class]
+    '''
+    Hands out a compact identifier and registers the entity components
+    under it. Identifiers of removed entities are reused, oldest first, with
+    their generation bumped so handles to the previous holder go stale.
+    '''
+    def add_entity(self, components: Components) -> int:
+        if self._free:
+            identifier = self._free.popleft()
+            self._entities[identifier] = components
+        else:
+            identifier = len(self._entities)
+            self._entities.append(components)
+            self._generations.append(0)
 
+        components.attach(self, identifier)
+        return identifier
 
-class ComponentManager(metaclass=ComponentManagerMeta):
-    _components: ComponentsType = defaultdict(list)
-    _entities: Dict[int, List[Component]] = defaultdict(list)
+    '''
+    Handle to `target`, an entity or a component registered with this
+    manager.
+    '''
+    def handle(self, target: object) -> Handle:
+        component_type: Optional[type] = None
+        if isinstance(target, Component):
+            component_type = target.component_type
+            target = target.owner
+
+        components: Optional[Components] = getattr(target, 'components', None)
+        if components is None or components.manager is not self:
+            raise RuntimeError(
+                "{target} does not belong to this world".format(
+                    target=target
+                )
+            )
 
-    @classmethod
-    def entity(
-        cls, identifier: int
-    ) -> Optional[List[Component]]:
-        return cls._entities.get(identifier, None)
+        identifier: int = components.identifier
+        return Handle(
+            identifier, self._generations[identifier], component_type
+        )
 
-    @classmethod
-    def entities_matching(cls, selection: List[type]) -> list:
-        entities: List[Tuple[object, List[Component]]] = []
-        len_selection = len(selection)
-        components: Dict[object, List[Component]] = defaultdict(list)
+    '''
+    Entity or component `handle` points to, `None` once the entity was
+    removed or no longer has a component of the handle type.
+    '''
+    def resolve(self, handle: Handle) -> Optional[object]:
+        index, generation, component_type = handle
+        if self._generations[index] != generation:
+            return None
+
+        components: Optional[Components] = self._entities[index]
+        if components is None:
+            return None
+
+        if component_type is None:
+            return components.owner
+        return components.components.get(component_type, None)
+
+    def entity(self, identifier: int) -> Optional[Components]:
+        if 0 <= identifier < len(self._entities):
+            return self._entities[identifier]
+        return None
+
+    def owner(self, identifier: int) -> Optional[object]:
+        components = self.entity(identifier)
+        if components is None:
+            return None
+        return components.owner
+
+    '''
+    Unregisters an entity and all its components in O(components).
+    '''
+    def remove_entity(self, components: Components) -> None:
+        identifier = components.identifier
+        if identifier is None or components.manager is not self:
+            return
 
-        for component_class in selection:
-            for component in cls._components[component_class]:
-                components[component.owner].append(component)
+        if self._deferred is not None:
+            self._deferred.pop(identifier, None)
 
-        for entity, entity_components in components.items():
-            if not len(entity_components) == len_selection:
-                continue
-            entities.append((entity, entity_components))
-        return entities
+        self._dormant.pop(identifier, None)
+
+        for component_type in components.component_classes:
+            self._sleep_until.pop((identifier, component_type), None)
+            self._storages[component_type].remove(identifier)
+
+            buckets = self._states.get(component_type, None)
+            if buckets is not None:
+                for bucket in buckets.values():
+                    bucket.pop(identifier, None)
+
+        archetype: Optional[Archetype] = components.archetype
+        if archetype is not None:
+            del archetype.entities[identifier]
+
+            for query in archetype.queries:
+                query.discard(identifier)
+
+        for waiting in self._wake_on.values():
+            waiting.pop(components.owner, None)
+
+        self._entities[identifier] = None
+        self._generations[identifier] += 1
+        self._free.append(identifier)
+        components.detach()
+
+    def add_component(
+        self, components: Components, component: Component
+    ) -> None:
+        component_type: Type[Component] = component.component_type
+
+        self.register_component(components.identifier, component)
+
+        if self._deferred is not None:
+            self._deferred[components.identifier] = components
+            return
+
+        self._transition(components, component_type, True)
+
+    def remove_component(
+        self, components: Components, component: Component
+    ) -> None:
+        component_type: Type[Component] = component.component_type
+
+        self._storages[component_type].remove(components.identifier)
+
+        if component.states:
+            self._states[component_type][component.state].pop(
+                components.identifier, None
+            )
+
+        self._sleep_until.pop((components.identifier, component_type), None)
+
+        dormant = self._dormant.get(components.identifier, None)
+        if dormant is not None:
+            dormant.discard(component_type)
+            if not dormant:
+                del self._dormant[components.identifier]
+
+        if self._deferred is not None:
+            self._deferred[components.identifier] = components
+            return
+
+        self._transition(components, component_type, False)
+
+    '''
+    Defers archetype and query updates of component additions and removals
+    made inside the block, each changed entity is then moved once.
+    '''
+    @contextmanager
+    def batch(self):
+        if self._deferred is not None:
+            yield
+            return
+
+        self._deferred = {}
+        try:
+            yield
+        finally:
+            deferred, self._deferred = self._deferred, None
+
+            for components in deferred.values():
+                if components.manager is self:
+                    self.update_archetype(components, refresh=True)
+
+    def register_component(
+        self, identifier: int, component: Component
+    ) -> None:
+        self._storages[component.component_type].add(identifier, component)
+
+        if component.states:
+            self._buckets(component)[component.state][identifier] = component
+
+    def _buckets(
+        self, component: Component
+    ) -> Dict[str, Dict[int, Component]]:
+        component_type: Type[Component] = component.component_type
+
+        buckets = self._states.get(component_type, None)
+        if buckets is None:
+            buckets = self._states[component_type] = {
+                state: {} for state in component.states
+            }
+        return buckets
+
+    '''
+    Moves a component to the bucket of its new state in O(1).
+    '''
+    def move_state(
+        self, components: Components, component: Component, old_state: str
+    ) -> None:
+        buckets = self._buckets(component)
+        identifier = components.identifier
+
+        buckets[old_state].pop(identifier, None)
+        buckets[component.state][identifier] = component
+
+    '''
+    Components of a class declaring its `states` currently in `state`, in
+    the order they entered it.
+    '''
+    def in_state(self, component_class: type, state: str) -> List[Component]:
+        buckets = self._states.get(component_class, None)
+        if buckets is None:
+            return []
+        return list(buckets.get(state, {}).values())
+
+    def in_state_identifiers(self, component_class: type, state: str):
+        buckets = self._states.get(component_class, None)
+        if buckets is None:
+            return ()
+        return buckets.get(state, {}).keys()
+
+    def storage(self, component_class: type) -> SparseSet:
+        return self._storages[component_class]
+
+    def registered_components(self) -> List[Component]:
+        return [
+            component
+            for storage in list(self._storages.values())
+            for component in storage.dense
+        ]
+
+    def entities_matching(self, selection: List[type]) -> list:
+        return self.query(selection).entities()
+
+    def query(self, selection: List[type]) -> Query:
+        key = tuple(selection)
+        query = self._queries.get(key, None)
+        if query is not None:
+            return query
+
+        query = Query(key, self._dormant)
+        self._queries[key] = query
+
+        for archetype in self._archetypes.values():
+            archetype.edges.clear()
+
+            if query.matches(archetype):
+                archetype.queries.append(query)
+
+        # Seed in registration order of the leading component so the
+        # iteration order matches what systems have always observed.
+        if key:
+            for identifier in self._storages[key[0]].entities:
+                components: Components = self._entities[identifier]
+                if components.archetype and query.matches(
+                    components.archetype
+                ):
+                    query.insert(components)
+
+        return query
+
+    def sleep(
+        self, components: Components, component: Component,
+        until: Optional[int] = None,
+        wake_on: Optional[Type[Event]] = None
+    ) -> None:
+        component_type: Type[Component] = component.component_type
+
+        with self._dormancy_lock:
+            dormant = self._dormant.setdefault(components.identifier, set())
+            if component_type not in dormant:
+                dormant.add(component_type)
+                self._dormancy_changed(components, component_type)
+
+            if until is not None:
+                key = (components.identifier, component_type)
+                self._sleep_until[key] = until
+                self._timers.schedule(until, component)
+
+            if wake_on is not None:
+                waiting = self._wake_on.get(wake_on, None)
+                if waiting is None:
+                    waiting = self._wake_on[wake_on] = {}
+                    self.events.subscribe(wake_on, self._wake_owner)
+
+                sleepers = waiting.setdefault(components.owner, [])
+                if not any(sleeper is component for sleeper in sleepers):
+                    sleepers.append(component)
+
+    def wake(self, components: Components, component: Component) -> None:
+        with self._dormancy_lock:
+            self._wake(components, component)
+
+    def _wake(self, components: Components, component: Component) -> None:
+        identifier = components.identifier
+        component_type: Type[Component] = component.component_type
+
+        dormant = self._dormant.get(identifier, None)
+        if dormant is None or component_type not in dormant:
+            return
+
+        self._sleep_until.pop((identifier, component_type), None)
+        dormant.discard(component_type)
+        if not dormant:
+            del self._dormant[identifier]
+
+        self._dormancy_changed(components, component_type)
+
+    def is_dormant(self, components: Components, component: Component) -> bool:
+        dormant = self._dormant.get(components.identifier, None)
+        return dormant is not None and component.component_type in dormant
+
+    '''
+    Tick the world is processing, as last given to `wake_due`.
+    '''
+    @property
+    def now(self) -> int:
+        return self._timers.now
+
+    '''
+    Moves to `tick` and wakes the components whose `sleep(until=...)` tick
+    was reached. Timers of components woken (or put back to sleep) since
+    they were set are ignored.
+    '''
+    def wake_due(self, tick: int) -> None:
+        due: List[Component] = self._timers.advance(tick)
+        if not due:
+            return
+
+        sleep_until = self._sleep_until
+
+        with self._dormancy_lock:
+            for component in due:
+                components = getattr(component.owner, 'components', None)
+                if components is None or components.manager is not self:
+                    continue
+
+                until = sleep_until.get(
+                    (components.identifier, component.component_type), None
+                )
+                if until is not None and until <= tick:
+                    self._wake(components, component)
+
+    '''
+    Earliest tick a `sleep(until=...)` timer is set for, `None` without
+    any. Timers made stale by an earlier wake can make it earlier than
+    needed, never later.
+    '''
+    def next_wakeup(self) -> Optional[int]:
+        return self._timers.next_tick()
+
+    def _wake_owner(self, event: Event) -> None:
+        waiting = self._wake_on.get(event.__class__, None)
+        if not waiting:
+            return
+
+        sleepers = waiting.pop(event.owner, None)
+        if not sleepers:
+            return
+
+        with self._dormancy_lock:
+            for component in sleepers:
+                components = component.owner.components
+                if components.manager is self:
+                    self._wake(components, component)
+
+    def _dormancy_changed(
+        self, components: Components, component_type: type
+    ) -> None:
+        archetype: Optional[Archetype] = components.archetype
+        if archetype is None:
+            return
+
+        for query in archetype.queries:
+            if query.component_types[0] is component_type:
+                query._invalidate()
+
+    def archetype(self, component_classes: Set[type]) -> Archetype:
+        key = frozenset(component_classes)
+        archetype = self._archetypes.get(key, None)
+        if archetype is not None:
+            return archetype
+
+        archetype = Archetype(key)
+        archetype.queries = [
+            query for query in self._queries.values()
+            if query.matches(archetype)
+        ]
+        self._archetypes[key] = archetype
+        return archetype
+
+    '''
+    Moves an entity to the archetype of its current component classes.
+    `refresh` also updates the queries it keeps matching, for when one of
+    their components may have been replaced.
+    '''
+    def update_archetype(
+        self, components: Components, refresh: bool = False
+    ) -> None:
+        identifier = components.identifier
+        previous: Optional[Archetype] = components.archetype
+        current: Archetype = self.archetype(components.component_classes)
+
+        if previous is current and not refresh:
+            return
+
+        retained: Set[Query] = set()
+
+        if previous is not None:
+            del previous.entities[identifier]
+
+            retained = set(current.queries).intersection(previous.queries)
+
+            for query in previous.queries:
+                if query not in retained:
+                    query.discard(identifier)
+
+        current.entities[identifier] = None
+        components.archetype = current
+
+        for query in current.queries:
+            if refresh or query not in retained:
+                query.insert(components)
+
+    '''
+    Moves an entity along the cached archetype edge for a single component
+    class change instead of diffing the query lists.
+    '''
+    def _transition(
+        self, components: Components, component_type: type, added: bool
+    ) -> None:
+        previous: Optional[Archetype] = components.archetype
+        if previous is None:
+            self.update_archetype(components)
+            return
+
+        key = (component_type, added)
+        edge: Optional[ArchetypeEdge] = previous.edges.get(key, None)
+
+        if edge is None:
+            current = self.archetype(components.component_classes)
+            previous_queries = set(previous.queries)
+            current_queries = set(current.queries)
+
+            edge = (
+                current,
+                [q for q in previous.queries if q not in current_queries],
+                [q for q in current.queries if q not in previous_queries],
+            )
+            previous.edges[key] = edge
+
+        current, leaving, entering = edge
+        identifier = components.identifier
+
+        del previous.entities[identifier]
+        for query in leaving:
+            query.discard(identifier)
 
+        current.entities[identifier] = None
+        components.archetype = current
 
+        for query in entering:
+            query.insert(components)
@@ -0,0 +1,376 @@
+import structlog
+import threading
+from typing import Dict, List, Optional
+import weakref
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - numpy is optional
+    numpy = None
+
+from . import Component, ComponentManager
+from .movement import Travel, TravelSystem, Velocity
+from ..entities.position import Position
+from ..handles import Handle
+
+logger = structlog.get_logger('engine.columnar')
+
+NO_TARGET: int = -1
+
+
+'''
+Struct-of-arrays storage for the movement components.
+
+Every entity owning a columnar `Position`, `Velocity` or `Travel` gets a dense
+slot, its values live at that index in the `x`, `y`, `speed` and `target`
+arrays. `target` holds the slot of the entity a `Travel` is heading to.
+'''
+class MovementColumns:
+    __slots__ = (
+        'capacity', 'speed', 'target', 'x', 'y',
+        '_finalizers', '_free', '_lock', '_references', '_size', '_slots'
+    )
+
+    def __init__(self, capacity: int = 1024) -> None:
+        if numpy is None:
+            raise RuntimeError('columnar movement storage requires numpy')
+
+        self.capacity: int = capacity
+        self.x = numpy.zeros(capacity, dtype=numpy.int64)
+        self.y = numpy.zeros(capacity, dtype=numpy.int64)
+        self.speed = numpy.zeros(capacity, dtype=numpy.float64)
+        self.target = numpy.full(capacity, NO_TARGET, dtype=numpy.int64)
+
+        self._finalizers: Dict[int, weakref.finalize] = {}
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        self._references: List[int] = [0] * capacity
+        self._size: int = 0
+        # Owners are only weakly referenced so a store shared by several
+        # worlds never keeps a discarded world's entities alive.
+        self._slots: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+    def acquire(self, owner: object) -> int:
+        with self._lock:
+            slot = self._slots.get(owner, None)
+
+            if slot is None:
+                if self._free:
+                    slot = self._free.pop()
+                else:
+                    if self._size == self.capacity:
+                        self._grow()
+                    slot = self._size
+                    self._size += 1
+
+                self._slots[owner] = slot
+                self._finalizers[slot] = weakref.finalize(
+                    owner, self._recycle, slot
+                )
+
+            self._references[slot] += 1
+            return slot
+
+    def release(self, owner: object) -> None:
+        with self._lock:
+            slot = self._slots.get(owner, None)
+            if slot is None:
+                return
+
+            self._references[slot] -= 1
+            if self._references[slot] > 0:
+                return
+
+            del self._slots[owner]
+            self._finalizers.pop(slot).detach()
+            self._clear(slot)
+
+    def _recycle(self, slot: int) -> None:
+        with self._lock:
+            self._finalizers.pop(slot, None)
+            self._clear(slot)
+
+    def _clear(self, slot: int) -> None:
+        self.x[slot] = 0
+        self.y[slot] = 0
+        self.speed[slot] = 0
+        self.target[slot] = NO_TARGET
+        self._references[slot] = 0
+        self._free.append(slot)
+
+    def slot_of(self, owner: object) -> int:
+        return self._slots.get(owner, NO_TARGET)
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _grow(self) -> None:
+        capacity = self.capacity * 2
+
+        logger.debug(
+            '_grow',
+            klass=self.__class__.__name__,
+            old_capacity=self.capacity,
+            new_capacity=capacity,
+        )
+
+        for name, fill in (
+            ('x', 0), ('y', 0), ('speed', 0), ('target', NO_TARGET)
+        ):
+            column = getattr(self, name)
+            grown = numpy.full(capacity, fill, dtype=column.dtype)
+            grown[:self.capacity] = column
+            setattr(self, name, grown)
+
+        self._references.extend([0] * (capacity - self.capacity))
+        self.capacity = capacity
+
+
+'''
+Binds a columnar component to the `MovementColumns` of the world its owner
+belongs to.
+'''
+class ColumnarComponent:
+    __slots__ = ()
+
+    def bind(self, owner: object, manager: ComponentManager) -> None:
+        if manager is None or manager.columns is None:
+            raise RuntimeError('columnar movement storage is not enabled')
+
+        self._columns: MovementColumns = manager.columns
+        self._slot: int = self._columns.acquire(owner)
+
+    '''
+    Builds the columnar counterpart of `component`, created before its owner
+    joined the world of `manager`, carrying over its attribute values.
+    '''
+    @classmethod
+    def substituting(
+        cls, component: Component, manager: ComponentManager
+    ) -> Component:
+        substitute = cls.__new__(cls)
+        substitute.bind(component.owner, manager)
+
+        for klass in reversed(component.__class__.__mro__):
+            slots = klass.__dict__.get('__slots__', ())
+            for name in (slots,) if isinstance(slots, str) else slots:
+                if hasattr(component, name):
+                    setattr(substitute, name, getattr(component, name))
+
+        return substitute
+
+    def detach(self) -> None:
+        self._columns.release(self.owner)
+
+
+class ColumnarPosition(ColumnarComponent, Position):
+    __slots__ = ('_columns', '_slot')
+
+    component_type = Position
+
+    def __init__(self, owner, x: int, y: int):
+        Component.__init__(self, owner)
+
+        self.bind(owner, owner.components.manager)
+
+        self.x = x
+        self.y = y
+
+    @property
+    def x(self) -> int:
+        return int(self._columns.x[self._slot])
+
+    @x.setter
+    def x(self, value: int) -> None:
+        self._columns.x[self._slot] = value
+
+    @property
+    def y(self) -> int:
+        return int(self._columns.y[self._slot])
+
+    @y.setter
+    def y(self, value: int) -> None:
+        self._columns.y[self._slot] = value
+
+
+class ColumnarVelocity(ColumnarComponent, Velocity):
+    __slots__ = ('_columns', '_slot')
+
+    component_type = Velocity
+
+    def __init__(self, owner, speed: int = 1):
+        Component.__init__(self, owner)
+
+        self.bind(owner, owner.components.manager)
+
+        self.speed = speed
+
+    @property
+    def speed(self) -> float:
+        return float(self._columns.speed[self._slot])
+
+    @speed.setter
+    def speed(self, value: float) -> None:
+        self._columns.speed[self._slot] = value
+
+
+class ColumnarTravel(ColumnarComponent, Travel):
+    __slots__ = ('_columns', '_destination', '_slot')
+
+    component_type = Travel
+
+    def __init__(self, owner) -> None:
+        self.bind(owner, owner.components.manager)
+
+        super().__init__(owner)
+
+    @property
+    def destination(self) -> Optional[Handle]:
+        return self._destination
+
+    @destination.setter
+    def destination(self, value: Optional[Handle]) -> None:
+        self._destination = value
+
+        target = NO_TARGET
+        if value is not None:
+            destination = self.resolve(value)
+            if destination is not None:
+                target = self._columns.slot_of(destination)
+
+        self._columns.target[self._slot] = target
+
+
+'''
+Batched `TravelSystem`: the state transitions are still resolved per entity,
+the movement of every columnar traveller of `world` is then computed in a
+single NumPy step against the positions at the start of the tick. Rounding
+follows `round()` (half to even) so results match the scalar path.
+'''
+class ColumnarTravelSystem(TravelSystem):
+    def __init__(self, world) -> None:
+        super().__init__()
+
+        self.columns: Optional[MovementColumns] = (
+            world.component_manager.columns
+        )
+
+    def process(self, tick: int, entities: List[List[Component]]) -> None:
+        movers: List[ColumnarTravel] = []
+
+        for travel, position, velocity in entities:
+            destination = self.moving_destination(travel)
+            if not destination:
+                continue
+
+            if (
+                isinstance(position, ColumnarPosition)
+                and isinstance(velocity, ColumnarVelocity)
+                and isinstance(travel, ColumnarTravel)
+                and travel._columns is self.columns
+            ):
+                movers.append(travel)
+                continue
+
+            if destination.position == travel.owner.position:
+                self.arrive(travel, destination)
+                continue
+
+            self.step(
+                position,
+                velocity,
+                destination.position.reveal(Position)
+            )
+
+        if movers:
+            self.step_columns(self.columns, movers)
+
+    def step_columns(
+        self, columns: MovementColumns, movers: List[ColumnarTravel]
+    ) -> None:
+        slots = numpy.fromiter(
+            (travel._slot for travel in movers),
+            dtype=numpy.int64,
+            count=len(movers)
+        )
+        targets = columns.target[slots]
+
+        # Destinations without a columnar position take the scalar path.
+        for index in numpy.flatnonzero(targets == NO_TARGET):
+            travel = movers[index]
+            destination = travel.resolve(travel.destination)
+
+            if destination.position == travel.owner.position:
+                self.arrive(travel, destination)
+                continue
+
+            self.step(
+                travel.owner.position.reveal(Position),
+                travel.owner.components.get(Velocity),
+                destination.position.reveal(Position)
+            )
+
+        batched = targets != NO_TARGET
+        slots = slots[batched]
+        targets = targets[batched]
+        travels = [
+            travel for travel, keep in zip(movers, batched) if keep
+        ]
+
+        x = columns.x[slots]
+        y = columns.y[slots]
+        target_x = columns.x[targets]
+        target_y = columns.y[targets]
+        speed = columns.speed[slots]
+
+        delta_x = (target_x - x).astype(numpy.float64)
+        delta_y = (target_y - y).astype(numpy.float64)
+
+        arrived = (delta_x == 0) & (delta_y == 0)
+        distance = numpy.sqrt(delta_x * delta_x + delta_y * delta_y)
+        far = distance > speed
+
+        ratio = numpy.divide(
+            speed, distance, out=numpy.zeros_like(distance), where=far
+        )
+
+        new_x = numpy.where(far, numpy.rint(ratio * delta_x + x), target_x)
+        new_y = numpy.where(far, numpy.rint(ratio * delta_y + y), target_y)
+
+        moving = ~arrived
+        columns.x[slots[moving]] = new_x[moving]
+        columns.y[slots[moving]] = new_y[moving]
+
+        for index in numpy.flatnonzero(arrived):
+            travel = travels[index]
+            self.arrive(travel, travel.resolve(travel.destination))
+
+
+COLUMNAR_COMPONENTS: Dict[type, type] = {
+    Position: ColumnarPosition,
+    Travel: ColumnarTravel,
+    Velocity: ColumnarVelocity,
+}
+
+
+'''
+Stores every `Position`, `Velocity` and `Travel` of the entities joining
+`world` from now on in `columns` (a new store when omitted). Entities
+already in the world keep their current storage.
+'''
+def enable(
+    world, columns: Optional[MovementColumns] = None
+) -> MovementColumns:
+    manager: ComponentManager = world.component_manager
+
+    manager.columns = columns or MovementColumns()
+    manager.substitutions.update(COLUMNAR_COMPONENTS)
+    return manager.columns
+
+
+def disable(world) -> None:
+    manager: ComponentManager = world.component_manager
+
+    manager.columns = None
+    for component_class in COLUMNAR_COMPONENTS:
+        manager.substitutions.pop(component_class, None)
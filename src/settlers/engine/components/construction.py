@@ -1,10 +1,14 @@
 import structlog
-from typing import Dict, List, Tuple, Type
-import weakref
+from typing import Dict, List, Optional, Tuple, Type
 from settlers.engine.entities.entity import Entity
+from settlers.engine.entities.position import Position
 from settlers.engine.entities.resources import Resource
+from settlers.engine.entities.resources.resource_storage import ResourceStorage
+from settlers.engine.events import WorkerSlotFreed, WorkerSlotTaken
+from settlers.engine.handles import Handle
 from settlers.engine.components import Component
 from settlers.engine.components.worker import Worker
+from settlers.engine.world import World
 
 STATE_NEW = 'new'
 STATE_IN_PROGRESS = 'in_progress'
@@ -83,6 +87,7 @@ class Construction(Component):
         'spec',
         'state',
         'ticks',
+        'worked_at',
         'workers'
     )
 
@@ -91,10 +96,12 @@ class Construction(Component):
 
     def __init__(self, owner: Entity, spec: ConstructionSpec) -> None:
         super().__init__(owner)
-        self.workers: List[weakref.ReferenceType[ConstructionWorker]] = []
+        self.workers: List[Handle] = []
         self.spec = spec
         self.state = STATE_NEW
+        # Work done until `worked_at`, one tick per worker per tick.
         self.ticks = 0
+        self.worked_at: int = 0
 
     def add_worker(self, worker: ConstructionWorker) -> bool:
         if not self.can_add_worker():
@@ -106,18 +113,78 @@ class Construction(Component):
             if not worker.abilities.intersection(possible_abilities):
                 raise RuntimeError('cannot build')
 
-        self.workers.append(weakref.ref(worker))
+        self._workforce_changing()
+        self.workers.append(self.handle(worker))
+        self.publish(WorkerSlotTaken, self, worker)
         return True
 
     def can_add_worker(self) -> bool:
         return len(self.workers) < self.spec.max_workers
 
+    def remove_worker(self, worker: ConstructionWorker) -> bool:
+        for reference in self.workers:
+            if self.resolve(reference) is worker:
+                self._workforce_changing()
+                self.workers.remove(reference)
+                self.publish(WorkerSlotFreed, self, worker)
+                return True
+        return False
+
+    def despawn(self) -> None:
+        for handle in list(self.workers):
+            worker: Optional[ConstructionWorker] = self.resolve(handle)
+            if worker:
+                worker.stop()
+
     def construction_resources(self) -> ConstructionResourcesType:
         return self.spec.construction_resources
 
     def is_completed(self) -> bool:
         return self.ticks >= self.spec.construction_ticks
 
+    '''
+    Starts counting the work of the current workers after `tick`.
+    '''
+    def start_work(self, tick: int) -> None:
+        self.worked_at = tick
+        self.state_change(STATE_IN_PROGRESS)
+
+    '''
+    Adds the work done by the current workers up to `tick`.
+    '''
+    def work(self, tick: int) -> None:
+        if tick <= self.worked_at:
+            return
+
+        self.ticks += (tick - self.worked_at) * len(self.workers)
+        self.worked_at = tick
+
+    '''
+    Tick the construction completes at if its workers stay.
+    '''
+    def completes_at(self) -> Optional[int]:
+        if not self.workers:
+            return None
+
+        remaining = max(0, self.spec.construction_ticks - self.ticks)
+        return self.worked_at + -(-remaining // len(self.workers))
+
+    '''
+    Workers joining or leaving count from the tick they do, the work of the
+    previous ones is accounted for up to it and the system wakes the
+    construction up to plan its completion again.
+    '''
+    def _workforce_changing(self) -> None:
+        if self.state != STATE_IN_PROGRESS:
+            return
+
+        components = getattr(self.owner, 'components', None)
+        if components is None or components.manager is None:
+            return
+
+        self.work(components.manager.now - 1)
+        self.wake()
+
     def required_abilities(self) -> set:
         return self.spec.construction_abilities
 
@@ -132,7 +199,7 @@ class Construction(Component):
             old_state=self.state,
             new_state=new_state
         )
-        self.state = new_state
+        self.set_state(new_state)
 
     def __del__(self):
         logger.debug(
@@ -154,8 +221,15 @@ class ConstructionSystem:
         Construction,
     )
 
-    def __init__(self) -> None:
+    reads: tuple = (Position,)
+    writes: tuple = (
+        Construction, ConstructionWorker, 'Renderable', ResourceStorage,
+        'VillagerAi'
+    )
+
+    def __init__(self, world: World) -> None:
         self._last_checked_new: int = 0
+        self.world: World = world
 
     def process(self, tick: int,  constructions: List[Construction]) -> None:
         self._last_checked_new = self._last_checked_new or 0
@@ -163,6 +237,8 @@ class ConstructionSystem:
         for construction in constructions:
             if construction.state == STATE_NEW:
                 if (tick - self._last_checked_new) < 1000:
+                    # Until the next check of a new construction.
+                    construction.sleep(until=self._last_checked_new + 1000)
                     continue
 
                 self._last_checked_new = tick
@@ -173,20 +249,24 @@ class ConstructionSystem:
                         system=self.__class__.__name__,
                         construction=construction,
                     )
+                    construction.sleep(until=tick + 1000)
                     continue
 
                 if not self.can_build(construction):
+                    construction.sleep(until=tick + 1000)
                     continue
 
-                construction.state_change(STATE_IN_PROGRESS)
+                construction.start_work(tick)
                 continue
 
             if construction.state == STATE_IN_PROGRESS:
+                construction.work(tick)
+
                 if not construction.workers:
+                    # Until a worker joins.
+                    construction.sleep()
                     continue
 
-                construction.ticks += len(construction.workers)
-
                 logger.debug(
                     'process',
                     ticks=construction.ticks,
@@ -196,6 +276,7 @@ class ConstructionSystem:
                 )
 
                 if not construction.is_completed():
+                    construction.sleep(until=construction.completes_at())
                     continue
 
                 construction.state_change(STATE_COMPLETED)
@@ -235,14 +316,17 @@ class ConstructionSystem:
 
         building.stop(skip_idle_state=True)
 
-        building.owner.components.remove(building)
+        owner: Entity = building.owner
+        self.world.commands.remove_component(owner, building)
         building.owner.storages = {}
 
         for resource, storage in building.spec.storages.items():
             building.owner.storages[resource] = storage
 
+        self.world.events.watch_storages(owner, owner.storages)
+
         for worker_ref in building.workers:
-            worker = worker_ref()
+            worker = building.resolve(worker_ref)
             if not worker:
                 continue
 
@@ -252,7 +336,7 @@ class ConstructionSystem:
         building.workers = []
 
         for component_definition in building.spec.components:
-            building.owner.components.add(component_definition)
+            self.world.commands.add_component(owner, component_definition)
 
         building.owner.renderable.reset_sprite(building.spec.renderable_type)
 
@@ -1,11 +1,14 @@
 import structlog
-import weakref
-from typing import List, Optional, Type, Callable
+from typing import Callable, Dict, List, Optional, Type
 
 from settlers.engine.components import Component
+from settlers.engine.components.movement import Travel
 from settlers.engine.components.worker import Worker
+from settlers.engine.entities.position import Position
 from settlers.engine.entities.resources import Resource
 from settlers.engine.entities.resources.resource_storage import ResourceStorage
+from settlers.engine.events import WorkerSlotFreed, WorkerSlotTaken
+from settlers.engine.handles import Handle
 
 
 STATE_IDLE = 'idle'
@@ -37,6 +40,15 @@ class PipelineInput:
 
         return consumed
 
+    '''
+    Consumes the inputs of `cycles` cycles at once.
+    '''
+    def consume_cycles(self, cycles: int) -> int:
+        return len(self._storage.pop_many(self.quantity * cycles))
+
+    def cycles_in_stock(self) -> int:
+        return self._storage.quantity() // self.quantity
+
 
 class PipelineOutput:
     __slots__ = ('quantity', 'storage', 'resource')
@@ -101,6 +113,45 @@ class Pipeline:
 
         return True
 
+    '''
+    How many of `limit` cycles could start one after the other with the
+    inputs in stock, each one while the output storage is not full yet
+    (`pending` cycles in progress adding their output first).
+    '''
+    def startable_cycles(self, limit: int, pending: int = 0) -> int:
+        cycles: int = limit
+
+        for input in self.inputs:
+            if input.quantity > 0:
+                cycles = min(cycles, input.cycles_in_stock())
+
+        room: int = (
+            self.output.storage.available() - pending * self.output.quantity
+        )
+        if room <= 0:
+            return 0
+
+        if self.output.quantity > 0:
+            cycles = min(cycles, -(-room // self.output.quantity))
+
+        return max(0, cycles)
+
+    '''
+    Consumes the inputs of `started` cycles and stores the output of
+    `completed` ones in bulk, returning the outputs which fit.
+    '''
+    def fast_forward(
+        self, started: int, completed: int
+    ) -> List[Type[Resource]]:
+        for input in self.inputs:
+            input.consume_cycles(started)
+
+        added: int = self.output.storage.add_many(
+            self.output.resource, completed * self.output.quantity
+        )
+
+        return [self.output.resource] * added
+
 
 class FactoryWorker(Worker):
     _target_components: List[type] = []
@@ -123,6 +174,8 @@ class Factory(Component):
         'add_worker', 'can_add_worker', 'remote_worker', 'start', 'stop'
     )
 
+    states = (STATE_ACTIVE, STATE_IDLE)
+
     def __init__(self, owner, pipelines: List[Pipeline], max_workers: int):
         super().__init__(owner)
 
@@ -130,7 +183,7 @@ class Factory(Component):
         self.max_workers: int = max_workers
         self.pipelines: list = pipelines
         self.state: str = STATE_IDLE
-        self.workers: List[weakref.ReferenceType[Worker]] = []
+        self.workers: List[Handle] = []
 
     def add_worker(self, worker: Worker) -> bool:
         if not self.can_add_worker():
@@ -143,7 +196,8 @@ class Factory(Component):
             worker=worker,
         )
 
-        self.workers.append(weakref.ref(worker))
+        self.workers.append(self.handle(worker))
+        self.publish(WorkerSlotTaken, self, worker)
 
         if not self.active:
             self.active = True
@@ -158,9 +212,10 @@ class Factory(Component):
 
     def remove_worker(self, worker: Worker) -> bool:
         for reference in self.workers:
-            resolved_reference: Optional[Worker] = reference()
+            resolved_reference: Optional[Worker] = self.resolve(reference)
             if not resolved_reference:
                 self.workers.remove(reference)
+                self.publish(WorkerSlotFreed, self, None)
                 continue
 
             if resolved_reference == worker:
@@ -171,6 +226,7 @@ class Factory(Component):
                 )
 
                 self.workers.remove(reference)
+                self.publish(WorkerSlotFreed, self, worker)
                 return True
         return False
 
@@ -193,11 +249,17 @@ class Factory(Component):
             new_state=new_state
         )
 
-        self.state = new_state
+        self.set_state(new_state)
 
     def stop(self) -> None:
         self.active = False
 
+    def despawn(self) -> None:
+        for handle in list(self.workers):
+            worker: Optional[Worker] = self.resolve(handle)
+            if worker:
+                worker.stop()
+
     def __repr__(self) -> str:
         return "<{owner}#{component} {id}>".format(
             owner=self.owner,
@@ -209,18 +271,33 @@ class Factory(Component):
 class FactorySystem:
     component_types = [Factory]
 
-    def __init__(self) -> None:
-        self._last_checked_at: int = 0
-        self._on_production_callbacks: List[Callable] = []
+    tick_interval: int = 500
 
-    def should_process(self, tick: int) -> bool:
-        if (tick - self._last_checked_at) < 500:
-            return False
-        self._last_checked_at = tick
+    reads: tuple = (Position,)
+    writes: tuple = (
+        Factory, FactoryWorker, ResourceStorage, Travel, 'VillagerAi'
+    )
 
-        return True
+    '''
+    `World.advance` stops on every run a factory starts or completes a
+    cycle on. With `bulk` it does not stop for factories whose workers are
+    at work: the cycles they complete over the ticks it skips are applied
+    in closed form by `fast_forward`, assuming nothing else touches their
+    storages meanwhile. Their storage transitions are only published at
+    the end of the span, which is fine for headless balancing runs.
+    '''
+    def __init__(self, bulk: bool = False) -> None:
+        self.bulk: bool = bulk
+        self._on_production_callbacks: List[Callable] = []
+        self._state_handlers: Dict[str, Callable] = {
+            STATE_ACTIVE: self.process_workers,
+            STATE_IDLE: self.handle_idle,
+        }
 
     def process(self, tick: int, factories: List[Factory]) -> None:
+        self._current_tick = tick
+        handlers = self._state_handlers
+
         for factory in factories:
             if not factory.active:
                 continue
@@ -228,20 +305,18 @@ class FactorySystem:
             if not factory.workers:
                 continue
 
-            if factory.state == STATE_IDLE:
-                factory.state_change(STATE_ACTIVE)
-                continue
+            handlers[factory.state](factory)
 
-            if factory.state == STATE_ACTIVE:
-                self.process_workers(factory)
-                continue
+    def handle_idle(self, factory: Factory) -> None:
+        factory.state_change(STATE_ACTIVE)
 
     def process_workers(self, factory: Factory) -> None:
         for worker_reference in factory.workers:
-            worker: Optional[Worker] = worker_reference()
+            worker: Optional[Worker] = factory.resolve(worker_reference)
 
             if not worker:
                 factory.workers.remove(worker_reference)
+                factory.publish(WorkerSlotFreed, factory, None)
                 continue
 
             if not worker.can_work():
@@ -249,12 +324,13 @@ class FactorySystem:
                     worker.pipeline.reserved = False
                     worker.pipeline = None
 
-                worker.progress = 0
+                worker.completes_at = None
 
                 if not worker.owner.position == factory.position():
                     destination = worker.owner.travel.destination
                     if destination:
-                        if destination().position == factory.position():
+                        travel_destination = worker.resolve(destination)
+                        if travel_destination.position == factory.position():
                             continue
                         else:
                             raise RuntimeError('we got a problem')
@@ -270,12 +346,162 @@ class FactorySystem:
 
             pipeline: Pipeline = worker.pipeline
 
-            if worker.progress < pipeline.ticks_per_cycle:
-                worker.progress += 1
+            if worker.completes_at is None:
+                # Pipelines take `ticks_per_cycle` runs of the system.
+                worker.completes_at = (
+                    self._current_tick
+                    + pipeline.ticks_per_cycle * self.tick_interval
+                )
+
+            if worker.completes_at > self._current_tick:
                 continue
 
             self._process_output(factory, worker, pipeline)
 
+    '''
+    Earliest tick after `tick` processing the factories changes anything
+    on, see `World.advance`.
+    '''
+    def next_event(
+        self, tick: int, factories: List[Factory]
+    ) -> Optional[int]:
+        next_tick: Optional[int] = None
+
+        for factory in factories:
+            if not factory.active or not factory.workers:
+                continue
+
+            if factory.state != STATE_ACTIVE:
+                return tick + 1
+
+            for worker_reference in factory.workers:
+                worker: Optional[Worker] = factory.resolve(worker_reference)
+                if not worker:
+                    return tick + 1
+
+                worker_tick = self._worker_event(tick, factory, worker)
+                if worker_tick is None:
+                    continue
+
+                if next_tick is None or worker_tick < next_tick:
+                    next_tick = worker_tick
+
+        return next_tick
+
+    def _worker_event(
+        self, tick: int, factory: Factory, worker: Worker
+    ) -> Optional[int]:
+        if not worker.can_work():
+            if worker.pipeline or worker.completes_at is not None:
+                return tick + 1
+
+            destination = worker.owner.travel.destination
+            if destination:
+                travel_destination = worker.resolve(destination)
+                if (
+                    travel_destination
+                    and travel_destination.position == factory.position()
+                ):
+                    # On its way, until the travel arrives.
+                    return None
+
+            return tick + 1
+
+        if self.bulk:
+            return None
+
+        if not worker.is_active():
+            if self.available_pipeline_for_factory(factory) is None:
+                return None
+            return tick + 1
+
+        if worker.completes_at is None:
+            return tick + 1
+
+        return worker.completes_at
+
+    '''
+    Applies in bulk the cycles the factories would have started and
+    completed over `runs`, only with `bulk`.
+    '''
+    def fast_forward(self, runs: range, factories: List[Factory]) -> None:
+        if not self.bulk:
+            return
+
+        for factory in factories:
+            if not factory.active or not factory.workers:
+                continue
+
+            if factory.state != STATE_ACTIVE:
+                continue
+
+            for worker_reference in list(factory.workers):
+                worker: Optional[Worker] = factory.resolve(worker_reference)
+                if worker and worker.can_work():
+                    self._fast_forward_worker(runs, factory, worker)
+
+    '''
+    A cycle takes `ticks_per_cycle` runs and the worker starts the next one
+    on the run after, as long as the pipeline is available. The worker
+    keeps the pipeline it has over the span.
+    '''
+    def _fast_forward_worker(
+        self, runs: range, factory: Factory, worker: Worker
+    ) -> None:
+        interval: int = runs.step
+        last: int = runs[-1]
+
+        if not worker.is_active():
+            if not self.activate_pipeline_on_worker(factory, worker):
+                return
+
+        pipeline: Pipeline = worker.pipeline
+        if worker.completes_at is None:
+            worker.completes_at = runs[0] + pipeline.ticks_per_cycle * interval
+
+        completes_at: int = worker.completes_at
+        if completes_at > last:
+            return
+
+        period: int = (pipeline.ticks_per_cycle + 1) * interval
+
+        # The cycle in progress completes, each one started after on the
+        # run following a completion completes too if the span allows.
+        completed: int = (last - completes_at) // period + 1
+        started: int = 0
+        if last >= completes_at + interval:
+            started = (last - completes_at - interval) // period + 1
+
+        started = pipeline.startable_cycles(started, pending=1)
+        completed = 1 + min(started, completed - 1)
+
+        outputs: list = pipeline.fast_forward(started, completed)
+
+        logger.debug(
+            'fast_forward',
+            completed=completed,
+            started=started,
+            output=pipeline.output.resource,
+            quantity=len(outputs),
+            worker=worker,
+            component=factory,
+            owner=factory.owner,
+            system=self.__class__.__name__,
+        )
+
+        for callback in self._on_production_callbacks:
+            callback(factory, outputs)
+
+        if started >= completed:
+            worker.completes_at = completes_at + started * period
+            return
+
+        worker.pipeline = None
+        worker.completes_at = None
+        pipeline.reserved = False
+
+        worker.state_change(STATE_IDLE)
+
     def on_production(self, callback: Callable) -> None:
         self._on_production_callbacks.append(callback)
 
@@ -296,7 +522,7 @@ class FactorySystem:
             callback(factory, outputs)
 
         worker.pipeline = None
-        worker.progress = 0
+        worker.completes_at = None
         pipeline.reserved = False
 
         worker.state_change(STATE_IDLE)
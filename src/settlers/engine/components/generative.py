@@ -1,6 +1,8 @@
 import structlog
+from typing import Optional
 
 from . import Component
+from settlers.engine.world import World
 
 logger = structlog.get_logger('factory')
 
@@ -8,7 +10,9 @@ logger = structlog.get_logger('factory')
 class Generative(Component):
     __slots__ = [
         'cycles',
+        'grows_at',
         'increase_per_cycle',
+        'lazy',
         'max_cycles',
         'max_value',
         'target_attr',
@@ -17,14 +21,30 @@ class Generative(Component):
         'unlimited',
     ]
 
+    '''
+    `lazy` generators are not processed as they grow, their value is only
+    written when it is read through `materialize` (see
+    `Harvestable.harvestable_quantity`).
+
+    Readers of the `target_attr` of a lazy generator's owner must call
+    `materialize` first, reading the attribute directly gives the value
+    last written. Limited ones are processed again once their last cycle
+    is done, to be removed. Unlimited ones sleep without a timer and are
+    only woken up when harvested (see `Harvestable.harvested_quantity`),
+    nothing else writes their value.
+    '''
     def __init__(
         self, owner, target_attr, max_cycles, ticks_per_cycle,
-        increase_per_cycle, max_value
+        increase_per_cycle, max_value, lazy: bool = False
     ):
         super().__init__(owner)
 
         self.cycles = 0
+        # Tick of the next increase while below `max_value`, counting is
+        # paused (kept in `ticks`) at it.
+        self.grows_at = None
         self.increase_per_cycle = increase_per_cycle
+        self.lazy: bool = lazy
         self.max_cycles = max_cycles
         self.max_value = max_value
         self.target_attr = target_attr
@@ -32,14 +52,89 @@ class Generative(Component):
         self.ticks_per_cycle = ticks_per_cycle
         self.unlimited = max_cycles < 0
 
+    '''
+    Writes the value the owner has on `tick` (the tick being processed by
+    default) from the one last written, applying the increases due since
+    in one step. Counting pauses at `max_value` and stops after
+    `max_cycles`, as it does when the generator is processed every time.
+    '''
+    def materialize(self, tick: Optional[int] = None) -> None:
+        if self.grows_at is None:
+            return
+
+        if tick is None:
+            manager = self.owner.components.manager
+            if manager is None:
+                return
+            tick = manager.now
+
+        if tick < self.grows_at:
+            return
+
+        period: int = self.ticks_per_cycle + 1
+        cycles: int = (tick - self.grows_at) // period + 1
+
+        value = getattr(self.owner, self.target_attr)
+        if self.increase_per_cycle > 0:
+            cycles = min(
+                cycles,
+                -(-(self.max_value - value) // self.increase_per_cycle)
+            )
+
+        if not self.unlimited:
+            cycles = min(cycles, self.max_cycles + 1 - self.cycles)
+
+        if cycles <= 0:
+            return
+
+        value += cycles * self.increase_per_cycle
+        self.cycles += cycles
+        self.ticks = 0
+        self.grows_at += cycles * period
+
+        setattr(self.owner, self.target_attr, value)
+
+        if value >= self.max_value:
+            self.grows_at = None
+
+    '''
+    Tick a limited generator below its maximum is removed on, once its
+    last cycle is done.
+    '''
+    def expires_at(self) -> Optional[int]:
+        if self.unlimited or self.grows_at is None:
+            return None
+
+        return (
+            self.grows_at
+            + (self.max_cycles - self.cycles) * (self.ticks_per_cycle + 1)
+            + 1
+        )
+
 
 class GenerativeSystem:
     component_types = [Generative]
 
+    # Regrowth sets the attribute harvested through `Harvestable`.
+    writes: tuple = (Generative, 'Harvestable')
+
+    def __init__(self, world: World) -> None:
+        self.world: World = world
+
+    '''
+    A generator below its maximum increases every `ticks_per_cycle + 1`
+    ticks it spends there. It sleeps until its next increase, or at the
+    maximum until it is harvested (see `Harvestable.harvested_quantity`).
+    Lazy generators sleep through their increases, until they expire.
+    '''
     def process(self, tick: int, generators):
         for generator in generators:
+            # Increases due on `tick` itself are applied below.
+            generator.materialize(tick - 1)
+
             value = getattr(generator.owner, generator.target_attr)
             if value >= generator.max_value:
+                self.pause(tick, generator)
                 continue
 
             if not generator.unlimited:
@@ -51,16 +146,51 @@ class GenerativeSystem:
                         generator=generator,
                         system=self.__class__.__name__,
                     )
-                    generator.owner.components.remove(generator)
+                    self.world.commands.remove_component(
+                        generator.owner, generator
+                    )
+                    continue
+
+            if generator.grows_at is None:
+                generator.grows_at = (
+                    tick + generator.ticks_per_cycle - generator.ticks
+                )
+
+            if tick >= generator.grows_at:
+                generator.cycles += 1
+                generator.ticks = 0
+                generator.grows_at = tick + generator.ticks_per_cycle + 1
+
+                value += generator.increase_per_cycle
+
+                setattr(generator.owner, generator.target_attr, value)
+
+                if value >= generator.max_value:
+                    self.pause(tick + 1, generator)
+                    continue
+
+                if (
+                    not generator.unlimited
+                    and generator.cycles > generator.max_cycles
+                ):
+                    # Removed on the next tick.
                     continue
 
-            if generator.ticks < generator.ticks_per_cycle:
-                generator.ticks += 1
+            if generator.lazy:
+                generator.sleep(until=generator.expires_at())
                 continue
 
-            generator.cycles += 1
-            generator.ticks = 0
+            generator.sleep(until=generator.grows_at)
 
-            value += generator.increase_per_cycle
+    '''
+    Stops counting at the maximum, from `tick` on.
+    '''
+    def pause(self, tick: int, generator: Generative) -> None:
+        if generator.grows_at is not None:
+            generator.ticks = max(
+                0,
+                generator.ticks_per_cycle - (generator.grows_at - tick)
+            )
+            generator.grows_at = None
 
-            setattr(generator.owner, generator.target_attr, value)
+        generator.sleep()
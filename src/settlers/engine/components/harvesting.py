@@ -1,10 +1,17 @@
 import structlog
-from typing import Callable, List, Optional, Set, Type
-import weakref
+from typing import Callable, Dict, List, Optional, Set, Tuple, Type
 
 from . import Component
+from .generative import Generative
+from .movement import (
+    ResourceTransport, STATE_IDLE as TRANSPORT_STATE_IDLE, Travel, Velocity,
+    travel_path
+)
+from settlers.engine.entities.position import Position
 from settlers.engine.entities.resources import Resource
 from settlers.engine.entities.resources.resource_storage import ResourceStorage
+from settlers.engine.events import WorkerSlotFreed, WorkerSlotTaken
+from settlers.engine.handles import Handle
 
 
 STATE_DELIVERING = 'delivering'
@@ -25,7 +32,7 @@ class Harvester(Component):
         'state',
         'storage',
         'source',
-        'ticks'
+        'harvest_at'
     )
 
     exposed_as = 'harvest'
@@ -33,6 +40,8 @@ class Harvester(Component):
         'assign_destination', 'can_harvest', 'on_end', 'start', 'stop'
     )
 
+    states = (STATE_DELIVERING, STATE_FULL, STATE_HARVESTING, STATE_IDLE)
+
     _target_components: List[Type[Component]] = []
 
     def __init__(
@@ -40,18 +49,19 @@ class Harvester(Component):
     ):
         super().__init__(owner)
 
-        self.destination: Optional[weakref.ReferenceType] = None
+        self.destination: Optional[Handle] = None
         self.on_end_callbacks: List[Callable] = []
         self.state = STATE_IDLE
         self._resources: Set[Resource] = set(resources)
         self.storage = storage
-        self.source = None
-        self.ticks = 0
+        self.source: Optional[Handle] = None
+        # Tick the harvesting cycle in progress completes at.
+        self.harvest_at: Optional[int] = None
 
         self.update_resources()
 
     def assign_destination(self, building) -> None:
-        self.destination = weakref.ref(building)
+        self.destination = self.handle(building)
 
     def update_resources(self) -> None:
         if self._resources:
@@ -83,7 +93,7 @@ class Harvester(Component):
         if not self.destination:
             raise RuntimeError('no destination')
 
-        destination = self.destination()
+        destination = self.resolve(self.destination)
 
         if not destination:
             raise RuntimeError('destination is dead')
@@ -185,7 +195,8 @@ class Harvester(Component):
             component=self.__class__.__name__,
         )
 
-        self.source = weakref.ref(source)
+        self.source = self.handle(source)
+        self.wake()
         return source.add_worker(self)
 
     def state_change(self, new_state: str) -> None:
@@ -200,7 +211,8 @@ class Harvester(Component):
             component=self.__class__.__name__,
         )
 
-        self.state = new_state
+        self.set_state(new_state)
+        self.wake()
 
     def stop(self) -> None:
         self.state_change(STATE_IDLE)
@@ -209,7 +221,7 @@ class Harvester(Component):
             callback(self)
 
         if self.source:
-            source = self.source()
+            source = self.resolve(self.source)
             if source:
                 source.remove_worker(self)
 
@@ -218,6 +230,8 @@ class Harvester(Component):
         if self.destination:
             self.destination = None
 
+        self.harvest_at = None
+
         logger.info(
             'stop',
             owner=self.owner,
@@ -226,6 +240,10 @@ class Harvester(Component):
 
         self.on_end_callbacks = []
 
+    def despawn(self) -> None:
+        if self.source or self.destination:
+            self.stop()
+
     @classmethod
     def target_components(cls):
         if not cls._target_components:
@@ -254,7 +272,7 @@ class Harvestable(Component):
     ):
         super().__init__(owner)
 
-        self.workers: List[weakref.ReferenceType[Harvester]] = []
+        self.workers: List[Handle] = []
         self.harvest_value_per_cycle: int = harvest_value_per_cycle
         self.max_workers: int = max_workers
         self.output: type = output
@@ -272,14 +290,20 @@ class Harvestable(Component):
             worker=worker,
         )
 
-        worker_ref = weakref.ref(worker)
-        self.workers.append(worker_ref)
+        self.workers.append(self.handle(worker))
+        self.publish(WorkerSlotTaken, self, worker)
         return True
 
     def can_add_worker(self) -> bool:
         return len(self.workers) < self.max_workers
 
     def harvestable_quantity(self) -> int:
+        generative: Optional[Generative] = self.owner.components.get(
+            Generative
+        )
+        if generative is not None:
+            generative.materialize()
+
         return int(getattr(self.owner, self.target_attr))
 
     def harvested_quantity(self, quantity: int) -> None:
@@ -295,12 +319,25 @@ class Harvestable(Component):
 
         setattr(self.owner, self.target_attr, value)
 
+        # Regrowth pauses at the maximum, see `GenerativeSystem`.
+        generative: Optional[Generative] = self.owner.components.get(
+            Generative
+        )
+        if generative is not None:
+            generative.wake()
+
     def provides(self) -> type:
         return self.output
 
+    def despawn(self) -> None:
+        for handle in list(self.workers):
+            worker: Optional[Harvester] = self.resolve(handle)
+            if worker:
+                worker.stop()
+
     def remove_worker(self, entity: Harvester) -> bool:
         for worker in self.workers:
-            if worker.worker() == entity:
+            if self.resolve(worker) is entity:
                 logger.debug(
                     'remove_worker',
                     worker=entity,
@@ -308,6 +345,7 @@ class Harvestable(Component):
                     component=self.__class__.__name__,
                 )
                 self.workers.remove(worker)
+                self.publish(WorkerSlotFreed, self, entity)
                 return True
         return False
 
@@ -325,36 +363,259 @@ class Harvestable(Component):
 class HarvesterSystem:
     component_types = [Harvester]
 
-    def __init__(self) -> None:
-        self._awaiting_until: dict[Harvester, int] = {}
+    reads: tuple = (Position,)
+    # Reading a lazy `Generative` source materializes its regrowth.
+    writes: tuple = (
+        Generative, Harvestable, Harvester, ResourceStorage, Travel,
+        'VillagerAi'
+    )
+
+    def __init__(self, world) -> None:
+        self.world = world
+        # Harvesters without a destination wait until then, even if woken
+        # up earlier.
+        self._awaiting_until: Dict[Harvester, int] = {}
+        # Last path computed by `_restarted_path`, with its target and speed.
+        self._paths: Dict[Harvester, tuple] = {}
+        self._state_handlers: Dict[str, Callable] = {
+            STATE_DELIVERING: self.handle_delivery,
+            STATE_FULL: self.handle_delivery,
+            STATE_HARVESTING: self.handle_harvesting,
+            STATE_IDLE: self.handle_idle,
+        }
+
+    def on_removed(self, _owner: object, components: list) -> None:
+        worker: Harvester = components[0]
+        self._awaiting_until.pop(worker, None)
+        self._paths.pop(worker, None)
 
     def process(self, tick: int, workers: List[Harvester]) -> None:
         self._current_tick = tick
+        handlers = self._state_handlers
+
+        for worker in workers:
+            handlers[worker.state](worker)
+
+    '''
+    Earliest tick after `tick` processing the harvesters changes anything
+    on, see `World.advance`. Harvesters pulled back on every tick (see
+    `_restarted_path`) only move until then, `fast_forward` moves them.
+    '''
+    def next_event(
+        self, tick: int, workers: List[Harvester]
+    ) -> Optional[int]:
+        next_tick: Optional[int] = None
+
         for worker in workers:
-            if worker.state == STATE_IDLE:
-                if not worker.source:
-                    continue
-                worker.state_change(STATE_HARVESTING)
+            worker_tick: Optional[int] = self._worker_event(tick, worker)
+            if worker_tick is None:
                 continue
 
-            if worker.state == STATE_HARVESTING:
-                self.handle_harvesting(worker)
+            if worker_tick <= tick + 1:
+                return tick + 1
+
+            if next_tick is None or worker_tick < next_tick:
+                next_tick = worker_tick
+
+        return next_tick
+
+    def _worker_event(self, tick: int, worker: Harvester) -> Optional[int]:
+        if worker.state in (STATE_DELIVERING, STATE_FULL):
+            awaiting = self._awaiting_until.get(worker, 0)
+            if awaiting > tick:
+                return awaiting
+
+        if worker.state == STATE_HARVESTING:
+            source = worker.resolve(worker.source) if worker.source else None
+            if not source:
+                return tick + 1
+
+            storage = worker.storage.get(source.output, None)
+            if storage is None or storage.is_full():
+                return tick + 1
+
+            if worker.position() == source.position():
+                return self._regrowth_event(tick, worker, source)
+
+            target = source.owner
+            target_position = source.position()
+        elif worker.state in (STATE_DELIVERING, STATE_FULL):
+            if not worker.destination:
+                return tick + 1
+
+            destination = worker.resolve(worker.destination)
+            if not destination or destination.position == worker.position():
+                return tick + 1
+
+            target = destination
+            target_position = destination.position
+        else:
+            return tick + 1
+
+        travel_destination = worker.owner.travel.destination
+        if travel_destination:
+            travel_target = worker.resolve(travel_destination)
+            if travel_target and travel_target.position == target_position:
+                # On its way, until the travel arrives.
+                return None
+
+        if travel_destination:
+            return tick + 1
+
+        path = self._restarted_path(worker, target)
+        if path is None:
+            return tick + 1
+
+        if path[-1] != self._coordinates(target):
+            # Stuck short of it, it never gets there.
+            return None
+
+        # Sees itself there on the tick after its last step.
+        return tick + len(path)
+
+    '''
+    Moves the harvesters pulled back on every tick where processing them
+    on every tick of `runs` would have, none of them getting there in
+    between.
+    '''
+    def fast_forward(self, runs: range, workers: List[Harvester]) -> None:
+        for worker in workers:
+            target = self._travel_target(runs[0], worker)
+            if target is None or worker.owner.travel.destination:
                 continue
 
-            if worker.state == STATE_FULL:
-                self.handle_delivery(worker)
+            path = self._restarted_path(worker, target)
+            if path is None:
                 continue
 
-            if worker.state == STATE_DELIVERING:
-                self.handle_delivery(worker)
+            x, y = path[min(len(runs), len(path) - 1)]
+            position: Position = worker.owner.components.get(Position)
+
+            if position.x != x or position.y != y:
+                position.x = x
+                position.y = y
+
+    '''
+    Entity a harvester processed on `tick` heads to, if any.
+    '''
+    def _travel_target(
+        self, tick: int, worker: Harvester
+    ) -> Optional[object]:
+        if worker.state == STATE_HARVESTING:
+            source = worker.resolve(worker.source) if worker.source else None
+            if not source or worker.position() == source.position():
+                return None
+            return source.owner
+
+        if worker.state in (STATE_DELIVERING, STATE_FULL):
+            if self._awaiting_until.get(worker, 0) > tick:
+                return None
+
+            destination = (
+                worker.resolve(worker.destination)
+                if worker.destination else None
+            )
+            if not destination or destination.position == worker.position():
+                return None
+            return destination
+
+        return None
+
+    '''
+    Positions a harvester goes through when the idle `ResourceTransport` of
+    its owner stops the travel it starts on every tick, on the same tick
+    (see `ResourceTransportSystem.handle_idle`): it moves one step per tick
+    towards `target`, starting from where it is. `None` when nothing stops
+    its travel.
+    '''
+    def _restarted_path(
+        self, worker: Harvester, target: object
+    ) -> Optional[Tuple[Tuple[int, int], ...]]:
+        components = worker.owner.components
+
+        transport: Optional[ResourceTransport] = components.get(
+            ResourceTransport
+        )
+        if (
+            transport is None
+            or transport.state != TRANSPORT_STATE_IDLE
+            or transport.source
+        ):
+            return None
+
+        position: Position = components.get(Position)
+        velocity: Optional[Velocity] = components.get(Velocity)
+        if velocity is None:
+            return None
+
+        at = (position.x, position.y)
+        target_position = self._coordinates(target)
+        speed = velocity.speed
+
+        cached = self._paths.get(worker, None)
+        if (
+            cached is not None
+            and cached[0] == target_position
+            and cached[1] == speed
+            and at in cached[2]
+        ):
+            path = cached[2]
+            return path[path.index(at):]
+
+        path = travel_path(
+            at[0], at[1], target_position[0], target_position[1], speed
+        )
+        self._paths[worker] = (target_position, speed, path)
+        return path
+
+    def _coordinates(self, entity: object) -> Tuple[int, int]:
+        position: Position = entity.position.reveal(Position)
+        return (position.x, position.y)
+
+    '''
+    A harvester at a used up source waits for it to grow back.
+    '''
+    def _regrowth_event(
+        self, tick: int, worker: Harvester, source: Harvestable
+    ) -> Optional[int]:
+        if not worker.can_harvest(source.output):
+            return tick + 1
+
+        if int(getattr(source.owner, source.target_attr)) >= 1:
+            if worker.harvest_at is None:
+                return tick + 1
+
+            # Until the cycle in progress completes.
+            return max(worker.harvest_at, tick + 1)
+
+        generative: Optional[Generative] = source.owner.components.get(
+            Generative
+        )
+        if generative is None:
+            return tick + 1
+
+        if generative.grows_at is None:
+            # Until `GenerativeSystem` counts again.
+            return None
+
+        return generative.grows_at
+
+    def handle_idle(self, worker: Harvester) -> None:
+        if not worker.source:
+            # Until `start` assigns a source or the state changes.
+            worker.sleep()
+            return
+
+        worker.state_change(STATE_HARVESTING)
 
     def handle_delivery(self, worker: Harvester) -> None:
         awaiting = self._awaiting_until.get(worker, 0)
         if awaiting > self._current_tick:
+            worker.sleep(until=awaiting)
             return
 
         if not worker.destination:
-            source = worker.source() if worker.source else None
+            source = worker.resolve(worker.source)
 
             logger.debug(
                 'handle_delivery:no_destination',
@@ -363,9 +624,10 @@ class HarvesterSystem:
                 worker=worker,
             )
             self._awaiting_until[worker] = self._current_tick + 1000
+            worker.sleep(until=self._awaiting_until[worker])
             return
 
-        destination = worker.destination()
+        destination = worker.resolve(worker.destination)
         if not destination:
             worker.stop()
             return
@@ -378,7 +640,7 @@ class HarvesterSystem:
             worker.owner.travel.start(destination)
             return
 
-        travel_destination = worker.owner.travel.destination()
+        travel_destination = worker.resolve(worker.owner.travel.destination)
         if not travel_destination.position == destination.position:
             import pdb; pdb.set_trace()
             return
@@ -393,7 +655,7 @@ class HarvesterSystem:
             worker.stop()
             return
 
-        source = worker.source()
+        source = worker.resolve(worker.source)
         if not source:
             logger.debug(
                 'handle_harvesting:source_dead',
@@ -416,7 +678,7 @@ class HarvesterSystem:
             destination = travel.destination
 
             if destination:
-                if destination().position == source.position():
+                if worker.resolve(destination).position == source.position():
                     return
                 else:
                     raise RuntimeError('we got a problem')
@@ -430,7 +692,7 @@ class HarvesterSystem:
                 worker_position=worker.position(),
             )
 
-            worker.ticks = 0
+            worker.harvest_at = None
 
             travel.start(source.owner)
             return
@@ -450,13 +712,21 @@ class HarvesterSystem:
 
         value = source.harvestable_quantity()
         if value < 1:
+            if Generative not in source.owner.components.component_classes:
+                # Nothing grows back, the source is used up for good.
+                self.world.commands.despawn(source.owner)
             return
 
-        if worker.ticks < source.ticks_per_cycle:
-            worker.ticks += 1
+        if worker.harvest_at is None:
+            worker.harvest_at = self._current_tick + source.ticks_per_cycle
+
+        if worker.harvest_at > self._current_tick:
+            # Until the cycle completes, `stop` or a state change wakes it
+            # up earlier.
+            worker.sleep(until=worker.harvest_at)
             return
 
-        worker.ticks = 0
+        worker.harvest_at = None
 
         possible_harvest_quantity = min(
             source.harvest_value_per_cycle,
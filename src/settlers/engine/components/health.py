@@ -9,7 +9,7 @@ class Health(Component):
     __slots__ = ('health', 'status')
 
     exposed_as = 'health'
-    exposed_methods = ('is_alive')
+    exposed_methods = ('is_alive',)
 
     def __init__(self, health: int, status: str):
         super()
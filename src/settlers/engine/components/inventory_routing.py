@@ -17,6 +17,7 @@ class InventoryRouting(Component):
     exposed_methods = (
         'available_for_transport',
         'can_receive_resources',
+        'offers_resources',
         'receive_resource',
         'remove_inventory',
         'storage_for',
@@ -117,6 +118,13 @@ class InventoryRouting(Component):
 
         return storage.pop()
 
+    def offers_resources(self) -> List[Type[Resource]]:
+        return [
+            resource
+            for resource, storage in self.owner.storages.items()
+            if storage.allows_outgoing and not storage.is_empty()
+        ]
+
     def wants_resources(self) -> List[Type[Resource]]:
         return [
             resource
@@ -1,10 +1,11 @@
 import math
 import structlog
-from typing import List, Optional
-import weakref
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from . import Component
 from ..entities.position import Position
+from ..events import Arrived, StorageBecameNonEmpty
+from ..handles import Handle
 from ..entities.resources.resource_storage import ResourceStorage
 STATE_IDLE = 'idle'
 STATE_MOVING = 'moving'
@@ -40,7 +41,7 @@ class Travel(Component):
     def __init__(self, owner) -> None:
         super().__init__(owner)
 
-        self.destination: Optional[weakref.ReferenceType] = None
+        self.destination: Optional[Handle] = None
 
     def start(self, destination) -> None:
         if self.destination:
@@ -48,13 +49,14 @@ class Travel(Component):
                 'start_failed_destination_set',
                 component=self.__class__.__name__,
                 owner=self.owner,
-                destination=self.destination(),
+                destination=self.resolve(self.destination),
                 proposed_destination=destination,
             )
             raise RuntimeError('already moving somewhere')
 
-        self.destination = weakref.ref(destination)
+        self.destination = self.handle(destination)
         self.state_change(STATE_MOVING)
+        self.wake()
 
     def stop(self) -> None:
         super().stop()
@@ -65,58 +67,225 @@ class Travel(Component):
 class TravelSystem:
     component_types: list = [Travel, Position, Velocity]
 
+    reads: tuple = (Velocity,)
+    writes: tuple = (Position, Travel)
+
+    def __init__(self) -> None:
+        # Path each moving traveller follows, with the tick it was at the
+        # first position and the position it heads to.
+        self._cursors: Dict[
+            Travel, Tuple[Tuple[Tuple[int, int], ...], int, Tuple[int, int]]
+        ] = {}
+        self._paths: Dict[tuple, Tuple[Tuple[int, int], ...]] = {}
+
     def process(self, tick: int, entities: List[List[Component]]) -> None:
         for travel, position, velocity in entities:
-            if not travel.destination:
-                travel.state_change(STATE_IDLE)
+            destination = self.moving_destination(travel)
+            if not destination:
                 continue
 
-            destination = travel.destination()
-            if not destination:
-                logger.debug(
-                    'process_destination_dead',
-                    destination=travel.destination,
-                    owner=travel.owner,
-                    system=self.__class__.__name__,
-                )
-
-                travel.stop()
+            if destination.position == travel.owner.position:
+                self.arrive(travel, destination)
                 continue
 
-            if travel.state == STATE_IDLE:
-                travel.state_change(STATE_MOVING)
+            self.step(
+                position,
+                velocity,
+                destination.position.reveal(Position)
+            )
+
+    def arrive(self, travel: Travel, destination: object) -> None:
+        travel.stop()
+        travel.publish(Arrived, travel, destination)
+
+    '''
+    Handles the travel state transitions, returning the destination only
+    when the owner should move towards it this tick.
+    '''
+    def moving_destination(self, travel: Travel) -> Optional[object]:
+        if not travel.destination:
+            travel.state_change(STATE_IDLE)
+            # Until `Travel.start` gives it a destination.
+            travel.sleep()
+            return None
+
+        destination = travel.resolve(travel.destination)
+        if not destination:
+            logger.debug(
+                'process_destination_dead',
+                destination=travel.destination,
+                owner=travel.owner,
+                system=self.__class__.__name__,
+            )
+
+            travel.stop()
+            return None
+
+        if travel.state == STATE_IDLE:
+            travel.state_change(STATE_MOVING)
+            return None
+
+        if travel.state == STATE_MOVING:
+            return destination
+
+        return None
+
+    def step(
+        self, position: Position, velocity: Velocity,
+        destination_position: Position
+    ) -> None:
+        position.x, position.y = next_position(
+            position.x, position.y,
+            destination_position.x, destination_position.y,
+            velocity.speed
+        )
+
+    '''
+    Earliest tick after `tick` on which a traveller needs processing: a
+    moving one reaching its destination (arriving on the tick after), or
+    any other one changing state. Idle ones without a destination are only
+    put to sleep. The steps taken on the ticks before are replayed by
+    `fast_forward`, see `World.advance`.
+    '''
+    def next_event(
+        self, tick: int, entities: List[List[Component]]
+    ) -> Optional[int]:
+        next_tick: Optional[int] = None
+
+        for travel, position, velocity in entities:
+            if travel.state == STATE_IDLE and not travel.destination:
                 continue
 
-            if travel.state == STATE_MOVING:
-                if destination.position == travel.owner.position:
-                    travel.stop()
-                    continue
+            cursor = self._cursor(tick + 1, travel, position, velocity)
+            if cursor is None:
+                return tick + 1
+
+            path, start, target = cursor
+            if path[-1] != target:
+                # Stuck short of its destination, it never arrives.
+                continue
+
+            # Other systems see it there on the tick of its last step.
+            reached = max(start + len(path) - 2, tick + 1)
+            if next_tick is None or reached < next_tick:
+                next_tick = reached
+
+        return next_tick
+
+    '''
+    Moves the travellers to where processing them on every tick of `runs`
+    would have left them, none of them arriving in between.
+    '''
+    def fast_forward(
+        self, runs: range, entities: List[List[Component]]
+    ) -> None:
+        for travel, position, velocity in entities:
+            cursor = self._cursor(runs[0], travel, position, velocity)
+            if cursor is None:
+                continue
+
+            path, start, _target = cursor
+            x, y = path[min(runs[-1] + 1 - start, len(path) - 1)]
+
+            if position.x != x or position.y != y:
+                position.x = x
+                position.y = y
+
+    def on_removed(self, _owner: object, components: list) -> None:
+        self._cursors.pop(components[0], None)
+
+    '''
+    Path of a moving traveller from the position it has on `tick` with the
+    tick it started on and the position it heads to, `None` when it is not
+    simply moving. Kept while the traveller follows it.
+    '''
+    def _cursor(
+        self, tick: int, travel: Travel, position: Position,
+        velocity: Velocity
+    ) -> Optional[Tuple[Tuple[Tuple[int, int], ...], int, Tuple[int, int]]]:
+        if travel.state != STATE_MOVING or not travel.destination:
+            return None
+
+        destination = travel.resolve(travel.destination)
+        if not destination:
+            return None
+
+        destination_position = destination.position.reveal(Position)
+        target = (destination_position.x, destination_position.y)
+        at = (position.x, position.y)
+
+        cursor = self._cursors.get(travel, None)
+        if cursor is not None:
+            path, start, cursor_target = cursor
+            index = tick - start
+            if (
+                cursor_target == target
+                and 0 <= index < len(path)
+                and path[index] == at
+            ):
+                return cursor
+
+        key = (at, target, velocity.speed)
+        path = self._paths.get(key, None)
+        if path is None:
+            if len(self._paths) >= MAX_CACHED_PATHS:
+                self._paths.clear()
+
+            path = self._paths[key] = travel_path(
+                at[0], at[1], target[0], target[1], velocity.speed
+            )
+
+        cursor = self._cursors[travel] = (path, tick, target)
+        return cursor
+
+
+MAX_CACHED_PATHS: int = 4096
 
-                destination_position: Position = destination.position.reveal(
-                    Position
-                )
 
-                delta_x: int = destination_position.x - position.x
-                delta_y: int = destination_position.y - position.y
+'''
+Position a traveller at `(x, y)` moves to in one tick towards
+`(to_x, to_y)`.
+'''
+def next_position(
+    x: int, y: int, to_x: int, to_y: int, speed: float
+) -> Tuple[int, int]:
+    delta_x: int = to_x - x
+    delta_y: int = to_y - y
+
+    distance: float = math.sqrt(
+        math.pow(delta_x, 2)
+        + math.pow(delta_y, 2)
+    )
+
+    if distance > speed:
+        ratio: float = speed / distance
+        return (
+            round((ratio * delta_x) + x),
+            round((ratio * delta_y) + y),
+        )
 
-                distance: float = math.sqrt(
-                    math.pow(delta_x, 2)
-                    + math.pow(delta_y, 2)
-                )
+    return (to_x, to_y)
 
-                new_x: int = 0
-                new_y: int = 0
 
-                if distance > velocity.speed:
-                    ratio: float = velocity.speed / distance
-                    new_x = round((ratio * delta_x) + position.x)
-                    new_y = round((ratio * delta_y) + position.y)
-                else:
-                    new_x = destination_position.x
-                    new_y = destination_position.y
+'''
+Positions a traveller goes through from `(x, y)` to `(to_x, to_y)`, one per
+tick starting with the current one. Ends short of the destination when a
+step would not move it any more.
+'''
+def travel_path(
+    x: int, y: int, to_x: int, to_y: int, speed: float
+) -> Tuple[Tuple[int, int], ...]:
+    path: List[Tuple[int, int]] = [(x, y)]
 
-                position.x = new_x
-                position.y = new_y
+    while (x, y) != (to_x, to_y):
+        new_x, new_y = next_position(x, y, to_x, to_y, speed)
+        if (new_x, new_y) == (x, y):
+            break
+
+        x, y = new_x, new_y
+        path.append((x, y))
+
+    return tuple(path)
 
 
 class ResourceTransport(Component):
@@ -127,24 +296,26 @@ class ResourceTransport(Component):
     exposed_as = 'resource_transport'
     exposed_methods = ('is_valid_route', 'on_end', 'start', 'stop')
 
+    states = (STATE_IDLE, STATE_LOADING, STATE_MOVING, STATE_UNLOADING)
+
     def __init__(self, owner) -> None:
         super().__init__(owner)
 
         self._common_route_resources: Optional[set] = None
-        self.destination: Optional[weakref.ReferenceType] = None
+        self.destination: Optional[Handle] = None
         self.direction: str = TRANSPORT_DIRECTION_SOURCE
-        self.source: Optional[weakref.ReferenceType] = None
+        self.source: Optional[Handle] = None
 
     def common_route_resources(self, destination=None) -> set:
         if destination is None and self.destination:
-            _destination = self.destination()
+            _destination = self.resolve(self.destination)
         else:
             _destination = destination
 
         is_planned_destination: bool = (
             destination is not None and
             self.destination is not None and
-            destination == self.destination()
+            destination == self.resolve(self.destination)
         )
 
         if (
@@ -179,22 +350,51 @@ class ResourceTransport(Component):
 
         return self._common_route_resources or set()
 
+    '''
+    Resources `common_route_resources` worked out and keeps returning for
+    the planned destination, `None` before.
+    '''
+    def known_route_resources(self) -> Optional[set]:
+        return self._common_route_resources or None
+
     def is_valid_route(self, destination=None) -> bool:
         return not len(self.common_route_resources(destination)) == 0
 
     def position(self) -> Position:
         return self.owner.position
 
-    def start(self, destination, source=None) -> None:
+    '''
+    `resources` restricts the route to them, instead of every resource the
+    owner has a storage for and the destination accepts.
+    '''
+    def start(self, destination, source=None, resources=None) -> None:
         if self.destination:
             raise RuntimeError('already going somewhere')
 
         if source:
-            self.source = weakref.ref(source)
+            self.source = self.handle(source)
         else:
             self.source = None
 
-        self.destination = weakref.ref(destination)
+        if resources:
+            self._common_route_resources = set(resources)
+
+        self.destination = self.handle(destination)
+
+    '''
+    Whether `stop` would leave it and `travel` as they are.
+    '''
+    def is_stopped(self, travel: Travel) -> bool:
+        return not (
+            self.state != STATE_IDLE
+            or self.destination
+            or self.source
+            or self._common_route_resources is not None
+            or self._on_end_callbacks
+            or travel.state != STATE_IDLE
+            or travel.destination
+            or travel._on_end_callbacks
+        )
 
     def stop(self, skip_idle_state=False) -> None:
         super().stop(skip_idle_state=skip_idle_state)
@@ -203,6 +403,10 @@ class ResourceTransport(Component):
         self.source = None
         self._common_route_resources = None
 
+    def despawn(self) -> None:
+        if self.destination or self.source:
+            self.stop()
+
     def __repr__(self) -> str:
         return "<{owner}#{component} {id}>".format(
             owner=self.owner,
@@ -214,42 +418,137 @@ class ResourceTransport(Component):
 class ResourceTransportSystem:
     component_types = [ResourceTransport, Travel]
 
+    reads: tuple = (Position,)
+    writes: tuple = (
+        ResourceStorage, ResourceTransport, Travel, 'InventoryRouting',
+        'VillagerAi'
+    )
+
+    def __init__(self, world) -> None:
+        # Idle transports whose source had nothing to pick up, with the
+        # source, its storages and the route resources they were checked
+        # against. They are checked again once a storage of the source
+        # becomes non empty.
+        self._waiting: Dict[ResourceTransport, Tuple[object, dict, set]] = {}
+        self._waiting_on: Dict[object, Set[ResourceTransport]] = {}
+
+        world.events.subscribe(StorageBecameNonEmpty, self.on_stocked)
+
+        self._state_handlers: Dict[str, Callable] = {
+            STATE_IDLE: self.handle_idle,
+            STATE_LOADING: self.handle_loading,
+            STATE_MOVING: self.handle_movement,
+            STATE_UNLOADING: self.handle_unloading,
+        }
+
+    def on_stocked(self, event: StorageBecameNonEmpty) -> None:
+        for resource_transport in self._waiting_on.pop(event.owner, ()):
+            self._waiting.pop(resource_transport, None)
+
+    def on_removed(self, _owner: object, components: list) -> None:
+        resource_transport: ResourceTransport = components[0]
+
+        waiting = self._waiting.pop(resource_transport, None)
+        if waiting is None:
+            return
+
+        transports = self._waiting_on.get(waiting[0], None)
+        if transports is not None:
+            transports.discard(resource_transport)
+            if not transports:
+                del self._waiting_on[waiting[0]]
+
     def process(self, tick: int, entities: list) -> None:
+        handlers = self._state_handlers
+
         for resource_transport, _travel in entities:
-            if resource_transport.state == STATE_IDLE:
-                self.handle_idle(resource_transport)
-                continue
+            handlers[resource_transport.state](resource_transport)
+
+    '''
+    Earliest tick after `tick` processing the transports changes anything
+    on, see `World.advance`.
+    '''
+    def next_event(self, tick: int, entities: list) -> Optional[int]:
+        for resource_transport, travel in entities:
+            if not self._is_waiting(resource_transport, travel):
+                return tick + 1
+
+        return None
+
+    '''
+    Whether processing a transport leaves it as it is until another system
+    changes something: it is stopped, its source has nothing for it (see
+    `on_stocked`) or it is on its way.
+    '''
+    def _is_waiting(
+        self, resource_transport: ResourceTransport, travel: Travel
+    ) -> bool:
+        if resource_transport.state == STATE_IDLE:
+            if not resource_transport.source:
+                return resource_transport.is_stopped(travel)
+
+            source = resource_transport.resolve(resource_transport.source)
+            waiting = self._waiting.get(resource_transport, None)
+
+            # Working out the route resources would keep them, only known
+            # ones are compared.
+            resources = resource_transport.known_route_resources()
+            return bool(
+                source
+                and resources
+                and waiting is not None
+                and waiting[0] is source
+                and waiting[1] is source.storages
+                and waiting[2] == resources
+            )
 
-            if resource_transport.state == STATE_LOADING:
-                self.handle_loading(resource_transport)
-                continue
+        if resource_transport.state != STATE_MOVING:
+            return False
 
-            if resource_transport.state == STATE_UNLOADING:
-                self.handle_unloading(resource_transport)
-                continue
+        if resource_transport.direction == TRANSPORT_DIRECTION_SOURCE:
+            target = resource_transport.source
+        else:
+            target = resource_transport.destination
 
-            if resource_transport.state == STATE_MOVING:
-                self.handle_movement(resource_transport)
-                continue
+        target = resource_transport.resolve(target) if target else None
 
-            import pdb; pdb.set_trace()
-            raise RuntimeError
+        # Until the travel gets it there.
+        return bool(
+            target and not resource_transport.position() == target.position
+        )
 
     def handle_idle(self, resource_transport: ResourceTransport) -> None:
         if not resource_transport.source:
             resource_transport.stop()
             return
 
-        source = resource_transport.source()
+        source = resource_transport.resolve(resource_transport.source)
         if not source:
             resource_transport.stop()
             return
 
         resources: set = resource_transport.common_route_resources()
 
+        waiting = self._waiting.get(resource_transport, None)
+        if (
+            waiting is not None
+            and waiting[0] is source
+            and waiting[1] is source.storages
+            and waiting[2] == resources
+        ):
+            return
+
         if not source.inventory.available_for_transport(resources):
+            self._waiting[resource_transport] = (
+                source, source.storages, set(resources)
+            )
+            self._waiting_on.setdefault(source, set()).add(
+                resource_transport
+            )
             return
 
+        self._waiting.pop(resource_transport, None)
+
         if not resource_transport.position() == source.position:
             resource_transport.direction = TRANSPORT_DIRECTION_SOURCE
             resource_transport.state_change(STATE_MOVING)
@@ -263,7 +562,7 @@ class ResourceTransportSystem:
             resource_transport.stop()
             return
 
-        source = resource_transport.source()
+        source = resource_transport.resolve(resource_transport.source)
         if not source:
             resource_transport.stop()
             return
@@ -304,7 +603,9 @@ class ResourceTransportSystem:
             resource_transport.state_change(STATE_IDLE)
             return
 
-        destination = resource_transport.destination()
+        destination = resource_transport.resolve(
+            resource_transport.destination
+        )
         if not destination:
             # TODO HERE MIGHT BE BUG?
             resource_transport.stop()
@@ -319,7 +620,7 @@ class ResourceTransportSystem:
                 resource_transport.stop()
                 return
 
-            source = resource_transport.source()
+            source = resource_transport.resolve(resource_transport.source)
             if resource_transport.position() == source.position:
                 resource_transport.state_change(STATE_LOADING)
                 return
@@ -328,7 +629,9 @@ class ResourceTransportSystem:
                 resource_transport.stop()
                 return
 
-            destination = resource_transport.destination()
+            destination = resource_transport.resolve(
+                resource_transport.destination
+            )
 
             if not destination:
                 resource_transport.stop()
@@ -343,7 +646,9 @@ class ResourceTransportSystem:
             resource_transport.stop()
             return
 
-        destination = resource_transport.destination()
+        destination = resource_transport.resolve(
+            resource_transport.destination
+        )
         if not destination:
             resource_transport.stop()
             return
@@ -405,7 +710,7 @@ class ResourceTransportSystem:
 
         source = None
         if resource_transport.source:
-            source = resource_transport.source()
+            source = resource_transport.resolve(resource_transport.source)
 
         if len(rejected) == resources and len(accepted) == 0:
             logger.debug(
@@ -420,7 +725,7 @@ class ResourceTransportSystem:
             resource_transport.destination = None
 
         if resource_transport.source:
-            source = resource_transport.source()
+            source = resource_transport.resolve(resource_transport.source)
 
             if source:
                 resource_transport.owner.travel.start(source)
@@ -1,13 +1,14 @@
 import structlog
-import weakref
 from typing import List, Optional, Type, Tuple
 
+from settlers.engine.components.movement import Travel
 from settlers.engine.components.worker import Worker
 from settlers.engine.entities.entity import Entity
 from settlers.engine.entities.position import Position
 from settlers.engine.entities.resources import Resource
 from settlers.engine.entities.resources.resource_storage import ResourceStorage
 from settlers.engine.components.factory import Factory, FactorySystem, Pipeline as FactoryPipeline 
+from settlers.engine.prefabs import Prefab
 from settlers.engine.world import World
 
 STATE_IDLE = 'idle'
@@ -49,17 +50,18 @@ class EntitySpawnSpec:
 
 
 class SpawnerOutput:
-    __slots__ = ('quantity', 'entity_class')
+    __slots__ = ('entity_class', 'prefab', 'quantity')
 
     def __init__(
         self, quantity: int, entity: Type[Entity] 
     ) -> None:
         self.entity_class: Type[Entity] = entity
+        self.prefab: Prefab = Prefab(entity)
         self.quantity: int = quantity
 
     def build(self) -> Entity:
         # TODO Update spawn position to the spawner
-        spawned = self.entity_class()
+        spawned = self.prefab.build()
 
         return spawned
 
@@ -99,6 +101,11 @@ class Spawner(Factory):
 class SpawnerSystem(FactorySystem):
     component_types = [Spawner]
 
+    reads: tuple = (Position,)
+    writes: tuple = (
+        ResourceStorage, Spawner, SpawnerWorker, Travel, 'VillagerAi'
+    )
+
     def __init__(self, world: World) -> None:
         super().__init__()
         self.world: World = world
@@ -114,4 +121,4 @@ class SpawnerSystem(FactorySystem):
 
         for spawn in spawns:
             spawn.on_spawn([position])
-            self.world.add_entity(spawn)
+            self.world.commands.spawn(spawn)
@@ -1,8 +1,8 @@
 import structlog
 from typing import Callable, List, Optional
-import weakref
 
 from . import Component
+from ..handles import Handle
 
 STATE_IDLE: str = 'idle'
 STATE_ACTIVE: str = 'active'
@@ -12,7 +12,7 @@ logger = structlog.get_logger('engine.worker')
 
 class Worker(Component):
     __slots__ = (
-        '_on_end_callbacks', 'pipeline', 'progress', 'state', 'workplace'
+        '_on_end_callbacks', 'completes_at', 'pipeline', 'state', 'workplace'
     )
 
     exposed_as = 'work'
@@ -23,15 +23,16 @@ class Worker(Component):
 
         self.state: str = STATE_IDLE
         self.pipeline: Optional[list] = None
-        self.progress: int = 0
-        self.workplace: Optional[weakref.ReferenceType] = None
+        # Tick the work in progress completes at.
+        self.completes_at: Optional[int] = None
+        self.workplace: Optional[Handle] = None
         self._on_end_callbacks: List[Callable] = []
 
     def can_work(self) -> bool:
         if not self.workplace:
             return False
 
-        workplace = self.workplace()
+        workplace = self.resolve(self.workplace)
         if not workplace:
             return False
 
@@ -69,7 +70,7 @@ class Worker(Component):
         if not target.add_worker(self):
             return False
 
-        self.workplace = weakref.ref(target)
+        self.workplace = self.handle(target)
         return True
 
     def state_change(self, new_state: str) -> None:
@@ -84,7 +85,7 @@ class Worker(Component):
             component=self.__class__.__name__,
         )
 
-        self.state = new_state
+        self.set_state(new_state)
 
     def stop(self) -> None:
         self.state_change(STATE_IDLE)
@@ -93,7 +94,7 @@ class Worker(Component):
             callback(self)
 
         if self.workplace:
-            workplace = self.workplace()
+            workplace = self.resolve(self.workplace)
             if workplace:
                 workplace.remove_worker(self)
 
@@ -107,6 +108,10 @@ class Worker(Component):
 
         self._on_end_callbacks = []
 
+    def despawn(self) -> None:
+        if self.workplace:
+            self.stop()
+
     def __repr__(self) -> str:
         return "<{owner}#{component} {id}".format(
             owner=self.owner,
@@ -1,9 +1,36 @@
+from typing import Optional, TYPE_CHECKING
+
 from ..components import Components
 
+if TYPE_CHECKING:
+    from settlers.engine.prefabs import Prefab
+
 
 class Entity:
+    '''
+    Entities of classes declaring a `pool_size` are kept for reuse by the
+    prefab which built them once despawned, see
+    `settlers.engine.prefabs.Prefab`.
+    '''
+    pool_size: int = 0
+
     def __init__(self) -> None:
         self.components: Components = Components(self)
+        self.id: Optional[int] = None
+        self.prefab: Optional['Prefab'] = None
 
     def initialize(self) -> None:
         self.components.initialize()
+
+    '''
+    Resets a pooled entity as if it was created with `arguments`, keeping
+    its components aside for reuse (see `Components.recycle`).
+    '''
+    def recycle(self, *arguments) -> None:
+        components: Components = self.components
+        prefab: Optional['Prefab'] = self.prefab
+
+        self.__init__(*arguments)
+
+        self.components = components
+        self.prefab = prefab
@@ -5,7 +5,7 @@ class Position(Component):
     __slots__ = ('x', 'y')
 
     exposed_as = 'position'
-    exposed_methods = ('update')
+    exposed_methods = ('update',)
 
     def __init__(self, owner, x: int, y: int):
         super().__init__(owner)
@@ -18,7 +18,7 @@ class Position(Component):
         self.y += velocity.y
 
     def __eq__(self, other):
-        if isinstance(other, self.__class__):
+        if isinstance(other, Position):
             return self.x == other.x and self.y == other.y
         return False
 
@@ -1,6 +1,10 @@
-from typing import Dict, List, Type
+from typing import Dict, List, Optional, Type
 
 from settlers.engine.entities.resources import Resource
+from settlers.engine.events import (
+    EventBus, StorageBecameEmpty, StorageBecameFull, StorageBecameNonEmpty,
+    StorageBecameNotFull
+)
 
 
 class ResourceStorage:
@@ -8,6 +12,8 @@ class ResourceStorage:
         'allows_incoming',
         'allows_outgoing',
         'capacity',
+        'events',
+        'owner',
         'priority',
         '_storage',
     )
@@ -22,12 +28,61 @@ class ResourceStorage:
         self.priority = min(priority, 3)
         self._storage: List[Resource] = []
 
+        self.events: Optional[EventBus] = None
+        self.owner: Optional[object] = None
+
+    '''
+    Publishes the empty / full transitions on `events`, see
+    `EventBus.watch_storages`.
+    '''
+    def bind(self, owner: object, events: Optional[EventBus]) -> None:
+        self.events = events
+        self.owner = owner
+
     def add(self, item: Resource) -> bool:
         if len(self._storage) < self.capacity:
             self._storage.append(item)
+
+            if self.events is not None:
+                self._published_add()
             return True
         return False
 
+    '''
+    Adds up to `count` `item`s at once and returns how many fit. The
+    transitions are published once for the whole batch.
+    '''
+    def add_many(self, item: Resource, count: int) -> int:
+        added = max(0, min(count, self.capacity - len(self._storage)))
+        if not added:
+            return 0
+
+        was_empty = not self._storage
+        self._storage.extend([item] * added)
+
+        if self.events is not None:
+            if was_empty:
+                self.events.publish(StorageBecameNonEmpty, self)
+            if len(self._storage) == self.capacity:
+                self.events.publish(StorageBecameFull, self)
+        return added
+
+    def _published_add(self) -> None:
+        quantity = len(self._storage)
+
+        if quantity == 1:
+            self.events.publish(StorageBecameNonEmpty, self)
+        if quantity == self.capacity:
+            self.events.publish(StorageBecameFull, self)
+
+    def _published_remove(self) -> None:
+        quantity = len(self._storage)
+
+        if quantity == self.capacity - 1:
+            self.events.publish(StorageBecameNotFull, self)
+        if quantity == 0:
+            self.events.publish(StorageBecameEmpty, self)
+
     def available(self) -> int:
         return self.capacity - len(self._storage)
 
@@ -41,10 +96,39 @@ class ResourceStorage:
         return len(self._storage)
 
     def pop(self) -> Resource:
-        return self._storage.pop()
+        item = self._storage.pop()
+
+        if self.events is not None:
+            self._published_remove()
+        return item
+
+    '''
+    Pops up to `count` items at once, in `pop` order, publishing the
+    transitions once for the whole batch.
+    '''
+    def pop_many(self, count: int) -> List[Resource]:
+        count = min(count, len(self._storage))
+        if count <= 0:
+            return []
+
+        was_full = len(self._storage) == self.capacity
+        items = self._storage[-count:]
+        del self._storage[-count:]
+        items.reverse()
+
+        if self.events is not None:
+            if was_full:
+                self.events.publish(StorageBecameNotFull, self)
+            if not self._storage:
+                self.events.publish(StorageBecameEmpty, self)
+        return items
 
     def remove(self, item: Resource) -> Resource:
-        return self._storage.remove(item)
+        removed = self._storage.remove(item)
+
+        if self.events is not None:
+            self._published_remove()
+        return removed
 
     def __iter__(self) -> iter:
         return iter(self._storage)
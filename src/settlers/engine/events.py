@@ -0,0 +1,157 @@
+from collections import defaultdict
+from typing import Callable, Dict, List, Type
+
+
+'''
+Events expose the `owner` entity they concern, used to wake dormant
+components (see `Component.sleep`).
+'''
+class Event:
+    __slots__ = ()
+
+    @property
+    def owner(self):
+        return None
+
+
+class StateChanged(Event):
+    __slots__ = ('component', 'old_state', 'new_state')
+
+    def __init__(self, component, old_state: str, new_state: str) -> None:
+        self.component = component
+        self.old_state: str = old_state
+        self.new_state: str = new_state
+
+    @property
+    def owner(self):
+        return self.component.owner
+
+
+'''
+A `Travel` reached its destination and stopped.
+'''
+class Arrived(Event):
+    __slots__ = ('destination', 'travel')
+
+    def __init__(self, travel, destination) -> None:
+        self.travel = travel
+        self.destination = destination
+
+    @property
+    def owner(self):
+        return self.travel.owner
+
+
+'''
+A worker left a workplace (`Factory`, `Harvestable`) which can take a new one.
+'''
+class WorkerSlotFreed(Event):
+    __slots__ = ('workplace', 'worker')
+
+    def __init__(self, workplace, worker) -> None:
+        self.workplace = workplace
+        self.worker = worker
+
+    @property
+    def owner(self):
+        return self.workplace.owner
+
+
+'''
+A worker joined a workplace (`Construction`, `Factory`, `Harvestable`).
+'''
+class WorkerSlotTaken(WorkerSlotFreed):
+    __slots__ = ()
+
+
+'''
+The storages of an entity were bound to the world, either when it was added
+or when they were replaced.
+'''
+class StoragesBound(Event):
+    __slots__ = ('entity',)
+
+    def __init__(self, entity) -> None:
+        self.entity = entity
+
+    @property
+    def owner(self):
+        return self.entity
+
+
+class StorageEvent(Event):
+    __slots__ = ('storage',)
+
+    def __init__(self, storage) -> None:
+        self.storage = storage
+
+    @property
+    def owner(self):
+        return self.storage.owner
+
+
+class StorageBecameNonEmpty(StorageEvent):
+    __slots__ = ()
+
+
+class StorageBecameEmpty(StorageEvent):
+    __slots__ = ()
+
+
+class StorageBecameFull(StorageEvent):
+    __slots__ = ()
+
+
+class StorageBecameNotFull(StorageEvent):
+    __slots__ = ()
+
+
+Handler = Callable[[Event], None]
+
+
+'''
+Synchronous, typed publish/subscribe channel of a single world.
+
+Handlers subscribe to an exact event class and are called, in subscription
+order, on the thread publishing the event. Events are only instantiated when
+their class has subscribers, publishing nobody listens to costs a dict
+lookup.
+'''
+class EventBus:
+    __slots__ = ('_handlers',)
+
+    def __init__(self) -> None:
+        self._handlers: Dict[Type[Event], List[Handler]] = defaultdict(list)
+
+    def subscribe(self, event_type: Type[Event], handler: Handler) -> None:
+        self._handlers[event_type].append(handler)
+
+    def unsubscribe(self, event_type: Type[Event], handler: Handler) -> None:
+        handlers = self._handlers.get(event_type, None)
+        if handlers and handler in handlers:
+            handlers.remove(handler)
+
+    def wants(self, event_type: Type[Event]) -> bool:
+        return bool(self._handlers.get(event_type, None))
+
+    def publish(self, event_type: Type[Event], *arguments) -> None:
+        handlers = self._handlers.get(event_type, None)
+        if not handlers:
+            return
+
+        event = event_type(*arguments)
+        for handler in tuple(handlers):
+            handler(event)
+
+    '''
+    Binds resource storages to the bus so they publish their transitions.
+    Storages already holding items announce it as they become visible.
+    '''
+    def watch_storages(self, owner, storages: dict) -> None:
+        for storage in storages.values():
+            storage.bind(owner, self)
+
+            if not storage.is_empty():
+                self.publish(StorageBecameNonEmpty, storage)
+
+        self.publish(StoragesBound, owner)
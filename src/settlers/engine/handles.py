@@ -0,0 +1,28 @@
+from typing import NamedTuple, Optional
+
+
+'''
+Generational reference to an entity of a world, or to one of its components
+when `component_type` is set.
+
+`index` is the entity identifier in its `ComponentManager` and `generation`
+the number of entities which held that identifier before it. Identifiers of
+removed entities are handed out again with the next generation, so a handle
+outliving its entity resolves to `None` instead of to the newcomer. Handles
+are plain values: they compare equal when they point to the same target and
+do not keep it alive.
+'''
+class Handle(NamedTuple):
+    index: int
+    generation: int
+    component_type: Optional[type] = None
+
+    def __repr__(self) -> str:
+        return "<Handle {index}:{generation}{component}>".format(
+            index=self.index,
+            generation=self.generation,
+            component=(
+                '' if self.component_type is None
+                else ' ' + self.component_type.__name__
+            ),
+        )
@@ -0,0 +1,492 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import structlog
+import threading
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple, Union
+
+from settlers.engine.commands import CommandBuffer
+from settlers.engine.components import Component, ComponentManager, Query
+from settlers.engine.entities.resources.resource_storage import (
+    ResourceStorage
+)
+from settlers.engine.queries import Index
+
+logger = structlog.get_logger('engine.parallel')
+
+
+'''
+Component classes a system declares it reads and writes.
+
+Systems declare them with class attributes, both optional:
+
+- `reads`: component classes the system only looks at
+- `writes`: component classes the system mutates, including through the
+  methods and `on_end` callbacks of components owned by other entities
+
+Classes the engine cannot import, like game components written by callbacks,
+are declared by name. Shared state which is not a component (e.g.
+`ResourceStorage`) is declared the same way so it counts for conflicts.
+
+The query `component_types` are always read. A system without any
+declaration, or with `exclusive = True` (e.g. it draws from the global
+`random` state), conflicts with every other system and always runs alone.
+'''
+class SystemAccess:
+    __slots__ = ('declared', 'exclusive', 'reads', 'system', 'writes')
+
+    def __init__(self, system: object) -> None:
+        reads = getattr(system, 'reads', None)
+        writes = getattr(system, 'writes', None)
+
+        self.system = system
+        self.declared: bool = reads is not None or writes is not None
+        self.exclusive: bool = (
+            bool(getattr(system, 'exclusive', False)) or not self.declared
+        )
+        self.writes: FrozenSet[str] = frozenset(
+            access_name(declared) for declared in writes or ()
+        )
+        self.reads: FrozenSet[str] = frozenset(
+            access_name(declared)
+            for declared in tuple(reads or ()) + tuple(system.component_types)
+        ) | self.writes
+
+    def conflicts(self, other: 'SystemAccess') -> bool:
+        if self.exclusive or other.exclusive:
+            return True
+
+        return bool(
+            self.writes & other.reads
+            or other.writes & self.reads
+        )
+
+    def __repr__(self) -> str:
+        return (
+            "<{klass} {system} reads={reads} writes={writes}{exclusive}>"
+        ).format(
+            klass=self.__class__.__name__,
+            system=self.system.__class__.__name__,
+            reads=sorted(self.reads),
+            writes=sorted(self.writes),
+            exclusive=' exclusive' if self.exclusive else '',
+        )
+
+
+def access_name(declared: Union[type, str]) -> str:
+    if isinstance(declared, str):
+        return declared
+    return declared.__name__
+
+
+'''
+Splits systems into stages of mutually non conflicting systems.
+
+A system goes to the stage after the last one holding a system it conflicts
+with, so any two conflicting systems keep their relative order and the
+result only depends on the order systems were given in.
+'''
+def stages(accesses: List[SystemAccess]) -> List[List[SystemAccess]]:
+    result: List[List[SystemAccess]] = []
+
+    for access in accesses:
+        index = 0
+        for stage_index in range(len(result) - 1, -1, -1):
+            if any(access.conflicts(other) for other in result[stage_index]):
+                index = stage_index + 1
+                break
+
+        if index == len(result):
+            result.append([])
+        result[index].append(access)
+
+    return result
+
+
+_checked = threading.local()
+
+'''
+Attributes every system may read on any component: they link a component
+to its entity and registry rather than hold its state.
+'''
+_UNCHECKED_READS: FrozenSet[str] = frozenset(('component_type', 'owner'))
+
+'''
+`ResourceStorage` methods changing its content, systems calling them on a
+storage of an entity in the world must declare `ResourceStorage` in
+`writes`.
+'''
+_STORAGE_MUTATORS: Tuple[str, ...] = (
+    'add', 'add_many', 'pop', 'pop_many', 'remove'
+)
+
+'''
+Engine bookkeeping running while a system is, on behalf of no system in
+particular (e.g. index keys refreshed by the events a system triggers).
+'''
+_BOOKKEEPING: Tuple[Tuple[type, str], ...] = ((Index, '_index'),)
+
+_unpatched: Dict[Tuple[type, str], Callable] = {}
+
+'''
+Components being built, or owned by entities not added to a world yet (e.g.
+built for a spawn command), are private to the system creating them.
+'''
+def _registered(component: Component) -> bool:
+    owner = getattr(component, 'owner', None)
+    if owner is None:
+        return False
+
+    components = getattr(owner, 'components', None)
+    return components is None or components.manager is not None
+
+
+def _violation(
+    access: SystemAccess, action: str, name: str, declared: str,
+    owner: object
+) -> RuntimeError:
+    return RuntimeError(
+        "{system} {action} `{attr}` of undeclared {declared} of {owner}"
+        .format(
+            system=access.system.__class__.__name__,
+            action=action,
+            attr=name,
+            declared=declared,
+            owner=owner,
+        )
+    )
+
+
+def _checked_setattr(component: Component, name: str, value) -> None:
+    access: Optional[SystemAccess] = getattr(_checked, 'access', None)
+
+    if (
+        access is not None
+        and access.declared
+        and component.component_type.__name__ not in access.writes
+        and _registered(component)
+    ):
+        raise _violation(
+            access, 'wrote', name, component.component_type.__name__,
+            component.owner
+        )
+
+    object.__setattr__(component, name, value)
+
+
+def _checked_getattribute(component: Component, name: str):
+    access: Optional[SystemAccess] = getattr(_checked, 'access', None)
+
+    if (
+        access is not None
+        and access.declared
+        and name not in _UNCHECKED_READS
+        and not name.startswith('__')
+    ):
+        component_type = object.__getattribute__(component, 'component_type')
+
+        if (
+            component_type.__name__ not in access.reads
+            and _registered(component)
+        ):
+            raise _violation(
+                access, 'read', name, component_type.__name__,
+                component.owner
+            )
+
+    return object.__getattribute__(component, name)
+
+
+def _checked_mutator(name: str, mutator: Callable) -> Callable:
+    def checked(storage: ResourceStorage, *arguments):
+        access: Optional[SystemAccess] = getattr(_checked, 'access', None)
+
+        if (
+            access is not None
+            and access.declared
+            and 'ResourceStorage' not in access.writes
+            and storage.owner is not None
+        ):
+            raise _violation(
+                access, 'called', name, 'ResourceStorage', storage.owner
+            )
+
+        return mutator(storage, *arguments)
+
+    checked.__name__ = mutator.__name__
+    checked.__doc__ = mutator.__doc__
+    return checked
+
+
+def _unchecked(method: Callable) -> Callable:
+    def unchecked(*arguments):
+        with checking(None):
+            return method(*arguments)
+
+    unchecked.__name__ = method.__name__
+    unchecked.__doc__ = method.__doc__
+    return unchecked
+
+
+def _patch(klass: type, name: str, wrap: Callable[[Callable], Callable]):
+    method = _unpatched.setdefault((klass, name), klass.__dict__[name])
+    setattr(klass, name, wrap(method))
+
+
+'''
+Identifies the content of a container held by a component: values by
+equality, anything else by identity.
+'''
+def _token(value) -> object:
+    if value is None or isinstance(value, (int, float, str, tuple)):
+        return value
+    return id(value)
+
+
+def _contents(container) -> object:
+    if isinstance(container, dict):
+        return tuple(
+            (_token(key), _token(value)) for key, value in container.items()
+        )
+    if isinstance(container, (set, frozenset)):
+        return frozenset(_token(value) for value in container)
+    return tuple(_token(value) for value in container)
+
+
+def _slot_names(component_class: type) -> Tuple[str, ...]:
+    names: List[str] = []
+    for klass in component_class.__mro__:
+        slots = klass.__dict__.get('__slots__', ())
+        names.extend((slots,) if isinstance(slots, str) else slots)
+    return tuple(names)
+
+
+'''
+Records the lists, dicts, sets and deques held by the registered components
+`accesses` do not declare in `writes`, see `_check_containers`.
+'''
+def _snapshot_containers(
+    manager: ComponentManager, accesses: List[SystemAccess]
+) -> List[Tuple[Component, str, object, object]]:
+    if not all(access.declared for access in accesses):
+        return []
+
+    writes: FrozenSet[str] = frozenset().union(
+        *(access.writes for access in accesses)
+    )
+    snapshot: List[Tuple[Component, str, object, object]] = []
+
+    for component in manager.registered_components():
+        if component.component_type.__name__ in writes:
+            continue
+
+        for name in _slot_names(component.__class__):
+            container = getattr(component, name, None)
+            if isinstance(container, (deque, dict, list, set)):
+                snapshot.append(
+                    (component, name, container, _contents(container))
+                )
+
+    return snapshot
+
+
+'''
+Fails when a container recorded by `_snapshot_containers` was changed in
+place (e.g. `factory.workers.remove(...)`) while `accesses` ran.
+'''
+def _check_containers(
+    snapshot: List[Tuple[Component, str, object, object]],
+    accesses: List[SystemAccess]
+) -> None:
+    for component, name, container, contents in snapshot:
+        if _contents(container) == contents:
+            continue
+
+        raise RuntimeError(
+            "{systems} changed `{attr}` of undeclared {component} of {owner}"
+            .format(
+                systems=', '.join(
+                    access.system.__class__.__name__ for access in accesses
+                ),
+                attr=name,
+                component=component.component_type.__name__,
+                owner=component.owner,
+            )
+        )
+
+
+'''
+Fails loudly whenever a system touches a component class it did not
+declare, it is meant for debugging and test runs:
+
+- attributes set on a component class missing from `writes`
+- attributes read on a component class missing from `reads` (the query
+  `component_types` and `writes` count as read)
+- `ResourceStorage` content changed without `ResourceStorage` in `writes`
+- lists, dicts, sets and deques held by a component class missing from
+  `writes` changed in place, checked after every system (after every stage
+  when systems run concurrently)
+
+Changes made through objects a component holds (e.g. a factory pipeline)
+are not tracked beyond the storages.
+'''
+def enable_access_checks() -> None:
+    Component.__setattr__ = _checked_setattr
+    Component.__getattribute__ = _checked_getattribute
+
+    for name in _STORAGE_MUTATORS:
+        _patch(
+            ResourceStorage, name,
+            lambda mutator, name=name: _checked_mutator(name, mutator)
+        )
+
+    for klass, name in _BOOKKEEPING:
+        _patch(klass, name, _unchecked)
+
+
+def disable_access_checks() -> None:
+    for name in ('__getattribute__', '__setattr__'):
+        if name in Component.__dict__:
+            delattr(Component, name)
+
+    for (klass, name), method in _unpatched.items():
+        setattr(klass, name, method)
+    _unpatched.clear()
+
+
+def access_checks_enabled() -> bool:
+    return Component.__dict__.get('__setattr__', None) is _checked_setattr
+
+
+@contextmanager
+def checking(access: SystemAccess):
+    previous = getattr(_checked, 'access', None)
+    _checked.access = access
+    try:
+        yield
+    finally:
+        _checked.access = previous
+
+
+'''
+Runs the due systems of a tick stage by stage.
+
+With `workers` > 0 the systems of a stage run concurrently on a thread pool,
+otherwise (the deterministic fallback) they run one after the other in
+scheduler order. Systems running concurrently must only make structural
+changes through the world `CommandBuffer`.
+'''
+class SystemExecutor:
+    __slots__ = ('workers', '_accesses', '_pool')
+
+    def __init__(self, workers: int = 0) -> None:
+        self.workers: int = workers
+        self._accesses: Dict[object, SystemAccess] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        if workers > 0:
+            self._pool = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='settlers-system'
+            )
+
+    def access(self, system: object) -> SystemAccess:
+        access = self._accesses.get(system, None)
+        if access is None:
+            access = SystemAccess(system)
+            self._accesses[system] = access
+        return access
+
+    '''
+    `runs` holds each due system with its query. A query is only read right
+    before its system runs (before its stage starts when concurrent) so it
+    reflects what earlier systems did, systems with nothing to process are
+    skipped. Commands recorded by systems of a concurrent stage are tagged
+    with the system position so they are applied in scheduler order.
+
+    With access checks enabled, `manager` (the registry the systems run
+    against) is checked for containers changed in place by undeclared
+    systems, see `enable_access_checks`.
+    '''
+    def run(
+        self, tick: int, runs: List[Tuple[object, Query]],
+        commands: CommandBuffer, manager: Optional[ComponentManager] = None
+    ) -> None:
+        accesses = [self.access(system) for system, _query in runs]
+        queries = {system: query for system, query in runs}
+        check: bool = access_checks_enabled()
+        check_containers: bool = check and manager is not None
+
+        def run_one(access: SystemAccess, entity_components: list) -> None:
+            if not check:
+                access.system.process(tick, entity_components)
+                return
+
+            with checking(access):
+                access.system.process(tick, entity_components)
+
+        def run_recorded(
+            position: int, access: SystemAccess, entity_components: list
+        ) -> None:
+            with commands.recording(position):
+                run_one(access, entity_components)
+
+        if self._pool is None:
+            for access in accesses:
+                entity_components = queries[access.system].components()
+                if not entity_components:
+                    continue
+
+                if not check_containers:
+                    run_one(access, entity_components)
+                    continue
+
+                snapshot = _snapshot_containers(manager, [access])
+                run_one(access, entity_components)
+                _check_containers(snapshot, [access])
+            return
+
+        positions = {
+            access: position for position, access in enumerate(accesses)
+        }
+
+        for stage in stages(accesses):
+            ready = [
+                (access, queries[access.system].components())
+                for access in stage
+            ]
+            ready = [
+                (access, entity_components)
+                for access, entity_components in ready if entity_components
+            ]
+
+            snapshot = []
+            if check_containers:
+                snapshot = _snapshot_containers(
+                    manager, [access for access, _components in ready]
+                )
+
+            if len(ready) == 1:
+                access, entity_components = ready[0]
+                run_recorded(positions[access], access, entity_components)
+            else:
+                futures = [
+                    self._pool.submit(
+                        run_recorded, positions[access], access,
+                        entity_components
+                    )
+                    for access, entity_components in ready
+                ]
+
+                for future in futures:
+                    future.result()
+
+            if snapshot:
+                _check_containers(
+                    snapshot, [access for access, _components in ready]
+                )
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
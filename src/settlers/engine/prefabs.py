@@ -0,0 +1,86 @@
+from typing import Any, Callable, Iterable, List, Optional, Tuple, Type, Union
+
+from settlers.engine.components import (
+    ComponentDeclaration, parse_declaration
+)
+from settlers.engine.entities.entity import Entity
+
+Overrides = Union[Iterable[Any], Callable[[Entity], Iterable[Any]]]
+
+
+'''
+Template creating entities of one class.
+
+The component declarations of the entity class are resolved once per class
+(see `settlers.engine.components.declared_components`) and the `components`
+every entity of the prefab gets on top of them are parsed once, when the
+prefab is created. `arguments` are passed to the entity class.
+
+Up to `pool_size` (by default the `pool_size` of the entity class) despawned
+entities are kept and reused by `build`: the entity is reset through
+`Entity.recycle` and its components are reinitialized in place.
+'''
+class Prefab:
+    __slots__ = (
+        'arguments', 'components', 'entity_class', 'pool', 'pool_size'
+    )
+
+    def __init__(
+        self, entity_class: Type[Entity], arguments: Iterable = (),
+        components: Iterable[Any] = (), pool_size: Optional[int] = None
+    ) -> None:
+        self.entity_class: Type[Entity] = entity_class
+        self.arguments: Tuple = tuple(arguments)
+        self.components: Tuple[ComponentDeclaration, ...] = tuple(
+            parse_declaration(component_definition)
+            for component_definition in components
+        )
+        self.pool: List[Entity] = []
+        self.pool_size: int = (
+            entity_class.pool_size if pool_size is None else pool_size
+        )
+
+    '''
+    Creates and initializes an entity, `overrides` are component
+    definitions added to this entity only, or a callable returning them from
+    the new entity. The entity is not added to any world.
+    '''
+    def build(self, overrides: Overrides = ()) -> Entity:
+        if self.pool:
+            entity: Entity = self.pool.pop()
+            entity.recycle(*self.arguments)
+        else:
+            entity = self.entity_class(*self.arguments)
+            entity.prefab = self
+
+        components = entity.components
+
+        for component_class, arguments in self.components:
+            components.create(component_class, arguments)
+
+        if callable(overrides):
+            overrides = overrides(entity)
+
+        for component_definition in overrides:
+            components.add(component_definition)
+
+        entity.initialize()
+        return entity
+
+    '''
+    Takes back a despawned entity built by this prefab, returns whether it
+    was pooled.
+    '''
+    def release(self, entity: Entity) -> bool:
+        if len(self.pool) >= self.pool_size:
+            return False
+
+        entity.components.recycle()
+        self.pool.append(entity)
+        return True
+
+    def __repr__(self) -> str:
+        return "<{klass} {entity_class}>".format(
+            klass=self.__class__.__name__,
+            entity_class=self.entity_class.__name__,
+        )
@@ -0,0 +1,450 @@
+from collections import defaultdict
+from math import ceil
+from typing import Dict, List, Optional, Set
+
+from settlers.engine.components.factory import Factory, Pipeline
+from settlers.engine.components.generative import Generative
+from settlers.engine.components.harvesting import Harvestable, Harvester
+
+
+'''
+Rates are in cycles or items per tick, the solver stops once no rate moves
+by more than `EPSILON` or after `MAX_ITERATIONS` passes.
+'''
+EPSILON: float = 1e-12
+MAX_ITERATIONS: int = 1000
+
+
+'''
+Ticks a worker spends per cycle taking `ticks` on a system running every
+`interval` ticks: the cycle completes on the first run `ticks` after the
+one it started on, the next one starts on the run after.
+'''
+def cycle_ticks(ticks: int, interval: int) -> int:
+    return (-(-ticks // interval) + 1) * interval
+
+
+'''
+Interval of the system processing `component_class`, 1 when none does.
+'''
+def run_interval(world, component_class: type) -> int:
+    for entry in world.scheduler.entries:
+        if component_class in entry.system.component_types:
+            return entry.interval
+
+    return 1
+
+
+def produced_by(pipeline: Pipeline) -> type:
+    output = pipeline.output
+
+    # Spawner pipelines output entities, see `SpawnerOutput`.
+    return getattr(output, 'resource', None) or output.entity_class
+
+
+'''
+One way of making `quantity` of `output` per cycle out of `inputs`: a
+pipeline of a factory or harvesting a source. `capacity` is the most
+cycles per tick it runs at, fully staffed and never waiting on an input.
+Sources nothing grows back have the `stock` they hold left.
+'''
+class Process:
+    __slots__ = (
+        'capacity', 'component', 'cycle_ticks', 'inputs', 'output',
+        'quantity', 'stock'
+    )
+
+    def __init__(
+        self, component, inputs: Dict[type, int], output: type,
+        quantity: int, cycle_ticks: int, capacity: float,
+        stock: Optional[int] = None
+    ) -> None:
+        self.capacity: float = capacity
+        self.component = component
+        self.cycle_ticks: int = cycle_ticks
+        self.inputs: Dict[type, int] = inputs
+        self.output: type = output
+        self.quantity: int = quantity
+        self.stock: Optional[int] = stock
+
+    @property
+    def owner(self):
+        return self.component.owner
+
+    '''
+    Workers busy running `rate` cycles per tick.
+    '''
+    def workers(self, rate: float) -> float:
+        return rate * self.cycle_ticks
+
+    def __repr__(self) -> str:
+        return "<{klass} {owner} {output}x{quantity}>".format(
+            klass=self.__class__.__name__,
+            owner=self.owner,
+            output=self.output.__name__,
+            quantity=self.quantity,
+        )
+
+
+'''
+Resource graph of the production chains of a settlement: which processes
+make and use each resource, solved for its steady state with `solve`.
+
+Travel and transport are not accounted for: items are taken as available
+to their consumers as soon as they are made, so the rates are upper
+bounds of what the settlement achieves when ticked. Constructions are one
+off consumers, left to `demand`.
+'''
+class ProductionGraph:
+    __slots__ = ('processes', '_consumers', '_producers')
+
+    def __init__(self) -> None:
+        self.processes: List[Process] = []
+        self._consumers: Dict[type, List[Process]] = defaultdict(list)
+        self._producers: Dict[type, List[Process]] = defaultdict(list)
+
+    '''
+    Graph of the factories, spawners and harvestable sources of `world`,
+    with the intervals its systems are scheduled at.
+    '''
+    @classmethod
+    def from_world(cls, world) -> 'ProductionGraph':
+        graph = cls()
+        harvest_interval: int = run_interval(world, Harvester)
+
+        for entity in world.entities:
+            for component in entity.components:
+                if isinstance(component, Factory):
+                    graph.add_factory(
+                        component,
+                        run_interval(world, component.component_type)
+                    )
+                elif isinstance(component, Harvestable):
+                    graph.add_source(component, harvest_interval)
+
+        return graph
+
+    def add(self, process: Process) -> Process:
+        self.processes.append(process)
+        self._producers[process.output].append(process)
+
+        for resource in process.inputs:
+            self._consumers[resource].append(process)
+
+        return process
+
+    '''
+    A pipeline is run by one worker at a time, the workers of a factory
+    having fewer than it has pipelines are shared evenly between them.
+    '''
+    def add_factory(
+        self, factory: Factory, run_interval: int
+    ) -> List[Process]:
+        processes: List[Process] = []
+        if not factory.pipelines:
+            return processes
+
+        share: float = min(1.0, factory.max_workers / len(factory.pipelines))
+
+        for pipeline in factory.pipelines:
+            inputs: Dict[type, int] = defaultdict(int)
+            for input in pipeline.inputs:
+                inputs[input.resource] += input.quantity
+
+            ticks: int = cycle_ticks(
+                pipeline.ticks_per_cycle * run_interval, run_interval
+            )
+
+            processes.append(self.add(Process(
+                factory, dict(inputs), produced_by(pipeline),
+                pipeline.output.quantity, ticks, share / ticks
+            )))
+
+        return processes
+
+    '''
+    A source regrowing for good is harvested as fast as it grows back at
+    most, the others until their stock runs out.
+    '''
+    def add_source(
+        self, source: Harvestable, run_interval: int = 1
+    ) -> Process:
+        ticks: int = cycle_ticks(source.ticks_per_cycle, run_interval)
+        capacity: float = source.max_workers / ticks
+        stock: Optional[int] = None
+
+        generative: Optional[Generative] = source.owner.components.get(
+            Generative
+        )
+        if generative is not None and generative.unlimited:
+            regrowth: float = (
+                generative.increase_per_cycle
+                / (generative.ticks_per_cycle + 1)
+            )
+            capacity = min(
+                capacity, regrowth / source.harvest_value_per_cycle
+            )
+        else:
+            stock = source.harvestable_quantity()
+            if generative is not None:
+                stock += generative.increase_per_cycle * max(
+                    0, generative.max_cycles + 1 - generative.cycles
+                )
+
+        return self.add(Process(
+            source, {}, source.output, source.harvest_value_per_cycle, ticks,
+            capacity, stock
+        ))
+
+    def consumers(self, resource: type) -> List[Process]:
+        return self._consumers.get(resource, [])
+
+    def producers(self, resource: type) -> List[Process]:
+        return self._producers.get(resource, [])
+
+    def resources(self) -> Set[type]:
+        return set(self._producers) | set(self._consumers)
+
+    '''
+    Steady state rates of every process. Without `demand` every process
+    runs as fast as its inputs allow, what nobody consumes is left over.
+    With `demand`, items per tick wanted of some resources, processes only
+    run as fast as needed to meet it.
+
+    Producers of a resource take on what is needed of it one after the
+    other, in the order they were added, so as few of them as possible
+    work. Consumers share what is made of it in proportion to what they
+    could take of it if they had it all.
+    '''
+    def solve(
+        self, demand: Optional[Dict[type, float]] = None
+    ) -> 'ProductionPlan':
+        targets: Dict[Process, float] = self._targets(demand)
+        limits: Dict[Process, float] = self._limits(targets)
+        rates: Dict[Process, float] = dict(limits)
+
+        wanted: Dict[type, float] = {
+            resource: sum(
+                limits[consumer] * consumer.inputs[resource]
+                for consumer in self.consumers(resource)
+            )
+            for resource in self.resources()
+        }
+
+        for _ in range(MAX_ITERATIONS):
+            changed: bool = False
+
+            for process in self.processes:
+                rate: float = limits[process]
+
+                for resource in process.inputs:
+                    if not wanted[resource]:
+                        continue
+
+                    supplied: float = self._supplied(resource, rates)
+                    rate = min(
+                        rate,
+                        limits[process] * supplied / wanted[resource]
+                    )
+
+                if rates[process] - rate > EPSILON:
+                    rates[process] = rate
+                    changed = True
+
+            if not changed:
+                break
+
+        return ProductionPlan(self, targets, rates, demand or {})
+
+    '''
+    Rates processes run at to meet `demand`, as fast as they can without
+    one, inputs not taken into account.
+    '''
+    def _targets(
+        self, demand: Optional[Dict[type, float]]
+    ) -> Dict[Process, float]:
+        if demand is None:
+            return {process: process.capacity for process in self.processes}
+
+        targets: Dict[Process, float] = {
+            process: 0.0 for process in self.processes
+        }
+
+        for _ in range(MAX_ITERATIONS):
+            changed: bool = False
+
+            for resource in self.resources():
+                needed: float = demand.get(resource, 0.0) + sum(
+                    targets[consumer] * consumer.inputs[resource]
+                    for consumer in self.consumers(resource)
+                )
+
+                for producer in self.producers(resource):
+                    rate: float = min(
+                        producer.capacity, needed / producer.quantity
+                    )
+                    needed -= rate * producer.quantity
+
+                    if abs(rate - targets[producer]) > EPSILON:
+                        targets[producer] = rate
+                        changed = True
+
+            if not changed:
+                break
+
+        return targets
+
+    '''
+    Rates processes would run at below their `targets` if each one had
+    everything made of its inputs to itself.
+    '''
+    def _limits(
+        self, targets: Dict[Process, float]
+    ) -> Dict[Process, float]:
+        limits: Dict[Process, float] = dict(targets)
+
+        for _ in range(MAX_ITERATIONS):
+            changed: bool = False
+
+            for process in self.processes:
+                rate: float = targets[process]
+
+                for resource, quantity in process.inputs.items():
+                    rate = min(
+                        rate, self._supplied(resource, limits) / quantity
+                    )
+
+                if limits[process] - rate > EPSILON:
+                    limits[process] = rate
+                    changed = True
+
+            if not changed:
+                break
+
+        return limits
+
+    def _supplied(
+        self, resource: type, rates: Dict[Process, float]
+    ) -> float:
+        return sum(
+            rates[producer] * producer.quantity
+            for producer in self.producers(resource)
+        )
+
+
+'''
+Steady state of a `ProductionGraph`: `rates` in cycles per tick of every
+process, `targets` the rates they would run at with their inputs always
+available.
+'''
+class ProductionPlan:
+    __slots__ = ('demand', 'graph', 'rates', 'targets')
+
+    def __init__(
+        self, graph: ProductionGraph, targets: Dict[Process, float],
+        rates: Dict[Process, float], demand: Dict[type, float]
+    ) -> None:
+        self.demand: Dict[type, float] = demand
+        self.graph: ProductionGraph = graph
+        self.rates: Dict[Process, float] = rates
+        self.targets: Dict[Process, float] = targets
+
+    def produced(self, resource: type) -> float:
+        return sum(
+            self.rates[producer] * producer.quantity
+            for producer in self.graph.producers(resource)
+        )
+
+    def consumed(self, resource: type) -> float:
+        return sum(
+            self.rates[consumer] * consumer.inputs[resource]
+            for consumer in self.graph.consumers(resource)
+        )
+
+    '''
+    Items per tick of `resource` made and not consumed by other processes,
+    what is left for storages, constructions and `demand`.
+    '''
+    def throughput(self, resource: type) -> float:
+        return self.produced(resource) - self.consumed(resource)
+
+    '''
+    Items of every resource left over `ticks` later, for advancing regions
+    of the map without processing them.
+    '''
+    def balance(self, ticks: int) -> Dict[type, float]:
+        return {
+            resource: self.throughput(resource) * ticks
+            for resource in self.graph.resources()
+        }
+
+    def utilization(self, process: Process) -> float:
+        if not process.capacity:
+            return 0.0
+        return self.rates[process] / process.capacity
+
+    '''
+    Items per tick of every resource missing for processes to run at their
+    target rates and for `demand` to be met.
+    '''
+    def shortages(self) -> Dict[type, float]:
+        shortages: Dict[type, float] = {}
+
+        for resource in self.graph.resources():
+            wanted: float = self.demand.get(resource, 0.0) + sum(
+                self.targets[consumer] * consumer.inputs[resource]
+                for consumer in self.graph.consumers(resource)
+            )
+
+            missing: float = wanted - self.produced(resource)
+            if missing > EPSILON:
+                shortages[resource] = missing
+
+        return shortages
+
+    '''
+    Processes running at capacity and still not making enough of their
+    output, most missing output first: adding buildings, sources or
+    workers there raises the throughput of the chains they feed.
+    '''
+    def bottlenecks(self) -> List[Process]:
+        shortages: Dict[type, float] = self.shortages()
+
+        bottlenecks: List[Process] = [
+            process for process in self.graph.processes
+            if process.output in shortages
+            and self.utilization(process) >= 1.0 - EPSILON
+        ]
+        bottlenecks.sort(key=lambda process: -shortages[process.output])
+
+        return bottlenecks
+
+    '''
+    Ticks until the stock of a source runs out at the planned rate, `None`
+    for processes running for good.
+    '''
+    def depletes_in(self, process: Process) -> Optional[float]:
+        if process.stock is None:
+            return None
+
+        rate: float = self.rates[process] * process.quantity
+        if not rate:
+            return None
+
+        return process.stock / rate
+
+    def workers(self, process: Process) -> float:
+        return process.workers(self.rates[process])
+
+    '''
+    Workers every building or source needs to run at the planned rates.
+    '''
+    def required_workers(self) -> Dict[object, int]:
+        workers: Dict[object, float] = defaultdict(float)
+
+        for process in self.graph.processes:
+            workers[process.owner] += self.workers(process)
+
+        return {
+            owner: ceil(count - EPSILON) for owner, count in workers.items()
+        }
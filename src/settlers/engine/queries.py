@@ -0,0 +1,213 @@
+from typing import (
+    Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Type
+)
+
+from settlers.engine.components import Component, ComponentManager, Query
+from settlers.engine.events import Event
+
+
+'''
+Matches entities indexed under any of `keys` in a `where` clause.
+'''
+class AnyOf:
+    __slots__ = ('keys',)
+
+    def __init__(self, keys: Iterable) -> None:
+        self.keys: Tuple = tuple(keys)
+
+
+'''
+User defined attribute index of a component class, maintained incrementally.
+
+`keys(component)` returns the keys an entity is indexed under. They are
+computed when the component is registered and again whenever a `refresh_on`
+event concerns its owner, or on an explicit `refresh`. Keys must only depend
+on state those events (or `refresh` calls) cover.
+'''
+class Index:
+    __slots__ = (
+        'component_class', 'keys', 'name', 'refresh_on', '_by_key',
+        '_keys', '_manager'
+    )
+
+    def __init__(
+        self, component_class: Type[Component], name: str,
+        keys: Callable[[Component], Iterable],
+        refresh_on: Iterable[Type[Event]] = ()
+    ) -> None:
+        self.component_class: Type[Component] = component_class
+        self.keys: Callable[[Component], Iterable] = keys
+        self.name: str = name
+        self.refresh_on: Tuple[Type[Event], ...] = tuple(refresh_on)
+
+        self._by_key: Dict[Any, Set[int]] = {}
+        self._keys: Dict[int, Tuple] = {}
+        self._manager: Optional[ComponentManager] = None
+
+    def attach(self, manager: ComponentManager) -> None:
+        if self._manager is not None:
+            raise RuntimeError(
+                "{index} is already attached".format(index=self)
+            )
+
+        self._manager = manager
+
+        for event_type in self.refresh_on:
+            manager.events.subscribe(event_type, self._on_event)
+
+        manager.query([self.component_class]).observe(
+            self._added, self._removed
+        )
+
+    def lookup(self, key: Any) -> Set[int]:
+        if isinstance(key, AnyOf):
+            identifiers: Set[int] = set()
+            for any_key in key.keys:
+                identifiers.update(self._by_key.get(any_key, ()))
+            return identifiers
+
+        return self._by_key.get(key, set())
+
+    '''
+    Keys at least one entity is indexed under.
+    '''
+    def indexed_keys(self) -> List[Any]:
+        return list(self._by_key)
+
+    def refresh(self, component: Component) -> None:
+        components = component.owner.components
+        if components.manager is not self._manager:
+            return
+
+        if components.identifier not in self._keys:
+            return
+
+        self._index(components.identifier, component)
+
+    def _added(self, identifier: int, entry: tuple) -> None:
+        _owner, (component,) = entry
+        self._index(identifier, component)
+
+    def _removed(self, identifier: int, _entry: tuple) -> None:
+        for key in self._keys.pop(identifier, ()):
+            self._unindex(identifier, key)
+
+    def _on_event(self, event: Event) -> None:
+        owner = event.owner
+        components = getattr(owner, 'components', None)
+        if components is None:
+            return
+
+        component = components.get(self.component_class)
+        if component is not None:
+            self.refresh(component)
+
+    def _index(self, identifier: int, component: Component) -> None:
+        keys: Tuple = tuple(self.keys(component))
+        previous: Tuple = self._keys.get(identifier, ())
+
+        for key in previous:
+            if key not in keys:
+                self._unindex(identifier, key)
+
+        for key in keys:
+            self._by_key.setdefault(key, set()).add(identifier)
+
+        self._keys[identifier] = keys
+
+    def _unindex(self, identifier: int, key: Any) -> None:
+        identifiers = self._by_key.get(key, None)
+        if identifiers is None:
+            return
+
+        identifiers.discard(identifier)
+        if not identifiers:
+            del self._by_key[key]
+
+    def __repr__(self) -> str:
+        return "<{klass} {component}.{name} keys={keys}>".format(
+            klass=self.__class__.__name__,
+            component=self.component_class.__name__,
+            name=self.name,
+            keys=len(self._by_key),
+        )
+
+
+'''
+Declarative lookup of `(owner, components)` entries, in query order.
+
+- `component_types`: classes the entities must have, their components are
+  returned in that order
+- `without`: classes the entities must not have
+- `states`: `{component_class: state}` the components must be in, read from
+  the state buckets for classes declaring their `states`
+- `where`: `{index: key}` (or `AnyOf(keys)`) lookups in attached indexes
+
+Index and state bucket clauses narrow down the candidates first, only those
+are checked against the remaining clauses. Dormant entities match as well,
+only the components systems are processed with leave them out.
+'''
+def select(
+    manager: ComponentManager,
+    component_types: Iterable[type],
+    without: Iterable[type] = (),
+    states: Optional[Dict[type, str]] = None,
+    where: Optional[Dict[Index, Any]] = None
+) -> List[Tuple[object, List[Component]]]:
+    query: Query = manager.query(list(component_types))
+    candidates: Optional[Set[int]] = None
+
+    for index, key in (where or {}).items():
+        if index._manager is not manager:
+            raise RuntimeError(
+                "{index} is not attached to this world".format(index=index)
+            )
+
+        identifiers = index.lookup(key)
+        candidates = (
+            set(identifiers) if candidates is None
+            else candidates.intersection(identifiers)
+        )
+
+    unbucketed: Dict[type, str] = {}
+    for component_class, state in (states or {}).items():
+        if not component_class.states:
+            unbucketed[component_class] = state
+            continue
+
+        identifiers = manager.in_state_identifiers(component_class, state)
+        candidates = (
+            set(identifiers) if candidates is None
+            else candidates.intersection(identifiers)
+        )
+
+    if candidates is None:
+        entries = query.entities()
+    else:
+        entries = query.select(candidates)
+
+    without = tuple(without)
+    if not without and not unbucketed:
+        return list(entries)
+
+    selected: List[Tuple[object, List[Component]]] = []
+
+    for owner, components in entries:
+        classes = owner.components.component_classes
+        if any(component_class in classes for component_class in without):
+            continue
+
+        if not all(
+            _in_state(owner, component_class, state)
+            for component_class, state in unbucketed.items()
+        ):
+            continue
+
+        selected.append((owner, components))
+
+    return selected
+
+
+def _in_state(owner: object, component_class: type, state: str) -> bool:
+    component = owner.components.get(component_class)
+    return component is not None and component.state == state
@@ -0,0 +1,131 @@
+import structlog
+from typing import List, Optional
+
+logger = structlog.get_logger('engine.scheduler')
+
+'''
+`World.process` is called with SDL ticks, in milliseconds.
+'''
+DEFAULT_TICKS_PER_SECOND: int = 1000
+
+
+'''
+Scheduling state of one system.
+
+Systems declare how often they run with class attributes, all optional:
+
+- `tick_interval`: run every N ticks
+- `tick_hz`: run N times per second, converted with the scheduler's
+  `ticks_per_second`
+- `tick_phase`: offset in ticks used to spread systems sharing an interval
+- `priority`: higher runs first, ties run in the order they were added
+
+A system runs on the first tick at or after each `phase + k * interval`
+(k >= 1), missed runs are not replayed.
+'''
+class ScheduledSystem:
+    __slots__ = (
+        'interval', 'next_tick', 'order', 'phase', 'priority', 'system'
+    )
+
+    def __init__(
+        self, system: object, interval: int, phase: int, priority: int,
+        order: int
+    ) -> None:
+        self.system = system
+        self.interval: int = max(1, interval)
+        self.phase: int = phase
+        self.priority: int = priority
+        self.order: int = order
+        self.next_tick: int = phase + self.interval
+
+    def is_due(self, tick: int) -> bool:
+        return tick >= self.next_tick
+
+    def advance(self, tick: int) -> None:
+        missed = (tick - self.next_tick) // self.interval
+        self.next_tick += (missed + 1) * self.interval
+
+    def __repr__(self) -> str:
+        return (
+            "<{klass} {system} interval={interval} phase={phase}"
+            " priority={priority}>"
+        ).format(
+            klass=self.__class__.__name__,
+            system=self.system.__class__.__name__,
+            interval=self.interval,
+            phase=self.phase,
+            priority=self.priority,
+        )
+
+
+class Scheduler:
+    __slots__ = ('entries', 'ticks_per_second')
+
+    def __init__(
+        self, ticks_per_second: int = DEFAULT_TICKS_PER_SECOND
+    ) -> None:
+        self.entries: List[ScheduledSystem] = []
+        self.ticks_per_second: int = ticks_per_second
+
+    def add(
+        self, system: object,
+        interval: Optional[int] = None,
+        hz: Optional[float] = None,
+        phase: Optional[int] = None,
+        priority: Optional[int] = None
+    ) -> ScheduledSystem:
+        if interval is None and hz is None:
+            interval = getattr(system, 'tick_interval', None)
+            hz = getattr(system, 'tick_hz', None)
+
+        if interval is None:
+            interval = 1
+            if hz:
+                interval = round(self.ticks_per_second / hz)
+
+        if phase is None:
+            phase = getattr(system, 'tick_phase', 0)
+
+        if priority is None:
+            priority = getattr(system, 'priority', 0)
+
+        entry = ScheduledSystem(
+            system, interval, phase, priority, len(self.entries)
+        )
+
+        self.entries.append(entry)
+        self.entries.sort(key=lambda e: (-e.priority, e.order))
+
+        logger.debug(
+            'add',
+            entry=entry,
+            klass=self.__class__.__name__,
+        )
+
+        return entry
+
+    '''
+    Moves the schedule of every system past `tick` without handing out the
+    runs due until then, see `World.advance`.
+    '''
+    def skip(self, tick: int) -> None:
+        for entry in self.entries:
+            if entry.is_due(tick):
+                entry.advance(tick)
+
+    '''
+    Systems to run on `tick`, in priority order. Their schedule is advanced
+    as they are handed out.
+    '''
+    def due(self, tick: int) -> List[object]:
+        systems: List[object] = []
+
+        for entry in self.entries:
+            if not entry.is_due(tick):
+                continue
+
+            entry.advance(tick)
+            systems.append(entry.system)
+
+        return systems
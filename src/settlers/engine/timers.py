@@ -0,0 +1,171 @@
+from typing import Any, List, Optional, Tuple
+
+
+'''
+Hierarchical timer wheel handing out items scheduled for a tick once the
+wheel advances to it.
+
+Level `k` has `2 ** slot_bits` slots, each spanning `2 ** (slot_bits * k)`
+ticks. An item goes to the lowest level whose current span holds its tick
+and moves down a level each time the wheel crosses into the span of its
+slot, items too far ahead for the top level wait in an overflow list.
+Scheduling is O(1), advancing costs O(1) per item due plus one slot check
+per tick, and whole spans without anything scheduled are skipped.
+
+Items due on the same tick come out in the order they were scheduled.
+Items are not cancelled, owners ignore the ones they no longer expect.
+'''
+class TimerWheel:
+    __slots__ = (
+        'levels', 'now', 'slot_bits', '_counts', '_due', '_mask', '_pending',
+        '_slots'
+    )
+
+    def __init__(self, now: int = 0, slot_bits: int = 8, levels: int = 4):
+        self.levels: int = levels
+        self.now: int = now
+        self.slot_bits: int = slot_bits
+
+        # Items per level, the overflow list counted as the last level.
+        self._counts: List[int] = [0] * (levels + 1)
+        self._due: List[Any] = []
+        self._mask: int = (1 << slot_bits) - 1
+        self._pending: int = 0
+        self._slots: List[List[List[Tuple[int, Any]]]] = [
+            [[] for _ in range(1 << slot_bits)] for _ in range(levels)
+        ]
+        self._slots.append([[]])
+
+    '''
+    Hands `item` out on the first `advance` reaching `tick`, ticks already
+    passed are handed out on the next one.
+    '''
+    def schedule(self, tick: int, item: Any) -> None:
+        if tick <= self.now:
+            self._due.append(item)
+            return
+
+        self._pending += 1
+        self._place(tick, item)
+
+    '''
+    Moves the wheel to `tick` and returns the items due up to it, in tick
+    then scheduling order.
+    '''
+    def advance(self, tick: int) -> List[Any]:
+        due: List[Any] = self._due
+        self._due = []
+
+        counts = self._counts
+        mask = self._mask
+        slots = self._slots[0]
+
+        while self.now < tick and self._pending:
+            now = self.now
+
+            if not counts[0]:
+                # Nothing can come due before the next slot of the lowest
+                # level holding items cascades down, skip to it.
+                level = 1
+                while not counts[level]:
+                    level += 1
+
+                end = now | ((1 << (self.slot_bits * level)) - 1)
+                if end >= tick:
+                    break
+                now = end
+
+            now += 1
+            self.now = now
+
+            if not now & mask:
+                self._cascade(now)
+
+            slot = slots[now & mask]
+            if slot:
+                slots[now & mask] = []
+                counts[0] -= len(slot)
+                self._pending -= len(slot)
+                due.extend(item for _tick, item in slot)
+
+        if self.now < tick:
+            self.now = tick
+
+        return due
+
+    '''
+    Earliest tick holding a scheduled item, `now` when items are already
+    due and `None` when nothing is scheduled.
+    '''
+    def next_tick(self) -> Optional[int]:
+        if self._due:
+            return self.now
+
+        if not self._pending:
+            return None
+
+        bits = self.slot_bits
+
+        # Levels hold later and later spans: the first slot holding items
+        # on the lowest level holding any has the earliest tick.
+        for level in range(self.levels):
+            if not self._counts[level]:
+                continue
+
+            slots = self._slots[level]
+            start = ((self.now >> (bits * level)) & self._mask) + 1
+            for index in range(start, len(slots)):
+                if slots[index]:
+                    return min(tick for tick, _item in slots[index])
+
+        return min(tick for tick, _item in self._slots[self.levels][0])
+
+    def _place(self, tick: int, item: Any) -> None:
+        bits = self.slot_bits
+        now = self.now
+
+        for level in range(self.levels):
+            shift = bits * (level + 1)
+            if tick >> shift == now >> shift:
+                index = (tick >> (bits * level)) & self._mask
+                self._slots[level][index].append((tick, item))
+                self._counts[level] += 1
+                return
+
+        self._slots[self.levels][0].append((tick, item))
+        self._counts[self.levels] += 1
+
+    '''
+    Spreads the slots `now` enters over the levels below, highest first so
+    items cascading several levels reach level 0 in the same call.
+    '''
+    def _cascade(self, now: int) -> None:
+        bits = self.slot_bits
+
+        for level in range(self.levels, 0, -1):
+            if now & ((1 << (bits * level)) - 1):
+                continue
+
+            index = 0
+            if level < self.levels:
+                index = (now >> (bits * level)) & self._mask
+
+            slot = self._slots[level][index]
+            if not slot:
+                continue
+
+            self._slots[level][index] = []
+            self._counts[level] -= len(slot)
+
+            for tick, item in slot:
+                self._place(tick, item)
+
+    def __len__(self) -> int:
+        return self._pending + len(self._due)
+
+    def __repr__(self) -> str:
+        return "<{klass} now={now} pending={pending}>".format(
+            klass=self.__class__.__name__,
+            now=self.now,
+            pending=len(self),
+        )
@@ -1,52 +1,305 @@
-from typing import Optional, List
+from typing import Any, Callable, Dict, Iterable, Optional, List, Tuple, Union
 
+from settlers.engine.commands import CommandBuffer
 from settlers.engine.entities.entity import Entity
-from settlers.engine.components import Component, ComponentManager
+from settlers.engine.events import EventBus
+from settlers.engine.handles import Handle
+from settlers.engine.components import Component, ComponentManager, Query
+from settlers.engine.parallel import SystemExecutor
+from settlers.engine.prefabs import Prefab
+from settlers.engine.queries import Index, select
+from settlers.engine.scheduler import Scheduler
+
+SpawnOverrides = Union[Iterable[Any], Callable[[int, Entity], Iterable[Any]]]
+
+
+'''
+Adapts a `World.observe` callback to the `Query.observe` ones, called with
+the identifier and the entry of the entity.
+'''
+def _entry_callback(
+    callback: Callable[[object, list], None]
+) -> Callable[[int, tuple], None]:
+    def entry_callback(_identifier: int, entry: tuple) -> None:
+        callback(*entry)
+
+    return entry_callback
 
 
 class World:
-    __slots__ = ('entities', 'map', 'random_seed', 'systems')
+    __slots__ = (
+        'commands', 'component_manager', 'entities', 'events', 'executor',
+        'map', 'random_seed', 'scheduler', 'systems', '_entity_indices'
+    )
 
-    def __init__(self, random_seed: Optional[int] = None, map=None) -> None:
+    '''
+    `workers` > 0 runs systems with non conflicting declared component
+    access concurrently, see `settlers.engine.parallel`.
+    '''
+    def __init__(
+        self, random_seed: Optional[int] = None, map=None, workers: int = 0
+    ) -> None:
+        self.commands: CommandBuffer = CommandBuffer()
+        self.component_manager: ComponentManager = ComponentManager()
         self.entities: list[Entity] = []
+        self.events: EventBus = self.component_manager.events
+        self.executor: SystemExecutor = SystemExecutor(workers)
+        self._entity_indices: Dict[int, int] = {}
+        self.scheduler: Scheduler = Scheduler()
         self.systems: list = []
         self.random_seed = random_seed
 
-    def add_system(self, system: type) -> None:
+    '''
+    The keyword arguments override the schedule declared by the system, see
+    `settlers.engine.scheduler.ScheduledSystem`.
+    '''
+    def add_system(self, system: type, **schedule) -> None:
         self.systems.append(system)
+        self.scheduler.add(system, **schedule)
+
+        on_added = getattr(system, 'on_added', None)
+        on_removed = getattr(system, 'on_removed', None)
+        if on_added is not None or on_removed is not None:
+            self.observe(
+                system.component_types,
+                on_added=on_added,
+                on_removed=on_removed
+            )
+
+    '''
+    Calls `on_added(owner, components)` once for every entity which starts
+    matching `component_types`, entities already matching included, and
+    `on_removed(owner, components)` once when it stops matching. Systems
+    defining `on_added` / `on_removed` get them called for their own
+    `component_types`.
+
+    The callbacks are for one time setup and teardown, they run while the
+    structural change is applied and must not add or remove components.
+    '''
+    def observe(
+        self, component_types: List[type],
+        on_added: Optional[Callable[[object, list], None]] = None,
+        on_removed: Optional[Callable[[object, list], None]] = None
+    ) -> None:
+        added = _entry_callback(on_added) if on_added else None
+        removed = _entry_callback(on_removed) if on_removed else None
+
+        self.component_manager.query(list(component_types)).observe(
+            added, removed
+        )
 
     def add_entity(self, entity: Entity) -> None:
+        entity.id = self.component_manager.add_entity(entity.components)
+        self._entity_indices[entity.id] = len(self.entities)
         self.entities.append(entity)
 
+        storages = getattr(entity, 'storages', None)
+        if storages:
+            self.events.watch_storages(entity, storages)
+
+    '''
+    Builds `count` entities from `prefab` and adds them to the world with a
+    single archetype and query update per entity. `overrides` are component
+    definitions every entity gets, or a callable returning them from the
+    spawn index and the new entity. Systems spawning while they iterate
+    should build entities and go through `commands` instead.
+    '''
+    def spawn_many(
+        self, prefab: Prefab, count: int,
+        overrides: Optional[SpawnOverrides] = None
+    ) -> List[Entity]:
+        entities: List[Entity] = []
+
+        with self.component_manager.batch():
+            for index in range(count):
+                if overrides is None:
+                    entity = prefab.build()
+                elif callable(overrides):
+                    entity = prefab.build(
+                        lambda entity: overrides(index, entity)
+                    )
+                else:
+                    entity = prefab.build(overrides)
+
+                self.add_entity(entity)
+                entities.append(entity)
+
+        return entities
+
+    '''
+    Removes an entity and all of its components from the world in O(1) per
+    component. The order of `entities` is not preserved.
+    '''
+    def remove_entity(self, entity: Entity) -> None:
+        index: Optional[int] = self._entity_indices.pop(entity.id, None)
+        if index is None:
+            return
+
+        last: Entity = self.entities.pop()
+        if index < len(self.entities):
+            self.entities[index] = last
+            self._entity_indices[last.id] = index
+
+        self.component_manager.remove_entity(entity.components)
+        entity.id = None
+
+        for storage in getattr(entity, 'storages', {}).values():
+            storage.bind(entity, None)
+
+    '''
+    Takes an entity out of the game for good: its components release what
+    they hold in other entities (see `Component.despawn`), it is removed
+    from every registry, query and index, handles to it go stale and its
+    prefab may pool it for reuse. Systems iterating despawn through
+    `commands`.
+    '''
+    def despawn(self, entity: Entity) -> None:
+        if entity.components.manager is not self.component_manager:
+            return
+
+        for component in list(entity.components):
+            component.despawn()
+
+        self.remove_entity(entity)
+
+        for component in entity.components:
+            component.detach()
+
+        if entity.prefab is not None:
+            entity.prefab.release(entity)
+
+    def entity(self, identifier: int) -> Optional[Entity]:
+        return self.component_manager.owner(identifier)
+
     def initialize(self) -> None:
         for entity in self.entities:
-            entity.initialize()
+            if not entity.components.initialized:
+                entity.initialize()
 
     def process(self, tick: int) -> None:
-        for system in self.systems:
-            components = self.components_matching(system.component_types)
+        self.component_manager.wake_due(tick)
 
-            if not components:
-                continue
+        runs: List[Tuple[object, Query]] = []
 
+        for system in self.scheduler.due(tick):
             if hasattr(system, 'should_process'):
                 if not system.should_process(tick):
                     continue
 
-            system.process(tick, components)
+            runs.append(
+                (system, self.component_manager.query(system.component_types))
+            )
+
+        self.executor.run(
+            tick, runs, self.commands, self.component_manager
+        )
+        self.commands.flush(self)
+
+    '''
+    Processes the world up to `until` as calling `process` on every tick
+    after the last one processed would, but only on the ticks where
+    something can happen (next-event time advance). Returns how many ticks
+    were processed.
+
+    A tick is skipped when no component wakes up on it and no due system
+    has an active component, except for systems defining
+    `next_event(tick, components)`: the earliest tick after `tick` they
+    need processing on, `None` for never. Their runs on the skipped ticks
+    are replayed by `fast_forward(runs, components)`, `runs` being the
+    range of the ticks they were scheduled on.
+    '''
+    def advance(self, until: int) -> int:
+        tick: int = self.component_manager.now
+        processed: int = 0
+
+        while tick < until:
+            next_tick: int = self.next_event_tick(tick, until)
+
+            if next_tick > tick + 1:
+                self._fast_forward(next_tick - 1)
+
+            self.process(next_tick)
+            tick = next_tick
+            processed += 1
+
+        return processed
+
+    '''
+    Next tick after `tick`, `until` at the latest, `advance` has to process.
+    '''
+    def next_event_tick(self, tick: int, until: int) -> int:
+        next_tick: int = until
+
+        wakeup: Optional[int] = self.component_manager.next_wakeup()
+        if wakeup is not None:
+            next_tick = min(next_tick, max(wakeup, tick + 1))
+
+        for entry in self.scheduler.entries:
+            if next_tick <= tick + 1:
+                break
+
+            system = entry.system
+            entity_components = self.components_matching(
+                system.component_types
+            )
+            if not entity_components:
+                continue
+
+            due: int = max(entry.next_tick, tick + 1)
+
+            next_event = getattr(system, 'next_event', None)
+            if next_event is not None:
+                event_tick: Optional[int] = next_event(tick, entity_components)
+                if event_tick is None:
+                    continue
+                due = max(due, event_tick)
+
+            next_tick = min(next_tick, due)
+
+        return next_tick
+
+    '''
+    Replays the runs systems were scheduled for up to `to_tick`, leaving
+    their schedule as processing every tick would have.
+    '''
+    def _fast_forward(self, to_tick: int) -> None:
+        for entry in self.scheduler.entries:
+            runs = range(entry.next_tick, to_tick + 1, entry.interval)
+            fast_forward = getattr(entry.system, 'fast_forward', None)
+
+            if runs and fast_forward is not None:
+                entity_components = self.components_matching(
+                    entry.system.component_types
+                )
+                if entity_components:
+                    fast_forward(runs, entity_components)
+
+        self.scheduler.skip(to_tick)
 
     def components_matching(self, wants: list) -> list[Component]:
-        components: List[Component] = []
-        len_wants = len(wants)
-        entities = ComponentManager.entities_matching(wants)
+        return self.component_manager.query(wants).components()
 
-        method_name = 'extend'
-        if len_wants > 1:
-            method_name = 'append'
+    def handle(self, target: object) -> Handle:
+        return self.component_manager.handle(target)
 
-        method = getattr(components, method_name)
+    def resolve(self, handle: Handle) -> Optional[object]:
+        return self.component_manager.resolve(handle)
 
-        for _entity, entity_components in entities:
-            method(entity_components)
+    def add_index(self, index: Index) -> Index:
+        index.attach(self.component_manager)
+        return index
 
-        return components
+    '''
+    `(owner, components)` entries of the entities having every class of
+    `component_types`, see `settlers.engine.queries.select` for the clauses.
+    '''
+    def query(
+        self, *component_types: type,
+        without: Iterable[type] = (),
+        states: Optional[Dict[type, str]] = None,
+        where: Optional[Dict[Index, Any]] = None
+    ) -> List[Tuple[object, List[Component]]]:
+        return select(
+            self.component_manager, component_types,
+            without=without, states=states, where=where
+        )
@@ -108,9 +108,9 @@ def build_tavern(name: str, components: List[Component]) -> Building:
     return tavern
 
 
-def tavern_components(pipelines: List[Pipeline]) -> list[tuple]:
+def tavern_components(storages: StoragesType) -> list[tuple]:
     return [
-        (Factory, pipelines, 1),
+        (Factory, tavern_pipelines(storages), 1),
         # (Shop, shop_items, 1, 50)
     ]
 
@@ -0,0 +1,277 @@
+import math
+import structlog
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from settlers.engine.assignment import min_cost_assignment
+from settlers.engine.components.construction import Construction
+from settlers.engine.components.factory import Factory
+from settlers.engine.components.harvesting import Harvester
+from settlers.engine.components.inventory_routing import InventoryRouting
+from settlers.engine.components.movement import ResourceTransport
+from settlers.engine.entities.position import Position
+from settlers.engine.entities.resources.resource_storage import ResourceStorage
+from settlers.engine.queries import AnyOf
+
+from settlers.entities.characters.components.villager_ai_system import (
+    STATE_BUSY,
+    STATE_IDLE,
+    TRANSPORT_PRIORITIES,
+    VillagerAi,
+    VillagerAiSystem,
+    transport_priority,
+)
+
+logger = structlog.get_logger('game.logistics')
+
+
+'''
+A load to carry from a source to a destination: `(source, destination,
+resource)`.
+'''
+Trip = Tuple[object, object, type]
+
+
+def distance(origin, destination) -> float:
+    origin_position: Position = origin.position.reveal(Position)
+    destination_position: Position = destination.position.reveal(Position)
+
+    return math.hypot(
+        destination_position.x - origin_position.x,
+        destination_position.y - origin_position.y
+    )
+
+
+'''
+Plans the transports of every idle carrier at once, instead of each one
+picking a random source and destination (see
+`VillagerAiSystem.resource_transport_for_villager`).
+
+Idle villagers able to transport hand themselves over and sleep. Every
+run, the stock factories have available is matched against what
+destinations want, serving the `TRANSPORT_PRIORITIES` tiers in order and
+the closest source and destination pairs first within a tier. One trip is
+planned per load, as many as there are carriers. Loads already picked for
+carriers on their way are left out, so two carriers do not go for the
+same one. Carriers are then assigned the trips with the lowest total
+distance to their sources.
+
+Carriers which also have tasks are woken up when no trip is left for
+them, the others wait for the next run.
+'''
+class LogisticsSystem:
+    component_types = [InventoryRouting]
+
+    tick_interval: int = 250
+
+    reads: tuple = (Construction, Factory, Position)
+    # The storage set up for a carrier's load joins the storages its
+    # `Harvester` holds.
+    writes: tuple = (
+        Harvester, ResourceStorage, ResourceTransport, VillagerAi
+    )
+
+    '''
+    `carrier_load` is how many items of a resource a carrier takes per
+    trip, villagers have a storage of 1 for each.
+    '''
+    def __init__(
+        self, world, villager_ai: VillagerAiSystem, carrier_load: int = 1
+    ) -> None:
+        self.carrier_load: int = carrier_load
+        self.villager_ai: VillagerAiSystem = villager_ai
+        self.world = world
+
+        self._carriers: Dict[VillagerAi, None] = {}
+        self._trips: Dict[ResourceTransport, Trip] = {}
+
+        villager_ai.logistics = self
+
+    def add_carrier(self, villager: VillagerAi) -> None:
+        self._carriers[villager] = None
+
+    '''
+    Nothing to plan without carriers waiting, see `World.advance`.
+    '''
+    def next_event(
+        self, tick: int, _inventories: List[InventoryRouting]
+    ) -> Optional[int]:
+        if not self._carriers:
+            return None
+
+        return tick + 1
+
+    def process(
+        self, tick: int, _inventories: List[InventoryRouting]
+    ) -> None:
+        for transport, trip in list(self._trips.items()):
+            if not transport.destination:
+                del self._trips[transport]
+
+        carriers: List[VillagerAi] = self.carriers()
+        if not carriers:
+            return
+
+        trips: List[Trip] = self.plan_trips(len(carriers))
+
+        costs: List[List[float]] = [
+            [distance(carrier.owner, source) for carrier in carriers]
+            for source, _destination, _resource in trips
+        ]
+
+        dispatched: set = set()
+        for trip, index in zip(trips, min_cost_assignment(costs)):
+            if index is None:
+                continue
+
+            self.dispatch(carriers[index], trip)
+            dispatched.add(index)
+
+        logger.debug(
+            'process',
+            carriers=len(carriers),
+            trips=len(trips),
+            system=self.__class__.__name__,
+            tick=tick,
+        )
+
+        for index, carrier in enumerate(carriers):
+            if index in dispatched:
+                continue
+
+            if carrier.available_tasks():
+                del self._carriers[carrier]
+                carrier.wake()
+
+    '''
+    Carriers still idle and in the world, in the order they were added.
+    '''
+    def carriers(self) -> List[VillagerAi]:
+        carriers: List[VillagerAi] = []
+
+        for carrier in list(self._carriers):
+            components = carrier.owner.components
+            transport: Optional[ResourceTransport] = components.get(
+                ResourceTransport
+            )
+
+            if (
+                components.manager is not self.world.component_manager
+                or carrier.state != STATE_IDLE
+                or transport is None
+                or transport.destination
+            ):
+                del self._carriers[carrier]
+                continue
+
+            carriers.append(carrier)
+
+        return carriers
+
+    '''
+    At most `limit` trips, by priority then distance from the source to
+    the destination.
+    '''
+    def plan_trips(self, limit: int) -> List[Trip]:
+        available = self.villager_ai.available_resources
+        wanted = self.villager_ai.wanted_resources
+
+        supply: Dict[Tuple[object, type], int] = {}
+        sources: Dict[type, List[object]] = defaultdict(list)
+
+        for source, (_factory, inventory) in self.world.query(
+            Factory, InventoryRouting,
+            where={available: AnyOf(available.indexed_keys())}
+        ):
+            for resource in inventory.offers_resources():
+                storage: ResourceStorage = source.storages[resource]
+                supply[(source, resource)] = storage.quantity()
+                sources[resource].append(source)
+
+        demand: Dict[Tuple[object, type], int] = {}
+
+        for resource in sources:
+            for destination, (inventory,) in self.world.query(
+                InventoryRouting, where={wanted: resource}
+            ):
+                demand[(destination, resource)] = (
+                    inventory.storage_for(resource).available()
+                )
+
+        for transport, (source, destination, resource) in self._trips.items():
+            if (destination, resource) in demand:
+                demand[(destination, resource)] -= self.carrier_load
+
+            storage = transport.owner.storages.get(resource, None)
+            if storage is None or storage.is_empty():
+                # Not picked up yet.
+                if (source, resource) in supply:
+                    supply[(source, resource)] -= self.carrier_load
+
+        routes: List[Tuple[int, float, object, object, type]] = []
+
+        for (destination, resource), quantity in demand.items():
+            if quantity <= 0:
+                continue
+
+            priority: int = TRANSPORT_PRIORITIES.index(
+                transport_priority(destination)
+            )
+
+            for source in sources[resource]:
+                if source == destination:
+                    continue
+
+                routes.append((
+                    priority, distance(source, destination),
+                    source, destination, resource
+                ))
+
+        routes.sort(key=lambda route: route[:2])
+
+        trips: List[Trip] = []
+
+        for _priority, _distance, source, destination, resource in routes:
+            while (
+                len(trips) < limit
+                and supply[(source, resource)] > 0
+                and demand[(destination, resource)] > 0
+            ):
+                trips.append((source, destination, resource))
+                supply[(source, resource)] -= self.carrier_load
+                demand[(destination, resource)] -= self.carrier_load
+
+            if len(trips) >= limit:
+                break
+
+        return trips
+
+    def dispatch(self, carrier: VillagerAi, trip: Trip) -> None:
+        source, destination, resource = trip
+        owner = carrier.owner
+
+        if isinstance(owner.storages, defaultdict):
+            # Sets up the storage the carrier loads the resource in.
+            owner.storages[resource]
+
+        transport: ResourceTransport = owner.components.get(
+            ResourceTransport
+        )
+
+        logger.debug(
+            'dispatch',
+            source=source,
+            destination=destination,
+            resource=resource,
+            villager=owner,
+            system=self.__class__.__name__,
+        )
+
+        del self._carriers[carrier]
+        self._trips[transport] = trip
+
+        transport.on_end(carrier.on_task_ended)
+        carrier.task = ResourceTransport
+        carrier.state_change(STATE_BUSY)
+        transport.start(destination, source, [resource])
+        carrier.wake()
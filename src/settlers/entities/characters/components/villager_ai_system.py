@@ -1,10 +1,10 @@
 import random
 import structlog
 from collections import defaultdict
-from typing import Callable, List, Optional
+from typing import Callable, Dict, List, Optional
 
 from settlers.engine.components import (
-    Component, ComponentProxy, ComponentManager
+    Component, ComponentProxy
 )
 from settlers.engine.components.construction import (
     Construction, ConstructionWorker
@@ -13,25 +13,46 @@ from settlers.engine.components.factory import (
     Factory, FactoryWorker
 )
 from settlers.engine.components.harvesting import (
+    Harvestable,
     Harvester,
     STATE_FULL as HARVESTER_STATE_FULL,
     STATE_DELIVERING as HARVESTER_STATE_DELIVERING
 )
 from settlers.engine.components.spawner import (
+    Spawner,
     SpawnerWorker,
 )
 from settlers.engine.components.inventory_routing import (
     InventoryRouting
 )
 from settlers.engine.components.movement import (
-    ResourceTransport
+    ResourceTransport, Travel
 )
+from settlers.engine.entities.position import Position
+from settlers.engine.entities.resources.resource_storage import ResourceStorage
+from settlers.engine.events import (
+    StateChanged,
+    StorageBecameEmpty,
+    StorageBecameFull,
+    StorageBecameNonEmpty,
+    StorageBecameNotFull,
+    StoragesBound,
+    WorkerSlotFreed,
+    WorkerSlotTaken,
+)
+from settlers.engine.queries import AnyOf, Index
 
 from settlers.entities.buildings import Building
 
 STATE_IDLE = 'idle'
 STATE_BUSY = 'busy'
 
+'''
+Transport destinations are served by priority: constructions first, then
+factories, then anything else (e.g. warehouses).
+'''
+TRANSPORT_PRIORITIES = ('high', 'normal', 'low')
+
 logger = structlog.get_logger('game.villager_ai')
 
 
@@ -44,16 +65,15 @@ class VillagerAi(Component):
         self.task = None
         self._available_tasks = []
 
-    def available_tasks(self, supported_tasks: list[Component]):
-        if self._available_tasks:
-            return self._available_tasks
-
-        for task in supported_tasks:
-            if task in self.owner.components.classes():
-                self._available_tasks.append(task)
-
+    def available_tasks(self) -> List[Component]:
         return self._available_tasks
 
+    def refresh_tasks(self, supported_tasks: List[Component]) -> None:
+        classes = self.owner.components.classes()
+        self._available_tasks = [
+            task for task in supported_tasks if task in classes
+        ]
+
     def on_task_ended(self, component: Component) -> None:
         logger.info('on_task_ended', component=component)
         self.task = None
@@ -72,7 +92,7 @@ class VillagerAi(Component):
             task=self.task,
         )
 
-        self.state = new_state
+        self.set_state(new_state)
 
     def __repr__(self) -> str:
         return "<{self} {id}>".format(
@@ -81,9 +101,28 @@ class VillagerAi(Component):
         )
 
 
+def transport_priority(destination: Building) -> str:
+    if hasattr(destination, Construction.exposed_as):
+        return 'high'
+
+    if hasattr(destination, Factory.exposed_as):
+        return 'normal'
+
+    return 'low'
+
+
 class VillagerAiSystem:
     component_types = [VillagerAi]
 
+    # Tasks and destinations are drawn from the global `random` state.
+    exclusive: bool = True
+    reads: tuple = (InventoryRouting, Position)
+    writes: tuple = (
+        Construction, ConstructionWorker, Factory, FactoryWorker, Harvestable,
+        Harvester, ResourceStorage, ResourceTransport, Spawner, SpawnerWorker,
+        Travel, VillagerAi
+    )
+
     def __init__(self, world: object) -> None:
         self.tasks: List[Component] = [
             Harvester,
@@ -93,42 +132,80 @@ class VillagerAiSystem:
         ]
 
         self.entities = world.entities
-        self._awaiting_until: dict = {}
+        self.world = world
+        # Harvesting villagers that found no destination wait until then,
+        # even if woken up earlier.
+        self._awaiting_until: Dict[VillagerAi, int] = {}
+
+        # Planner idle villagers hand themselves to for transports instead
+        # of picking one, see `LogisticsSystem`.
+        self.logistics = None
+
+        # Destinations by the resources they accept.
+        self.wanted_resources: Index = world.add_index(Index(
+            InventoryRouting, 'wanted_resources',
+            keys=lambda inventory: inventory.wants_resources(),
+            refresh_on=(StorageBecameFull, StorageBecameNotFull, StoragesBound)
+        ))
+
+        # Sources by the resources they have available for transport.
+        self.available_resources: Index = world.add_index(Index(
+            InventoryRouting, 'available_resources',
+            keys=lambda inventory: inventory.offers_resources(),
+            refresh_on=(
+                StorageBecameEmpty, StorageBecameNonEmpty, StoragesBound
+            )
+        ))
+
+        # Villagers pick among the tasks they have components for.
+        for task in self.tasks:
+            world.observe(
+                [VillagerAi, task],
+                on_added=self.on_task_changed,
+                on_removed=self.on_task_changed
+            )
+
+        # Task targets able to take another worker, indexed under `True`.
+        self.free_worker_slots: Dict[type, Index] = {}
+        for task in self.tasks:
+            for target_class in task.target_components():
+                self.free_worker_slots[target_class] = world.add_index(Index(
+                    target_class, 'free_worker_slot',
+                    keys=lambda target: (
+                        (True,) if target.can_add_worker() else ()
+                    ),
+                    refresh_on=(WorkerSlotFreed, WorkerSlotTaken)
+                ))
+
+    def on_removed(self, _owner: object, components: list) -> None:
+        villager: VillagerAi = components[0]
+        self._awaiting_until.pop(villager, None)
+
+    def on_task_changed(self, _owner: object, components: list) -> None:
+        villager: VillagerAi = components[0]
+        villager.refresh_tasks(self.tasks)
 
     def handle_busy_harvester(self, villager: VillagerAi) -> None:
         proxy: ComponentProxy = getattr(villager.owner, Harvester.exposed_as)
         harvester: Harvester = proxy.reveal(Harvester)
 
         if not harvester.state == HARVESTER_STATE_FULL:
+            # Until the harvester (or the villager) changes state.
+            villager.sleep(wake_on=StateChanged)
             return
 
         awaiting = self._awaiting_until.get(villager, 0)
         if awaiting > self.current_tick:
+            villager.sleep(until=awaiting, wake_on=StateChanged)
             return
 
-        possible_destinations: List[Building] = []
-
-        locations: List[InventoryRouting] = ComponentManager[InventoryRouting]
-
-        for location in locations:
-            entity: Building = location.owner
-            wants: set = entity.inventory.wants_resources()
-            common: set = harvester.resources.intersection(wants)
-            if not common:
-                """
-                    logger.debug(
-                    'handle_busy_harvester:no_common_resources',
-                    owner=villager.owner,
-                    system=self.__class__.__name__,
-                    entity=entity,
-                    provides=harvester.resources,
-                    wants=wants,
-                    common=common,
-                )
-                """
-                continue
-
-            possible_destinations.append(entity)
+        possible_destinations: List[Building] = [
+            entity
+            for entity, _components in self.world.query(
+                InventoryRouting,
+                where={self.wanted_resources: AnyOf(harvester.resources)}
+            )
+        ]
 
         if not possible_destinations:
             logger.debug(
@@ -139,6 +216,9 @@ class VillagerAiSystem:
             )
 
             self._awaiting_until[villager] = self.current_tick + 10000
+            villager.sleep(
+                until=self._awaiting_until[villager], wake_on=StateChanged
+            )
             return
 
         destination = random.choice(possible_destinations)
@@ -149,9 +229,20 @@ class VillagerAiSystem:
     def handle_busy_villager(self, villager: VillagerAi) -> None:
         if villager.task == Harvester:
             self.handle_busy_harvester(villager)
+            return
+
+        # Until the task ends and the villager goes back to idle.
+        villager.sleep(wake_on=StateChanged)
 
     def handle_idle_villager(self, villager: VillagerAi) -> None:
-        if not hasattr(villager.owner, 'resource_transport'):
+        component_classes = villager.owner.components.component_classes
+        if ResourceTransport not in component_classes:
+            return
+
+        if self.logistics is not None:
+            # Until the planner gives it a transport.
+            self.logistics.add_carrier(villager)
+            villager.sleep()
             return
 
         options: List[Callable] = [
@@ -162,15 +253,13 @@ class VillagerAiSystem:
         task(villager)
 
     '''
-    Find a random factory and check if it has resources available for transport.
+    Find a random factory with resources available for transport.
     '''
     def resource_transport_for_villager(self, villager: VillagerAi) -> None:
-        factories: List[Factory] = ComponentManager[Factory]
-
-        # Sample will return len(factories) elements in random order
-        for factory in random.sample(factories, len(factories)):
-            source: Building = factory.owner
+        sources: List[Building] = self.transport_sources()
 
+        # Sample will return len(sources) elements in random order
+        for source in random.sample(sources, len(sources)):
             available_for_transport = (
                 source
                 .inventory
@@ -214,41 +303,35 @@ class VillagerAiSystem:
 
             return
 
+    '''
+    Factories with resources available for transport, in query order.
+    '''
+    def transport_sources(self) -> List[Building]:
+        available: Index = self.available_resources
+
+        return [
+            source
+            for source, _components in self.world.query(
+                Factory, where={available: AnyOf(available.indexed_keys())}
+            )
+        ]
+
     def _find_destination_for_transport(self, origin: Building, resource: type) -> Building:
         destinations_by_priority: dict[str, list[Building]] = {
-            'high': [],
-            'normal': [],
-            'low': [],
+            priority: [] for priority in TRANSPORT_PRIORITIES
         }
 
-        locations: List[InventoryRouting] = ComponentManager[InventoryRouting]
+        locations = self.world.query(
+            InventoryRouting, where={self.wanted_resources: resource}
+        )
 
-        for location in locations:
-            destination: Building = location.owner
+        for destination, _components in locations:
             if origin == destination:
                 continue
 
-            wants: set[type] = destination.inventory.wants_resources()
-
-            if not wants:
-                continue
-
-            if resource not in wants:
-                continue
-
-            if hasattr(destination, Construction.exposed_as):
-                destinations_by_priority['high'].append(
-                    destination
-                )
-                continue
-
-            if hasattr(destination, Factory.exposed_as):
-                destinations_by_priority['normal'].append(
-                    destination
-                )
-                continue
-
-            destinations_by_priority['low'].append(destination)
+            destinations_by_priority[transport_priority(destination)].append(
+                destination
+            )
 
         for priority, destinations in destinations_by_priority.items():
             if not destinations:
@@ -314,8 +397,168 @@ class VillagerAiSystem:
                 )
                 self.handle_idle_villager(villager)
 
+    '''
+    Idle villagers with nothing to start only draw from `random` when
+    processed, until another system changes what they could do. Their runs
+    are skipped by `World.advance` and their draws replayed by
+    `fast_forward`. Busy ones are put back to sleep, unless their harvester
+    is full and waited long enough.
+    '''
+    def next_event(
+        self, tick: int, villagers: List[VillagerAi]
+    ) -> Optional[int]:
+        next_tick: Optional[int] = None
+
+        for villager in villagers:
+            if villager.state == STATE_BUSY:
+                busy_tick: Optional[int] = self._busy_event(tick, villager)
+                if busy_tick is None:
+                    continue
+
+                if busy_tick <= tick + 1:
+                    return tick + 1
+
+                if next_tick is None or busy_tick < next_tick:
+                    next_tick = busy_tick
+                continue
+
+            if self.has_work(villager):
+                return tick + 1
+
+            if (
+                self.logistics is not None
+                and ResourceTransport
+                in villager.owner.components.component_classes
+            ):
+                # Hands itself over to the planner.
+                return tick + 1
+
+        return next_tick
+
+    def _busy_event(self, tick: int, villager: VillagerAi) -> Optional[int]:
+        if villager.task != Harvester:
+            return None
+
+        proxy: ComponentProxy = getattr(villager.owner, Harvester.exposed_as)
+        harvester: Harvester = proxy.reveal(Harvester)
+        if not harvester.state == HARVESTER_STATE_FULL:
+            return None
+
+        return max(self._awaiting_until.get(villager, 0), tick + 1)
+
+    '''
+    Draws what processing the idle villagers on every tick of `runs` would
+    have, none of them having anything to start. What they draw from does
+    not change in between, only the draws are made again.
+    '''
+    def fast_forward(self, runs: range, villagers: List[VillagerAi]) -> None:
+        draws = [
+            self._idle_draws(villager)
+            for villager in villagers if villager.state == STATE_IDLE
+        ]
+
+        for _tick in runs:
+            for tasks, shuffled, sources in draws:
+                if tasks:
+                    for targets in shuffled[random.choice(tasks)]:
+                        random.shuffle(targets)
+
+                if sources is not None:
+                    random.choice(sources[0])
+                    random.sample(sources[1], len(sources[1]))
+
+    '''
+    What processing an idle villager with nothing to start draws from: its
+    tasks, the target lists `target_for_task` shuffles for each of them and
+    the options and sources `handle_idle_villager` draws from when it can
+    transport.
+    '''
+    def _idle_draws(self, villager: VillagerAi) -> tuple:
+        tasks: List[Component] = villager.available_tasks()
+        shuffled: Dict[Component, List[list]] = {}
+
+        for task in tasks:
+            shuffled[task] = []
+
+            target_components: List[Component] = task.target_components()
+            if len(target_components) < 2:
+                # Shuffling a single target draws nothing.
+                continue
+
+            where = {
+                self.free_worker_slots[target_class]: True
+                for target_class in target_components
+            }
+            shuffled[task] = [
+                list(components)
+                for _entity, components in self.world.query(
+                    *target_components, where=where
+                )
+            ]
+
+        sources: Optional[tuple] = None
+        if ResourceTransport in villager.owner.components.component_classes:
+            sources = (
+                [self.resource_transport_for_villager],
+                self.transport_sources()
+            )
+
+        return (tasks, shuffled, sources)
+
+    '''
+    Whether an idle villager could start a task or a transport, checked
+    without drawing from `random`.
+    '''
+    def has_work(self, villager: VillagerAi) -> bool:
+        for task in villager.available_tasks():
+            if self.has_target(task):
+                return True
+
+        component_classes = villager.owner.components.component_classes
+        if ResourceTransport not in component_classes:
+            return False
+
+        for source in self.transport_sources():
+            if self.can_transport_from(source):
+                return True
+
+        return False
+
+    def has_target(self, task: Component) -> bool:
+        target_components: List[Component] = task.target_components()
+
+        if not target_components:
+            return False
+
+        where = {
+            self.free_worker_slots[target_class]: True
+            for target_class in target_components
+        }
+
+        matches = self.world.query(*target_components, where=where)
+        for entity, components in matches:
+            for target_component in components:
+                proxy = getattr(entity, target_component.exposed_as)
+                if proxy.can_add_worker():
+                    return True
+
+        return False
+
+    def can_transport_from(self, source: Building) -> bool:
+        resource = source.inventory.available_for_transport()
+        if not resource:
+            return False
+
+        locations = self.world.query(
+            InventoryRouting, where={self.wanted_resources: resource}
+        )
+
+        return any(
+            destination != source for destination, _components in locations
+        )
+
     def select_task(self, villager: VillagerAi) -> Optional[Component]:
-        available_tasks: List[Component] = villager.available_tasks(self.tasks)
+        available_tasks: List[Component] = villager.available_tasks()
 
         if not available_tasks:
             logger.debug(
@@ -333,11 +576,13 @@ class VillagerAiSystem:
         if not target_components:
             return None
 
-        entities: List[tuple] = ComponentManager.entities_matching(
-            target_components
-        )
+        where = {
+            self.free_worker_slots[target_class]: True
+            for target_class in target_components
+        }
 
-        for entity, components in entities:
+        matches = self.world.query(*target_components, where=where)
+        for entity, components in matches:
             targets = list(components)
             random.shuffle(targets)
 
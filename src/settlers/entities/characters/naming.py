@@ -0,0 +1,58 @@
+import bisect
+import names
+import random
+from typing import Dict, List, Optional, Tuple
+
+'''
+Name distributions of the `names` package, parsed once instead of on every
+generated name. Names are drawn from the global `random` state exactly like
+`names.get_full_name` does, so seeded games keep generating the same names.
+'''
+NameTable = Tuple[List[float], List[str]]
+
+_tables: Dict[str, NameTable] = {}
+
+
+def _table(filename: str) -> NameTable:
+    table = _tables.get(filename, None)
+    if table is not None:
+        return table
+
+    cumulative: List[float] = []
+    table_names: List[str] = []
+
+    with open(filename) as name_file:
+        for line in name_file:
+            name, _, cumulative_frequency, _ = line.split()
+            cumulative.append(float(cumulative_frequency))
+            table_names.append(name)
+
+    table = (cumulative, table_names)
+    _tables[filename] = table
+    return table
+
+
+def get_name(filename: str) -> str:
+    selected = random.random() * 90
+    cumulative, table_names = _table(filename)
+
+    # First name whose cumulative frequency is above the selection.
+    index = bisect.bisect_right(cumulative, selected)
+    if index == len(table_names):
+        return ""
+
+    return table_names[index]
+
+
+def get_first_name(gender: Optional[str] = None) -> str:
+    if gender not in ('male', 'female'):
+        gender = random.choice(('male', 'female'))
+    return get_name(names.FILES['first:%s' % gender]).capitalize()
+
+
+def get_last_name() -> str:
+    return get_name(names.FILES['last']).capitalize()
+
+
+def get_full_name(gender: Optional[str] = None) -> str:
+    return "{0} {1}".format(get_first_name(gender), get_last_name())
@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 
-import names
 from collections import defaultdict
 
 from typing import List, Optional
@@ -13,6 +12,7 @@ from settlers.engine.entities.resources.resource_storage import (
     ResourceStorage, ResourceStoragesType
 )
 
+from settlers.entities.characters import naming
 from settlers.entities.characters.components.villager_ai_system import (
     VillagerAi
 )
@@ -24,6 +24,8 @@ from settlers.engine.components.harvesting import Harvester
 class Villager(Entity):
     __slots__ = ('name', 'storages')
 
+    pool_size: int = 256
+
     components = [
         VillagerAi,
         Travel,
@@ -35,7 +37,7 @@ class Villager(Entity):
         super().__init__()
 
         if not name:
-            name = names.get_full_name()
+            name = naming.get_full_name()
 
         self.storages: ResourceStoragesType = defaultdict(
             self._resource_storage_factory
@@ -44,7 +46,8 @@ class Villager(Entity):
 
 
     def on_spawn(self, components: List):
-        self.initialize()
+        if not self.components.initialized:
+            self.initialize()
 
         for component in components:
             self.components.add(component)
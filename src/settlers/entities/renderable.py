@@ -1,13 +1,29 @@
 from settlers.engine.components import Component
+from settlers.engine.events import Event
 import structlog
 
 logger = structlog.get_logger("engine.renderable")
 
+
+'''
+A `Renderable` changed type and needs a new sprite.
+'''
+class SpriteReset(Event):
+    __slots__ = ('renderable',)
+
+    def __init__(self, renderable) -> None:
+        self.renderable = renderable
+
+    @property
+    def owner(self):
+        return self.renderable.owner
+
+
 class Renderable(Component):
     __slots__ = ('sprite', 'type', 'z')
 
     exposed_as = 'renderable'
-    exposed_methods = ('reset_sprite')
+    exposed_methods = ('reset_sprite',)
 
     def __init__(self, owner, type: str, z: int = 1) -> None:
         super().__init__(owner)
@@ -24,7 +40,7 @@ class Renderable(Component):
 
         self.sprite = None
         self.type = new_type
-
+        self.publish(SpriteReset, self)
 
     def __repr__(self) -> str:
         return "<{owner}#{component} {id}>".format(
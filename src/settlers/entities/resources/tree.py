@@ -30,7 +30,7 @@ class Tree(Resource):
 
     def initialize(self) -> None:
         self.components.add(
-            (Generative, 'quantity', -1, 4, 1, self.max_quantity)
+            (Generative, 'quantity', -1, 4, 1, self.max_quantity, True)
         )
 
         super().initialize()
@@ -3,6 +3,7 @@ from collections import defaultdict
 
 from settlers.engine.world import World
 
+from settlers.engine.components import columnar
 from settlers.engine.components.construction import (
     ConstructionSystem
 )
@@ -22,6 +23,7 @@ from settlers.engine.components.spawner import (
     SpawnerSystem, SpawnerWorker
 )
 from settlers.engine.entities.position import Position
+from settlers.engine.prefabs import Prefab
 
 from settlers.engine.components.movement import (
     ResourceTransport
@@ -50,6 +52,9 @@ from settlers.entities.buildings.warehouse import (
 )
 from settlers.entities.buildings.house import build_house
 
+from settlers.entities.characters.components.logistics_system import (
+    LogisticsSystem
+)
 from settlers.entities.characters.components.villager_ai_system import (
     VillagerAiSystem
 )
@@ -59,30 +64,39 @@ from settlers.entities.characters.villager import Villager
 def setup(world: World, options: dict):
     random.seed(world.random_seed) 
 
-    world.add_system(VillagerAiSystem(world))
+    travel_system = TravelSystem()
+
+    if options.get("with_columnar_movement"):
+        columnar.enable(world)
+        travel_system = columnar.ColumnarTravelSystem(world)
+
+    villager_ai_system = VillagerAiSystem(world)
+
+    world.add_system(villager_ai_system)
     world.add_system(FactorySystem())
-    world.add_system(GenerativeSystem())
-    world.add_system(HarvesterSystem())
-    world.add_system(TravelSystem())
-    world.add_system(ResourceTransportSystem())
-    world.add_system(ConstructionSystem())
+    world.add_system(GenerativeSystem(world))
+    world.add_system(HarvesterSystem(world))
+    world.add_system(travel_system)
+    world.add_system(ResourceTransportSystem(world))
+    world.add_system(ConstructionSystem(world))
     world.add_system(SpawnerSystem(world))
 
-    for _ in range(6):
-        t = Tree(1, 1)
-        t.components.add(
+    if options.get("with_logistics"):
+        world.add_system(LogisticsSystem(world, villager_ai_system))
+
+    world.spawn_many(
+        Prefab(Tree, (1, 1)), 6,
+        lambda _index, _tree: [
             (Position, random.randrange(400, 740), random.randrange(310, 540))
-        )
-        world.add_entity(t)
-    del(t)
+        ]
+    )
 
-    for _ in range(5):
-        q = StoneQuarry(25)
-        q.components.add(
+    world.spawn_many(
+        Prefab(StoneQuarry, (25,)), 5,
+        lambda _index, _quarry: [
             (Position, random.randrange(400, 740), random.randrange(10, 300))
-        )
-        world.add_entity(q)
-    del(q)
+        ]
+    )
     
     if options["with_low_pop"]:
         workforce_plan = {
@@ -98,15 +112,10 @@ def setup(world: World, options: dict):
             ResourceTransport: 2,
         }
 
-    for task, count in workforce_plan.items():
-        for i in range(count):
-            v = Villager()
-
-            v.components.add(
-                #(Position, random.randrange(10, 780), random.randrange(10, 580))
-                (Position, 10 + i, 10 + i)
-            )
+    villager = Prefab(Villager)
 
+    for task, count in workforce_plan.items():
+        def villager_components(i: int, v: Villager) -> list:
             if task == Harvester:
                 task_info = (task, [], v.storages)
             elif task == ConstructionWorker:
@@ -114,10 +123,13 @@ def setup(world: World, options: dict):
             else:
                 task_info = task
 
-            v.components.add(task_info)
+            return [
+                #(Position, random.randrange(10, 780), random.randrange(10, 580))
+                (Position, 10 + i, 10 + i),
+                task_info,
+            ]
 
-            world.add_entity(v)
-        del(v)
+        world.spawn_many(villager, count, villager_components)
 
 
     if options["with_sawmill"]:
@@ -9,7 +9,7 @@ import structlog
 
 from settlers.engine.entities.position import Position
 from settlers.entities.map import Map
-from settlers.entities.renderable import Renderable
+from settlers.entities.renderable import Renderable, SpriteReset
 from settlers.game.setup import setup
 
 logger = structlog.get_logger('game.manager')
@@ -61,6 +61,17 @@ class RenderSystem:
 
         return self.sprite_factory.from_image(str(path))
 
+    def setup_sprite(self, renderable: Renderable) -> None:
+        sprite_path = random.choice(self.sprites[renderable.type])
+        renderable.sprite = self.load_sprite(sprite_path)
+
+    def on_added(self, _owner, components: list) -> None:
+        renderable, _position = components
+        self.setup_sprite(renderable)
+
+    def on_sprite_reset(self, event: SpriteReset) -> None:
+        self.setup_sprite(event.renderable)
+
     def process(self, ticks: int, renderables: list):
         if not hasattr(self, '_previous_ticks'):
             self._previous_ticks = ticks
@@ -73,11 +84,6 @@ class RenderSystem:
         ]
 
         for renderable, position in renderables:
-            if not renderable.sprite:
-                t = renderable.type
-                sprite_path = random.choice(self.sprites[t])
-                renderable.sprite = self.load_sprite(sprite_path)
-
             renderable.sprite.x = position.x
             renderable.sprite.y = position.y
 
@@ -139,6 +145,13 @@ class Manager:
             self.sprite_renderer,
             self.sprite_factory
         )
+        self.world.observe(
+            self.render_system.component_types,
+            on_added=self.render_system.on_added
+        )
+        self.world.events.subscribe(
+            SpriteReset, self.render_system.on_sprite_reset
+        )
 
         self.map = Map()
         self.map.generate()
@@ -154,11 +167,13 @@ class Manager:
         tiles = []
         for tile in itertools.chain.from_iterable(self.map.tiles):
             tile.initialize()
-            tiles.append([
+            components = [
                 component
                 for component in tile.components
                 if component.__class__ in self.render_system.component_types
-            ])
+            ]
+            self.render_system.on_added(tile, components)
+            tiles.append(components)
 
         while self.running:
             start = sdl2.SDL_GetTicks()
@@ -0,0 +1,111 @@
+import itertools
+import random
+import unittest
+
+from settlers.engine.assignment import min_cost_assignment
+
+
+def total(costs, assignment) -> float:
+    return sum(
+        costs[row][column]
+        for row, column in enumerate(assignment)
+        if column is not None
+    )
+
+
+def best_total(costs) -> float:
+    rows = len(costs)
+    columns = len(costs[0])
+
+    if rows <= columns:
+        return min(
+            total(costs, permutation)
+            for permutation in itertools.permutations(range(columns), rows)
+        )
+
+    return min(
+        sum(costs[row][column] for column, row in enumerate(permutation))
+        for permutation in itertools.permutations(range(rows), columns)
+    )
+
+
+class MinCostAssignmentTest(unittest.TestCase):
+    def assertValid(self, costs, assignment):
+        self.assertEqual(len(assignment), len(costs))
+
+        columns = [column for column in assignment if column is not None]
+        self.assertEqual(len(columns), len(set(columns)))
+        self.assertEqual(
+            len(columns), min(len(costs), len(costs[0]) if costs else 0)
+        )
+
+    def test_empty(self):
+        self.assertEqual(min_cost_assignment([]), [])
+
+    def test_rows_without_columns(self):
+        self.assertEqual(min_cost_assignment([[], []]), [None, None])
+
+    def test_single(self):
+        self.assertEqual(min_cost_assignment([[4.0]]), [0])
+
+    def test_square(self):
+        costs = [
+            [4, 1, 3],
+            [2, 0, 5],
+            [3, 2, 2],
+        ]
+        assignment = min_cost_assignment(costs)
+
+        self.assertEqual(assignment, [1, 0, 2])
+        self.assertEqual(total(costs, assignment), 5)
+
+    def test_more_columns_than_rows(self):
+        costs = [
+            [9, 2, 7, 8],
+            [6, 4, 3, 7],
+        ]
+        assignment = min_cost_assignment(costs)
+
+        self.assertValid(costs, assignment)
+        self.assertEqual(assignment, [1, 2])
+
+    def test_more_rows_than_columns_leaves_rows_unassigned(self):
+        costs = [
+            [5, 9],
+            [1, 8],
+            [7, 2],
+        ]
+        assignment = min_cost_assignment(costs)
+
+        self.assertValid(costs, assignment)
+        self.assertEqual(assignment, [None, 0, 1])
+
+    def test_equal_costs(self):
+        costs = [[1.0] * 3 for _ in range(3)]
+        assignment = min_cost_assignment(costs)
+
+        self.assertValid(costs, assignment)
+        self.assertEqual(total(costs, assignment), 3.0)
+
+    def test_single_row_and_single_column(self):
+        self.assertEqual(min_cost_assignment([[3, 1, 2]]), [1])
+        self.assertEqual(min_cost_assignment([[3], [1], [2]]), [None, 0, None])
+
+    def test_matches_brute_force(self):
+        generator = random.Random(0)
+
+        for _ in range(300):
+            rows = generator.randint(1, 5)
+            columns = generator.randint(1, 5)
+            costs = [
+                [generator.randint(0, 20) for _ in range(columns)]
+                for _ in range(rows)
+            ]
+            assignment = min_cost_assignment(costs)
+
+            self.assertValid(costs, assignment)
+            self.assertEqual(total(costs, assignment), best_total(costs))
+
+
+if __name__ == '__main__':
+    unittest.main()
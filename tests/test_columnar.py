@@ -0,0 +1,65 @@
+import unittest
+
+from settlers.engine.components import columnar
+from settlers.engine.components.movement import Travel, Velocity
+from settlers.engine.entities.entity import Entity
+from settlers.engine.entities.position import Position
+from settlers.engine.world import World
+
+
+class Walker(Entity):
+    components = [Travel, (Velocity, 3)]
+
+
+@unittest.skipIf(columnar.numpy is None, 'numpy is not installed')
+class ColumnarWorldTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.world = World()
+        self.columns = columnar.enable(self.world)
+
+    def walker(self, world: World) -> Walker:
+        walker = Walker()
+        walker.initialize()
+        walker.components.add((Position, 4, 5))
+        world.add_entity(walker)
+        return walker
+
+    def test_components_built_before_joining_are_substituted(self) -> None:
+        walker = self.walker(self.world)
+        position = walker.components.get(Position)
+
+        self.assertIsInstance(position, columnar.ColumnarPosition)
+        self.assertIsInstance(
+            walker.components.get(Velocity), columnar.ColumnarVelocity
+        )
+        self.assertIsInstance(
+            walker.components.get(Travel), columnar.ColumnarTravel
+        )
+        self.assertEqual((position.x, position.y), (4, 5))
+        self.assertEqual(walker.components.get(Velocity).speed, 3)
+        self.assertEqual(self.columns.x[position._slot], 4)
+        self.assertIs(walker.position.reveal(Position), position)
+
+    def test_other_worlds_keep_scalar_components(self) -> None:
+        walker = self.walker(World())
+
+        self.assertIs(walker.components.get(Position).__class__, Position)
+        self.assertEqual(len(self.columns), 0)
+
+    def test_system_steps_travellers_of_its_world(self) -> None:
+        system = columnar.ColumnarTravelSystem(self.world)
+        self.world.add_system(system)
+
+        walker = self.walker(self.world)
+        target = Entity()
+        target.components.add((Position, 10, 5))
+        self.world.add_entity(target)
+
+        walker.travel.start(target)
+        self.world.process(1)
+
+        self.assertEqual(walker.components.get(Position).x, 7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+from typing import List, Tuple
+
+from settlers.engine.components.factory import (
+    Factory, FactorySystem, FactoryWorker, Pipeline, PipelineInput,
+    PipelineOutput
+)
+from settlers.engine.entities.entity import Entity
+from settlers.engine.entities.position import Position
+from settlers.engine.entities.resources import Resource
+from settlers.engine.entities.resources.resource_storage import (
+    ResourceStorage
+)
+from settlers.engine.world import World
+
+
+class Log(Resource):
+    pass
+
+
+class Plank(Resource):
+    pass
+
+
+class Sawmill:
+    '''
+    A factory with a single pipeline turning a log into `quantity` planks
+    in `ticks_per_cycle` runs, and its worker already at work there.
+    '''
+    def __init__(
+        self, logs: int, capacity: int, quantity: int = 1,
+        ticks_per_cycle: int = 2, bulk: bool = False
+    ) -> None:
+        self.world = World()
+        self.system = FactorySystem(bulk=bulk)
+        self.outputs: List[type] = []
+        self.system.on_production(
+            lambda _factory, outputs: self.outputs.extend(outputs)
+        )
+
+        self.logs = ResourceStorage(True, True, 100)
+        self.logs.add_many(Log, logs)
+        self.planks = ResourceStorage(True, True, capacity)
+        self.pipeline = Pipeline(
+            [PipelineInput(1, Log, self.logs)],
+            PipelineOutput(quantity, Plank, self.planks),
+            ticks_per_cycle
+        )
+
+        building = Entity()
+        building.components.add((Position, 0, 0))
+        building.components.add((Factory, [self.pipeline], 1))
+        self.world.add_entity(building)
+        self.factory: Factory = building.components.get(Factory)
+
+        villager = Entity()
+        villager.components.add((Position, 0, 0))
+        villager.components.add(FactoryWorker)
+        self.world.add_entity(villager)
+        self.worker: FactoryWorker = villager.components.get(FactoryWorker)
+        self.worker.start(self.factory)
+
+        # The first run puts the factory to work.
+        self.system.process(0, [self.factory])
+
+    def runs(self, count: int) -> range:
+        interval = self.system.tick_interval
+        return range(interval, (count + 1) * interval, interval)
+
+    def state(self) -> Tuple:
+        return (
+            self.logs.quantity(),
+            self.planks.quantity(),
+            len(self.outputs),
+            self.worker.state,
+            self.worker.pipeline is self.pipeline,
+            self.worker.completes_at,
+            self.pipeline.reserved,
+        )
+
+
+class BulkFactoryTest(unittest.TestCase):
+    '''
+    Runs the same sawmill over `runs` run by run and fast forwarded in bulk,
+    then once more run by run, and returns both states after each step.
+    '''
+    def compare(self, runs: int, **sawmill) -> Tuple:
+        processed = Sawmill(**sawmill)
+        bulk = Sawmill(bulk=True, **sawmill)
+
+        span = processed.runs(runs)
+        for tick in span:
+            processed.system.process(tick, [processed.factory])
+        bulk.system.fast_forward(span, [bulk.factory])
+
+        self.assertEqual(bulk.state(), processed.state())
+
+        # Both carry on the same from there.
+        for sawmill in (processed, bulk):
+            for tick in range(span[-1] + 1, span[-1] + 1 + 10 * 500, 500):
+                sawmill.system.process(tick, [sawmill.factory])
+
+        self.assertEqual(bulk.state(), processed.state())
+        return processed.state()
+
+    def test_input_limited(self) -> None:
+        state = self.compare(20, logs=3, capacity=50)
+        self.assertEqual(state[:3], (0, 3, 3))
+
+    def test_output_capacity_limited(self) -> None:
+        state = self.compare(20, logs=10, capacity=4)
+        self.assertEqual(state[:3], (6, 4, 4))
+
+    def test_partial_output_of_the_last_cycle(self) -> None:
+        state = self.compare(20, logs=10, capacity=5, quantity=2)
+        self.assertEqual(state[:3], (7, 5, 5))
+
+    def test_span_limited(self) -> None:
+        for runs in range(1, 12):
+            for ticks_per_cycle in (1, 2, 3):
+                self.compare(
+                    runs, logs=50, capacity=50,
+                    ticks_per_cycle=ticks_per_cycle
+                )
+
+    def test_startable_cycles(self) -> None:
+        pipeline = Sawmill(logs=3, capacity=5, quantity=2).pipeline
+
+        self.assertEqual(pipeline.startable_cycles(10), 3)
+        self.assertEqual(pipeline.startable_cycles(2), 2)
+        # Two cycles in progress leave room for a single plank.
+        self.assertEqual(pipeline.startable_cycles(10, pending=2), 1)
+        self.assertEqual(pipeline.startable_cycles(10, pending=3), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
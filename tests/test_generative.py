@@ -0,0 +1,112 @@
+import unittest
+from typing import Dict, List, Optional, Tuple
+
+from settlers.engine.components.generative import (
+    Generative, GenerativeSystem
+)
+from settlers.engine.entities.entity import Entity
+from settlers.engine.world import World
+
+
+class Bush(Entity):
+    def __init__(self, quantity: int) -> None:
+        super().__init__()
+        self.quantity = quantity
+
+
+class LazyRegrowthTest(unittest.TestCase):
+    '''
+    Runs the same generator lazily and processed on every tick, harvesting
+    `harvests[tick]` after `tick` is processed, and returns for each
+    checkpoint (harvest ticks and the last one) the quantity and cycles of
+    both, `None` once the generator was removed.
+    '''
+    def regrow(
+        self, quantity: int, max_cycles: int, max_value: int, ticks: int,
+        harvests: Dict[int, int]
+    ) -> Tuple[list, list]:
+        results: List[list] = []
+
+        for lazy in (False, True):
+            world = World()
+            world.add_system(GenerativeSystem(world))
+
+            bush = Bush(quantity)
+            bush.components.add(
+                (Generative, 'quantity', max_cycles, 4, 1, max_value, lazy)
+            )
+            world.add_entity(bush)
+            world.initialize()
+
+            checkpoints: list = []
+            for tick in range(1, ticks + 1):
+                generator: Optional[Generative] = bush.components.get(
+                    Generative
+                )
+                if generator is not None and not lazy:
+                    # Processed on every tick.
+                    generator.wake()
+
+                world.process(tick)
+
+                if tick not in harvests and tick != ticks:
+                    continue
+
+                generator = bush.components.get(Generative)
+                if generator is None:
+                    checkpoints.append((tick, bush.quantity, None))
+                    continue
+
+                generator.materialize(tick)
+                checkpoints.append((tick, bush.quantity, generator.cycles))
+
+                if tick in harvests:
+                    bush.quantity = max(0, bush.quantity - harvests[tick])
+                    generator.wake()
+
+            results.append(checkpoints)
+
+        return results[0], results[1]
+
+    def test_limited_generator_stops_after_max_cycles(self) -> None:
+        eager, lazy = self.regrow(0, 3, 10, 40, {})
+
+        self.assertEqual(lazy, eager)
+        self.assertEqual(eager, [(40, 4, None)])
+
+    def test_materialize_stops_after_max_cycles(self) -> None:
+        world = World()
+        world.add_system(GenerativeSystem(world))
+
+        bush = Bush(0)
+        bush.components.add((Generative, 'quantity', 3, 4, 1, 10, True))
+        world.add_entity(bush)
+        world.process(1)
+
+        generator: Generative = bush.components.get(Generative)
+        generator.materialize(1000)
+
+        self.assertEqual((bush.quantity, generator.cycles), (4, 4))
+
+    def test_regrowth_pauses_at_max_value(self) -> None:
+        eager, lazy = self.regrow(
+            4, -1, 4, 150, {3: 3, 9: 1, 12: 2, 31: 4, 33: 1, 90: 2}
+        )
+
+        self.assertEqual(lazy, eager)
+        self.assertEqual(eager[-1], (150, 4, 11))
+
+    def test_regrowth_around_max_cycles(self) -> None:
+        harvests = {7: 2, 11: 1, 18: 2, 22: 1}
+        eager, lazy = self.regrow(2, 5, 4, 45, harvests)
+
+        self.assertEqual(lazy, eager)
+        self.assertEqual(eager[-1][2], None)
+
+        for max_cycles in range(1, 5):
+            eager, lazy = self.regrow(2, max_cycles, 4, 45, harvests)
+            self.assertEqual(lazy, eager, max_cycles)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+
+from settlers.engine import parallel
+from settlers.engine.components import Component
+from settlers.engine.entities.entity import Entity
+from settlers.engine.entities.resources import Resource
+from settlers.engine.entities.resources.resource_storage import (
+    ResourceStorage
+)
+from settlers.engine.world import World
+
+
+class Site(Component):
+    __slots__ = ('workers',)
+
+    def __init__(self, owner) -> None:
+        super().__init__(owner)
+        self.workers = []
+
+
+class Worker(Component):
+    __slots__ = ()
+
+
+class Depot(Entity):
+    def __init__(self) -> None:
+        super().__init__()
+        self.storages = {Resource: ResourceStorage(True, True, 2)}
+
+
+class WorkerSystem:
+    component_types = [Worker]
+
+    reads: tuple = ()
+    writes: tuple = (Worker,)
+
+    def __init__(self, action) -> None:
+        self.action = action
+
+    def process(self, tick: int, workers) -> None:
+        self.action()
+
+
+class AccessChecksTest(unittest.TestCase):
+    def setUp(self) -> None:
+        parallel.enable_access_checks()
+        self.addCleanup(parallel.disable_access_checks)
+
+        self.world = World()
+
+        self.site_owner = Entity()
+        self.site_owner.components.add(Site)
+        self.world.add_entity(self.site_owner)
+        self.site = self.site_owner.components.get(Site)
+
+        self.depot = Depot()
+        self.world.add_entity(self.depot)
+
+        worker = Entity()
+        worker.components.add(Worker)
+        self.world.add_entity(worker)
+
+    def run_system(self, action) -> None:
+        self.world.add_system(WorkerSystem(action))
+        self.world.process(1)
+
+    def test_undeclared_read_fails(self) -> None:
+        with self.assertRaisesRegex(RuntimeError, 'read `workers`'):
+            self.run_system(lambda: self.site.workers)
+
+    def test_undeclared_write_fails(self) -> None:
+        def write() -> None:
+            self.site.workers = []
+
+        with self.assertRaisesRegex(RuntimeError, 'wrote `workers`'):
+            self.run_system(write)
+
+    def test_undeclared_in_place_change_fails(self) -> None:
+        workers = self.site.workers
+
+        with self.assertRaisesRegex(RuntimeError, 'changed `workers`'):
+            self.run_system(lambda: workers.append(1))
+
+    def test_undeclared_storage_change_fails(self) -> None:
+        storage = self.depot.storages[Resource]
+
+        with self.assertRaisesRegex(RuntimeError, 'called `add`'):
+            self.run_system(lambda: storage.add(Resource()))
+
+    def test_checks_are_removed_once_disabled(self) -> None:
+        parallel.disable_access_checks()
+
+        self.run_system(lambda: self.site.workers.append(1))
+        self.depot.storages[Resource].add(Resource())
+
+        self.assertEqual(self.site.workers, [1])
+        self.assertEqual(self.depot.storages[Resource].quantity(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+from types import SimpleNamespace
+
+from settlers.engine.production import (
+    Process, ProductionGraph, cycle_ticks
+)
+
+
+class Seed:
+    pass
+
+
+class Grain:
+    pass
+
+
+class Flour:
+    pass
+
+
+def process(
+    owner: str, inputs: dict, output: type, quantity: int, capacity: float,
+    ticks: int = 10
+) -> Process:
+    return Process(
+        SimpleNamespace(owner=owner), inputs, output, quantity, ticks,
+        capacity
+    )
+
+
+class CycleTicksTest(unittest.TestCase):
+    def test_cycle_completes_on_a_run_and_next_starts_on_the_one_after(self):
+        self.assertEqual(cycle_ticks(3, 1), 4)
+        self.assertEqual(cycle_ticks(10, 5), 15)
+        self.assertEqual(cycle_ticks(11, 5), 20)
+
+
+class ProductionGraphTest(unittest.TestCase):
+    def chain(self):
+        graph = ProductionGraph()
+        farm = graph.add(process('farm', {}, Grain, 1, 0.1))
+        mill = graph.add(process('mill', {Grain: 2}, Flour, 1, 0.1, 5))
+        return graph, farm, mill
+
+    def test_shortage_of_an_input_slows_its_consumer(self):
+        graph, farm, mill = self.chain()
+        plan = graph.solve()
+
+        self.assertAlmostEqual(plan.rates[farm], 0.1)
+        self.assertAlmostEqual(plan.rates[mill], 0.05)
+        self.assertAlmostEqual(plan.utilization(mill), 0.5)
+        self.assertAlmostEqual(plan.throughput(Grain), 0.0)
+        self.assertAlmostEqual(plan.throughput(Flour), 0.05)
+
+        shortages = plan.shortages()
+        self.assertEqual(list(shortages), [Grain])
+        self.assertAlmostEqual(shortages[Grain], 0.1)
+        self.assertEqual(plan.bottlenecks(), [farm])
+        self.assertEqual(plan.required_workers(), {'farm': 1, 'mill': 1})
+
+    def test_demand_runs_processes_as_fast_as_needed(self):
+        graph, farm, mill = self.chain()
+        plan = graph.solve({Flour: 0.01})
+
+        self.assertAlmostEqual(plan.rates[farm], 0.02)
+        self.assertAlmostEqual(plan.rates[mill], 0.01)
+        self.assertEqual(plan.shortages(), {})
+        self.assertEqual(plan.bottlenecks(), [])
+
+    def test_demand_beyond_capacity_is_a_shortage(self):
+        graph, farm, mill = self.chain()
+        plan = graph.solve({Flour: 0.5})
+
+        self.assertAlmostEqual(plan.throughput(Flour), 0.05)
+
+        shortages = plan.shortages()
+        self.assertAlmostEqual(shortages[Flour], 0.45)
+        self.assertAlmostEqual(shortages[Grain], 0.1)
+        self.assertEqual(plan.bottlenecks(), [farm])
+
+    def test_self_sustaining_cycle(self):
+        graph = ProductionGraph()
+        farm = graph.add(process('farm', {Seed: 1}, Grain, 3, 0.1))
+        seeder = graph.add(process('seeder', {Grain: 1}, Seed, 1, 1.0))
+        plan = graph.solve()
+
+        # The farm runs at capacity on the seeds made of its own grain.
+        self.assertAlmostEqual(plan.rates[farm], 0.1)
+        self.assertAlmostEqual(plan.rates[seeder], 0.3)
+        self.assertAlmostEqual(plan.throughput(Grain), 0.0)
+        self.assertAlmostEqual(plan.throughput(Seed), 0.2)
+
+        for resource in graph.resources():
+            self.assertGreaterEqual(plan.throughput(resource), -1e-9)
+
+    def test_cycle_losing_items_dies_out(self):
+        graph = ProductionGraph()
+        farm = graph.add(process('farm', {Seed: 1}, Grain, 1, 0.1))
+        seeder = graph.add(process('seeder', {Grain: 2}, Seed, 1, 1.0))
+        plan = graph.solve()
+
+        self.assertLess(plan.rates[farm], 1e-9)
+        self.assertLess(plan.rates[seeder], 1e-9)
+        self.assertEqual(set(plan.shortages()), {Grain, Seed})
+        self.assertEqual(plan.bottlenecks(), [])
+
+    def test_depletion_of_a_limited_stock(self):
+        graph = ProductionGraph()
+        quarry = graph.add(Process(
+            SimpleNamespace(owner='quarry'), {}, Grain, 2, 10, 0.05,
+            stock=100
+        ))
+        farm = graph.add(process('farm', {}, Grain, 1, 0.1))
+        plan = graph.solve()
+
+        self.assertAlmostEqual(plan.depletes_in(quarry), 1000)
+        self.assertIsNone(plan.depletes_in(farm))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,73 @@
+import unittest
+
+from settlers.engine.components import Component
+from settlers.engine.entities.entity import Entity
+from settlers.engine.queries import Index
+from settlers.engine.world import World
+
+
+class Site(Component):
+    __slots__ = ('workers',)
+
+    def __init__(self, owner, workers: int = 0):
+        super().__init__(owner)
+        self.workers = workers
+
+
+class SiteSystem:
+    component_types = [Site]
+
+    def __init__(self, world: World) -> None:
+        self.world = world
+        self.processed = []
+
+    def process(self, tick: int, sites) -> None:
+        self.processed.append(list(sites))
+
+
+class SleepingEntitiesTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.world = World()
+        self.system = SiteSystem(self.world)
+        self.world.add_system(self.system)
+
+        self.index = self.world.add_index(Index(
+            Site, 'workers', keys=lambda site: (site.workers,)
+        ))
+
+        self.sites = []
+        for workers in (0, 1):
+            entity = Entity()
+            entity.components.add(Site(entity, workers))
+            self.world.add_entity(entity)
+            self.sites.append(entity.components.get(Site))
+
+        self.world.initialize()
+        self.sites[0].sleep()
+
+    def test_query_keeps_sleeping_entities(self) -> None:
+        self.assertEqual(
+            [components[0] for _owner, components in self.world.query(Site)],
+            self.sites
+        )
+
+    def test_indexed_query_keeps_sleeping_entities(self) -> None:
+        matches = self.world.query(Site, where={self.index: 0})
+
+        self.assertEqual(
+            [components[0] for _owner, components in matches],
+            [self.sites[0]]
+        )
+
+    def test_systems_skip_sleeping_entities(self) -> None:
+        self.world.process(1)
+        self.sites[0].wake()
+        self.world.process(2)
+
+        self.assertEqual(
+            self.system.processed, [[self.sites[1]], self.sites]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
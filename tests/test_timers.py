@@ -0,0 +1,99 @@
+import random
+import unittest
+
+from settlers.engine.timers import TimerWheel
+
+
+class TimerWheelTest(unittest.TestCase):
+    '''
+    4 slots per level over 2 levels: level 0 spans 4 ticks, level 1 16,
+    anything further ahead overflows.
+    '''
+    def wheel(self, now: int = 0) -> TimerWheel:
+        return TimerWheel(now=now, slot_bits=2, levels=2)
+
+    def test_advance_hands_out_items_in_tick_then_scheduling_order(self):
+        wheel = self.wheel()
+        wheel.schedule(3, 'c')
+        wheel.schedule(2, 'a')
+        wheel.schedule(2, 'b')
+
+        self.assertEqual(wheel.advance(1), [])
+        self.assertEqual(wheel.advance(3), ['a', 'b', 'c'])
+        self.assertEqual(len(wheel), 0)
+
+    def test_past_ticks_are_due_on_next_advance(self):
+        wheel = self.wheel(now=10)
+        wheel.schedule(4, 'late')
+        wheel.schedule(10, 'now')
+
+        self.assertEqual(wheel.next_tick(), 10)
+        self.assertEqual(wheel.advance(10), ['late', 'now'])
+
+    def test_rollover_into_next_level(self):
+        wheel = self.wheel(now=2)
+        wheel.schedule(5, 'level 1')
+        wheel.schedule(15, 'end of level 1')
+
+        self.assertEqual(wheel.next_tick(), 5)
+        self.assertEqual(wheel.advance(4), [])
+        self.assertEqual(wheel.advance(5), ['level 1'])
+        self.assertEqual(wheel.next_tick(), 15)
+        self.assertEqual(wheel.advance(14), [])
+        self.assertEqual(wheel.advance(15), ['end of level 1'])
+
+    def test_rollover_from_overflow_across_levels(self):
+        wheel = self.wheel(now=1)
+        wheel.schedule(16, 'overflow boundary')
+        wheel.schedule(37, 'overflow')
+        wheel.schedule(70, 'far overflow')
+
+        self.assertEqual(wheel.next_tick(), 16)
+        # Crossing into the next span of the top level cascades the items
+        # down two levels at once.
+        self.assertEqual(wheel.advance(16), ['overflow boundary'])
+        self.assertEqual(wheel.next_tick(), 37)
+        self.assertEqual(wheel.advance(36), [])
+        self.assertEqual(wheel.advance(40), ['overflow'])
+        self.assertEqual(wheel.advance(69), [])
+        self.assertEqual(wheel.advance(1000), ['far overflow'])
+        self.assertEqual(wheel.next_tick(), None)
+        self.assertEqual(wheel.now, 1000)
+
+    def test_matches_sorted_schedule(self):
+        generator = random.Random(0)
+
+        for _ in range(200):
+            wheel = self.wheel(now=generator.randrange(50))
+            scheduled = []
+
+            for order in range(generator.randrange(1, 20)):
+                tick = wheel.now + generator.randrange(-3, 120)
+                wheel.schedule(tick, (tick, order))
+                scheduled.append((max(tick, wheel.now), order))
+
+            expected = sorted(scheduled)
+            handed_out = []
+
+            while len(wheel):
+                next_tick = wheel.next_tick()
+                self.assertEqual(
+                    next_tick, expected[len(handed_out)][0]
+                )
+
+                tick = wheel.now + generator.randrange(0, 40)
+                due = wheel.advance(tick)
+                self.assertEqual(
+                    [order for _tick, order in due],
+                    [
+                        order for due_tick, order in expected
+                        if due_tick <= tick
+                    ][len(handed_out):]
+                )
+                handed_out.extend(due)
+
+            self.assertEqual(len(handed_out), len(scheduled))
+
+
+if __name__ == '__main__':
+    unittest.main()